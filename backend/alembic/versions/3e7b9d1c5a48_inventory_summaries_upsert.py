@@ -0,0 +1,87 @@
+"""inventory summaries refresh upsert
+
+Revision ID: 3e7b9d1c5a48
+Revises: 9c4d2e7a1f35
+Create Date: 2026-10-18 00:26:51.640288
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e7b9d1c5a48'
+down_revision: Union[str, Sequence[str], None] = '9c4d2e7a1f35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# inventory_summaries_refresh as of this revision: the recompute upserts,
+# so a summary deleted by a concurrent writer comes back when batches remain
+REFRESH_FUNCTION = """
+CREATE OR REPLACE FUNCTION inventory_summaries_refresh(hids integer[], pids integer[])
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO inventory_summaries (hospital_id, product_id)
+    SELECT DISTINCT k.h, k.p FROM unnest(hids, pids) AS k(h, p)
+    WHERE k.h IS NOT NULL AND k.p IS NOT NULL
+    ORDER BY 1, 2
+    ON CONFLICT DO NOTHING;
+
+    PERFORM 1 FROM inventory_summaries AS s
+    JOIN unnest(hids, pids) AS k(h, p) ON s.hospital_id = k.h AND s.product_id = k.p
+    ORDER BY s.hospital_id, s.product_id
+    FOR UPDATE OF s;
+
+    WITH k AS (
+        SELECT DISTINCT h, p FROM unnest(hids, pids) AS u(h, p)
+    ), a AS (
+        SELECT k.h, k.p, count(i.id) AS n,
+               coalesce(sum(i.current_stock) FILTER (WHERE v.ok), 0) AS total_stock,
+               coalesce(sum(i.current_stock) FILTER (WHERE NOT v.ok), 0) AS expired_stock,
+               count(*) FILTER (WHERE v.ok AND i.current_stock > 0) AS batches,
+               min(i.expiry_date) FILTER (WHERE v.ok AND i.current_stock > 0) AS nearest_expiry,
+               min(i.predicted_days_to_zero) FILTER (WHERE v.ok) AS days_to_zero,
+               max(i.predicted_risk_score) FILTER (WHERE v.ok) AS risk_score,
+               coalesce(max(i.safety_stock_level) FILTER (WHERE v.ok), 0) AS safety_stock,
+               max(i.lead_time_days) FILTER (WHERE v.ok) AS lead_time_days
+        FROM k
+        LEFT JOIN inventories AS i ON i.hospital_id = k.h AND i.product_id = k.p
+        CROSS JOIN LATERAL (
+            SELECT i.expiry_date IS NULL OR i.expiry_date > now() AS ok
+        ) AS v
+        GROUP BY k.h, k.p
+    ), gone AS (
+        DELETE FROM inventory_summaries AS s USING a
+        WHERE s.hospital_id = a.h AND s.product_id = a.p AND a.n = 0
+    )
+    INSERT INTO inventory_summaries AS s (hospital_id, product_id, total_stock, expired_stock,
+        batches, nearest_expiry, days_to_zero, risk_score, safety_stock, lead_time_days)
+    SELECT a.h, a.p, a.total_stock, a.expired_stock, a.batches, a.nearest_expiry,
+           a.days_to_zero, a.risk_score, a.safety_stock, a.lead_time_days
+    FROM a WHERE a.n > 0
+    ORDER BY a.h, a.p
+    ON CONFLICT (hospital_id, product_id) DO UPDATE
+    SET total_stock = excluded.total_stock,
+        expired_stock = excluded.expired_stock,
+        batches = excluded.batches,
+        nearest_expiry = excluded.nearest_expiry,
+        days_to_zero = excluded.days_to_zero,
+        risk_score = excluded.risk_score,
+        safety_stock = excluded.safety_stock,
+        lead_time_days = excluded.lead_time_days,
+        updated_at = now();
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(REFRESH_FUNCTION)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # the upsert only adds a case the previous UPDATE missed; nothing to undo
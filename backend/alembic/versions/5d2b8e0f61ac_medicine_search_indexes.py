@@ -0,0 +1,49 @@
+"""medicine search indexes
+
+Revision ID: 5d2b8e0f61ac
+Revises: c3e1f7a2d904
+Create Date: 2026-10-17 10:03:17.552910
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2b8e0f61ac'
+down_revision: Union[str, Sequence[str], None] = 'c3e1f7a2d904'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column('drug_products', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('simple', coalesce(brand_name, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(generic_name, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(manufacturer_name, '')), 'C')",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index('ix_drug_products_search_vector', 'drug_products', ['search_vector'], unique=False, postgresql_using='gin')
+    for column in ('brand_name', 'generic_name', 'manufacturer_name'):
+        op.create_index(
+            f'ix_drug_products_{column}_trgm', 'drug_products', [column], unique=False,
+            postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in ('manufacturer_name', 'generic_name', 'brand_name'):
+        op.drop_index(f'ix_drug_products_{column}_trgm', table_name='drug_products')
+    op.drop_index('ix_drug_products_search_vector', table_name='drug_products')
+    op.drop_column('drug_products', 'search_vector')
@@ -0,0 +1,28 @@
+"""drug product content hash
+
+Revision ID: 8f4a0c6e2b17
+Revises: 5d2b8e0f61ac
+Create Date: 2026-10-17 11:40:52.107733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f4a0c6e2b17'
+down_revision: Union[str, Sequence[str], None] = '5d2b8e0f61ac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('drug_products', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('drug_products', 'content_hash')
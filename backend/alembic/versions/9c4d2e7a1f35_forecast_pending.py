@@ -0,0 +1,49 @@
+"""forecast pending usage queue
+
+Revision ID: 9c4d2e7a1f35
+Revises: f1c6a8d3e590
+Create Date: 2026-10-17 23:41:18.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4d2e7a1f35'
+down_revision: Union[str, Sequence[str], None] = 'f1c6a8d3e590'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'forecast_pending',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('hospital_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('quantity', sa.BigInteger(), nullable=False),
+        sa.Column('events', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    # queue what the old log id watermark had not folded yet; with no state
+    # the next incremental run is a full one and empties the queue anyway
+    op.execute(
+        "INSERT INTO forecast_pending (hospital_id, product_id, day, quantity, events) "
+        "SELECT hospital_id, product_id, CAST(date AS date), sum(quantity_used), count(*) "
+        "FROM usage_logs "
+        "WHERE hospital_id IS NOT NULL AND product_id IS NOT NULL "
+        "  AND id > (SELECT max(last_log_id) FROM forecast_states) "
+        "GROUP BY 1, 2, 3"
+    )
+    op.drop_index(op.f('ix_forecast_states_last_log_id'), table_name='forecast_states')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_forecast_states_last_log_id'), 'forecast_states', ['last_log_id'], unique=False)
+    op.drop_table('forecast_pending')
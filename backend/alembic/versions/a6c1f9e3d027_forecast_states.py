@@ -0,0 +1,41 @@
+"""forecast states
+
+Revision ID: a6c1f9e3d027
+Revises: e2a9d4c7b351
+Create Date: 2026-10-17 16:02:44.910532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c1f9e3d027'
+down_revision: Union[str, Sequence[str], None] = 'e2a9d4c7b351'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'forecast_states',
+        sa.Column('hospital_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('first_day', sa.Integer(), nullable=False),
+        sa.Column('as_of_day', sa.Integer(), nullable=False),
+        sa.Column('ew_usage', sa.Float(), nullable=False),
+        sa.Column('ew_usage_sq', sa.Float(), nullable=False),
+        sa.Column('last_log_id', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('hospital_id', 'product_id'),
+    )
+    op.create_index(op.f('ix_forecast_states_last_log_id'), 'forecast_states', ['last_log_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_forecast_states_last_log_id'), table_name='forecast_states')
+    op.drop_table('forecast_states')
@@ -0,0 +1,173 @@
+"""inventory summaries maintained by triggers
+
+Revision ID: b7f3e5a1c842
+Revises: d4e8b2f6a913
+Create Date: 2026-10-17 20:04:51.318265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7f3e5a1c842'
+down_revision: Union[str, Sequence[str], None] = 'd4e8b2f6a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Frozen copies of services/stock_summary.py as of this revision; later
+# revisions replace the functions with CREATE OR REPLACE of their own.
+REFRESH_FUNCTION = """
+CREATE OR REPLACE FUNCTION inventory_summaries_refresh(hids integer[], pids integer[])
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO inventory_summaries (hospital_id, product_id)
+    SELECT DISTINCT k.h, k.p FROM unnest(hids, pids) AS k(h, p)
+    WHERE k.h IS NOT NULL AND k.p IS NOT NULL
+    ORDER BY 1, 2
+    ON CONFLICT DO NOTHING;
+
+    PERFORM 1 FROM inventory_summaries AS s
+    JOIN unnest(hids, pids) AS k(h, p) ON s.hospital_id = k.h AND s.product_id = k.p
+    ORDER BY s.hospital_id, s.product_id
+    FOR UPDATE OF s;
+
+    WITH k AS (
+        SELECT DISTINCT h, p FROM unnest(hids, pids) AS u(h, p)
+    ), a AS (
+        SELECT k.h, k.p, count(i.id) AS n,
+               coalesce(sum(i.current_stock) FILTER (WHERE v.ok), 0) AS total_stock,
+               coalesce(sum(i.current_stock) FILTER (WHERE NOT v.ok), 0) AS expired_stock,
+               count(*) FILTER (WHERE v.ok AND i.current_stock > 0) AS batches,
+               min(i.expiry_date) FILTER (WHERE v.ok AND i.current_stock > 0) AS nearest_expiry,
+               min(i.predicted_days_to_zero) FILTER (WHERE v.ok) AS days_to_zero,
+               max(i.predicted_risk_score) FILTER (WHERE v.ok) AS risk_score,
+               coalesce(max(i.safety_stock_level) FILTER (WHERE v.ok), 0) AS safety_stock,
+               max(i.lead_time_days) FILTER (WHERE v.ok) AS lead_time_days
+        FROM k
+        LEFT JOIN inventories AS i ON i.hospital_id = k.h AND i.product_id = k.p
+        CROSS JOIN LATERAL (
+            SELECT i.expiry_date IS NULL OR i.expiry_date > now() AS ok
+        ) AS v
+        GROUP BY k.h, k.p
+    ), gone AS (
+        DELETE FROM inventory_summaries AS s USING a
+        WHERE s.hospital_id = a.h AND s.product_id = a.p AND a.n = 0
+    )
+    UPDATE inventory_summaries AS s
+    SET total_stock = a.total_stock,
+        expired_stock = a.expired_stock,
+        batches = a.batches,
+        nearest_expiry = a.nearest_expiry,
+        days_to_zero = a.days_to_zero,
+        risk_score = a.risk_score,
+        safety_stock = a.safety_stock,
+        lead_time_days = a.lead_time_days,
+        updated_at = now()
+    FROM a
+    WHERE s.hospital_id = a.h AND s.product_id = a.p AND a.n > 0;
+END
+$$
+"""
+
+SYNC_FUNCTION = """
+CREATE OR REPLACE FUNCTION inventory_summaries_sync()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    hids integer[];
+    pids integer[];
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM inventory_summaries;
+        RETURN NULL;
+    ELSIF TG_OP = 'INSERT' THEN
+        SELECT array_agg(hospital_id), array_agg(product_id) INTO hids, pids
+        FROM (SELECT DISTINCT hospital_id, product_id FROM new_rows) AS k;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(hospital_id), array_agg(product_id) INTO hids, pids
+        FROM (SELECT DISTINCT hospital_id, product_id FROM old_rows) AS k;
+    ELSE
+        SELECT array_agg(hospital_id), array_agg(product_id) INTO hids, pids
+        FROM (SELECT hospital_id, product_id FROM old_rows
+              UNION SELECT hospital_id, product_id FROM new_rows) AS k;
+    END IF;
+    IF hids IS NOT NULL THEN
+        PERFORM inventory_summaries_refresh(hids, pids);
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+TRIGGERS = (
+    "CREATE OR REPLACE TRIGGER inventories_summary_insert AFTER INSERT ON inventories "
+    "REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION inventory_summaries_sync()",
+    "CREATE OR REPLACE TRIGGER inventories_summary_update AFTER UPDATE ON inventories "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION inventory_summaries_sync()",
+    "CREATE OR REPLACE TRIGGER inventories_summary_delete AFTER DELETE ON inventories "
+    "REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION inventory_summaries_sync()",
+    "CREATE OR REPLACE TRIGGER inventories_summary_truncate AFTER TRUNCATE ON inventories "
+    "FOR EACH STATEMENT EXECUTE FUNCTION inventory_summaries_sync()",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'inventory_summaries',
+        sa.Column('hospital_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('total_stock', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('expired_stock', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('batches', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('nearest_expiry', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('days_to_zero', sa.Float(), nullable=True),
+        sa.Column('risk_score', sa.Float(), nullable=True),
+        sa.Column('safety_stock', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('lead_time_days', sa.Integer(), nullable=True),
+        sa.Column(
+            'is_low', sa.Boolean(),
+            sa.Computed(
+                'total_stock <= 0 OR total_stock < safety_stock '
+                'OR coalesce(days_to_zero < lead_time_days, false)',
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('hospital_id', 'product_id'),
+    )
+    op.create_index(
+        'ix_inventory_summaries_low', 'inventory_summaries', ['hospital_id', 'product_id'],
+        unique=False, postgresql_where=sa.text('is_low'),
+    )
+
+    op.execute(REFRESH_FUNCTION)
+    op.execute(SYNC_FUNCTION)
+    for ddl in TRIGGERS:
+        op.execute(ddl)
+    # seed from the existing batches
+    op.execute(
+        "SELECT inventory_summaries_refresh(array_agg(hospital_id), array_agg(product_id)) "
+        "FROM (SELECT DISTINCT hospital_id, product_id FROM inventories "
+        "      WHERE hospital_id IS NOT NULL AND product_id IS NOT NULL) AS k "
+        "HAVING count(*) > 0"
+    )
+    op.execute("ANALYZE inventory_summaries")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in ("insert", "update", "delete", "truncate"):
+        op.execute(f"DROP TRIGGER IF EXISTS inventories_summary_{name} ON inventories")
+    op.execute("DROP FUNCTION IF EXISTS inventory_summaries_sync()")
+    op.execute("DROP FUNCTION IF EXISTS inventory_summaries_refresh(integer[], integer[])")
+    op.drop_index('ix_inventory_summaries_low', table_name='inventory_summaries',
+                  postgresql_where=sa.text('is_low'))
+    op.drop_table('inventory_summaries')
@@ -0,0 +1,29 @@
+"""keyset pagination indexes
+
+Revision ID: c3e1f7a2d904
+Revises: 7a937c610d49
+Create Date: 2026-10-17 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e1f7a2d904'
+down_revision: Union[str, Sequence[str], None] = '7a937c610d49'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_drug_products_brand_name_id', 'drug_products', ['brand_name', 'id'], unique=False)
+    op.create_index('ix_suppliers_name_id', 'suppliers', ['name', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_suppliers_name_id', table_name='suppliers')
+    op.drop_index('ix_drug_products_brand_name_id', table_name='drug_products')
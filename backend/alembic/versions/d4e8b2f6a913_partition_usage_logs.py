@@ -0,0 +1,157 @@
+"""partition usage logs by month, usage rollups
+
+Revision ID: d4e8b2f6a913
+Revises: a6c1f9e3d027
+Create Date: 2026-10-17 18:37:12.604118
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e8b2f6a913'
+down_revision: Union[str, Sequence[str], None] = 'a6c1f9e3d027'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+
+def _add_months(d: date, months: int) -> date:
+    """First day of the month *months* after *d*'s month."""
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_partition(month: date) -> None:
+    # the default partition is still empty here, so nothing needs moving
+    lo, hi = f"{month:%Y-%m-%d} 00:00:00+00", f"{_add_months(month, 1):%Y-%m-%d} 00:00:00+00"
+    op.execute(
+        f"CREATE TABLE usage_logs_{month:%Y_%m} PARTITION OF usage_logs "
+        f"FOR VALUES FROM ('{lo}') TO ('{hi}')"
+    )
+
+
+def _create_rollups() -> None:
+    op.create_table(
+        'usage_daily',
+        sa.Column('hospital_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('quantity', sa.BigInteger(), nullable=False),
+        sa.Column('events', sa.Integer(), nullable=False),
+        sa.Column('last_log_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('hospital_id', 'product_id', 'day'),
+    )
+    op.create_index('ix_usage_daily_day', 'usage_daily', ['day'], unique=False)
+    op.create_table(
+        'usage_weekly',
+        sa.Column('hospital_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('week_start', sa.Date(), nullable=False),
+        sa.Column('quantity', sa.BigInteger(), nullable=False),
+        sa.Column('events', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('hospital_id', 'product_id', 'week_start'),
+    )
+    op.execute(
+        "INSERT INTO usage_daily (hospital_id, product_id, day, quantity, events, last_log_id) "
+        "SELECT hospital_id, product_id, CAST(date AS date), sum(quantity_used), count(*), max(id) "
+        "FROM usage_logs WHERE hospital_id IS NOT NULL AND product_id IS NOT NULL "
+        "GROUP BY 1, 2, 3"
+    )
+    op.execute(
+        "INSERT INTO usage_weekly (hospital_id, product_id, week_start, quantity, events) "
+        "SELECT hospital_id, product_id, CAST(date_trunc('week', date) AS date), "
+        "sum(quantity_used), count(*) "
+        "FROM usage_logs WHERE hospital_id IS NOT NULL AND product_id IS NOT NULL "
+        "GROUP BY 1, 2, 3"
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+
+    # set the plain table aside; its pkey index name would clash
+    op.rename_table('usage_logs', 'usage_logs_unpartitioned')
+    op.execute("ALTER TABLE usage_logs_unpartitioned RENAME CONSTRAINT usage_logs_pkey TO usage_logs_unpartitioned_pkey")
+    op.drop_index('ix_usage_logs_id', table_name='usage_logs_unpartitioned')
+    op.drop_index('ix_usage_logs_hospital_id', table_name='usage_logs_unpartitioned')
+    op.drop_index('ix_usage_logs_product_id', table_name='usage_logs_unpartitioned')
+
+    op.execute(
+        "CREATE TABLE usage_logs ("
+        "  id integer NOT NULL DEFAULT nextval('usage_logs_id_seq'::regclass),"
+        "  hospital_id integer REFERENCES hospitals (id),"
+        "  product_id integer REFERENCES drug_products (id),"
+        "  date timestamp with time zone NOT NULL,"
+        "  quantity_used integer NOT NULL,"
+        "  created_at timestamp with time zone DEFAULT now(),"
+        "  PRIMARY KEY (id, date)"
+        ") PARTITION BY RANGE (date)"
+    )
+    op.execute("ALTER SEQUENCE usage_logs_id_seq OWNED BY usage_logs.id")
+    op.execute("CREATE TABLE usage_logs_default PARTITION OF usage_logs DEFAULT")
+
+    # a partition per month from the oldest log to a few months ahead
+    oldest, newest = conn.execute(sa.text("SELECT min(date), max(date) FROM usage_logs_unpartitioned")).one()
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    month = (oldest.astimezone(timezone.utc).date() if oldest else this_month).replace(day=1)
+    last = max(_add_months(this_month, MONTHS_AHEAD),
+               newest.astimezone(timezone.utc).date().replace(day=1) if newest else date.min)
+    while month <= last:
+        _create_partition(month)
+        month = _add_months(month, 1)
+
+    op.execute(
+        "INSERT INTO usage_logs (id, hospital_id, product_id, date, quantity_used, created_at) "
+        "SELECT id, hospital_id, product_id, date, quantity_used, created_at "
+        "FROM usage_logs_unpartitioned"
+    )
+    op.drop_table('usage_logs_unpartitioned')
+
+    op.create_index('ix_usage_logs_hospital_id_product_id_date', 'usage_logs',
+                    ['hospital_id', 'product_id', 'date'], unique=False)
+    op.create_index(op.f('ix_usage_logs_product_id'), 'usage_logs', ['product_id'], unique=False)
+
+    _create_rollups()
+    op.execute("ANALYZE usage_logs")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('usage_weekly')
+    op.drop_index('ix_usage_daily_day', table_name='usage_daily')
+    op.drop_table('usage_daily')
+
+    op.rename_table('usage_logs', 'usage_logs_partitioned')
+    op.execute("ALTER TABLE usage_logs_partitioned RENAME CONSTRAINT usage_logs_pkey TO usage_logs_partitioned_pkey")
+    op.drop_index('ix_usage_logs_hospital_id_product_id_date', table_name='usage_logs_partitioned')
+    op.drop_index('ix_usage_logs_product_id', table_name='usage_logs_partitioned')
+
+    op.execute(
+        "CREATE TABLE usage_logs ("
+        "  id integer NOT NULL DEFAULT nextval('usage_logs_id_seq'::regclass),"
+        "  hospital_id integer REFERENCES hospitals (id),"
+        "  product_id integer REFERENCES drug_products (id),"
+        "  date timestamp with time zone NOT NULL,"
+        "  quantity_used integer NOT NULL,"
+        "  created_at timestamp with time zone DEFAULT now(),"
+        "  CONSTRAINT usage_logs_pkey PRIMARY KEY (id)"
+        ")"
+    )
+    op.execute("ALTER SEQUENCE usage_logs_id_seq OWNED BY usage_logs.id")
+    op.execute(
+        "INSERT INTO usage_logs (id, hospital_id, product_id, date, quantity_used, created_at) "
+        "SELECT id, hospital_id, product_id, date, quantity_used, created_at "
+        "FROM usage_logs_partitioned"
+    )
+    op.drop_table('usage_logs_partitioned')
+
+    op.create_index(op.f('ix_usage_logs_hospital_id'), 'usage_logs', ['hospital_id'], unique=False)
+    op.create_index(op.f('ix_usage_logs_id'), 'usage_logs', ['id'], unique=False)
+    op.create_index(op.f('ix_usage_logs_product_id'), 'usage_logs', ['product_id'], unique=False)
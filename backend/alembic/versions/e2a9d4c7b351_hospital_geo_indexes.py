@@ -0,0 +1,65 @@
+"""hospital geo indexes
+
+Revision ID: e2a9d4c7b351
+Revises: 8f4a0c6e2b17
+Create Date: 2026-10-17 14:21:06.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a9d4c7b351'
+down_revision: Union[str, Sequence[str], None] = '8f4a0c6e2b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def _geohash(lat: float, lon: float, precision: int = 9) -> str:
+    """Geohash as stored at this revision: bins, not bisection, lon bit first."""
+    lon_bits, lat_bits = (5 * precision + 1) // 2, 5 * precision // 2
+    qlon = min(max(int((lon + 180) / 360 * (1 << lon_bits)), 0), (1 << lon_bits) - 1)
+    qlat = min(max(int((lat + 90) / 180 * (1 << lat_bits)), 0), (1 << lat_bits) - 1)
+    code = 0
+    for i in range(5 * precision):
+        if i % 2 == 0:
+            bit = (qlon >> (lon_bits - 1 - i // 2)) & 1
+        else:
+            bit = (qlat >> (lat_bits - 1 - i // 2)) & 1
+        code = (code << 1) | bit
+    return "".join(_BASE32[(code >> 5 * k) & 31] for k in range(precision - 1, -1, -1))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('hospitals', sa.Column('geohash', sa.String(length=12), nullable=True))
+
+    # backfill existing rows
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT id, latitude, longitude FROM hospitals "
+        "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    )).all()
+    if rows:
+        conn.execute(
+            sa.text("UPDATE hospitals SET geohash = :geohash WHERE id = :id"),
+            [{"id": i, "geohash": _geohash(lat, lon)} for i, lat, lon in rows],
+        )
+
+    op.create_index(
+        'ix_hospitals_geohash', 'hospitals', ['geohash'], unique=False,
+        postgresql_ops={'geohash': 'varchar_pattern_ops'},
+    )
+    op.create_index('ix_hospitals_latitude_longitude', 'hospitals', ['latitude', 'longitude'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_hospitals_latitude_longitude', table_name='hospitals')
+    op.drop_index('ix_hospitals_geohash', table_name='hospitals')
+    op.drop_column('hospitals', 'geohash')
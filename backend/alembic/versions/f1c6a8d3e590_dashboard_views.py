@@ -0,0 +1,98 @@
+"""dashboard materialized views
+
+Revision ID: f1c6a8d3e590
+Revises: b7f3e5a1c842
+Create Date: 2026-10-17 21:12:07.845530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c6a8d3e590'
+down_revision: Union[str, Sequence[str], None] = 'b7f3e5a1c842'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Frozen copy of services/dashboard.py as of this revision:
+# name -> (query, unique index columns, extra index columns)
+VIEWS = {
+    "dashboard_products_at_risk": (
+        "SELECT s.product_id, p.brand_name, p.generic_name, "
+        "  count(*) AS hospitals, "
+        "  count(*) FILTER (WHERE s.is_low) AS hospitals_low, "
+        "  count(*) FILTER (WHERE s.total_stock <= 0) AS hospitals_out, "
+        "  sum(s.total_stock) AS total_stock, "
+        "  min(s.days_to_zero) AS min_days_to_zero, "
+        "  max(s.risk_score) AS max_risk_score, "
+        "  now() AS refreshed_at "
+        "FROM inventory_summaries AS s "
+        "JOIN hospitals AS h ON h.id = s.hospital_id AND h.is_active IS NOT FALSE "
+        "LEFT JOIN drug_products AS p ON p.id = s.product_id "
+        "GROUP BY s.product_id, p.brand_name, p.generic_name "
+        "HAVING count(*) FILTER (WHERE s.is_low) > 0",
+        "product_id",
+        "hospitals_low DESC, product_id",
+    ),
+    "dashboard_stockouts_by_state": (
+        "SELECT coalesce(h.state, '') AS state, "
+        "  count(DISTINCT h.id) AS hospitals, "
+        "  count(DISTINCT s.hospital_id) FILTER (WHERE s.total_stock <= 0) "
+        "    AS hospitals_with_stockouts, "
+        "  count(s.product_id) FILTER (WHERE s.total_stock <= 0) AS stockouts, "
+        "  count(s.product_id) FILTER (WHERE s.is_low) AS low, "
+        "  now() AS refreshed_at "
+        "FROM hospitals AS h "
+        "LEFT JOIN inventory_summaries AS s ON s.hospital_id = h.id "
+        "WHERE h.is_active IS NOT FALSE "
+        "GROUP BY 1",
+        "state",
+        None,
+    ),
+    "dashboard_expiring_stock": (
+        "WITH price AS ("
+        "  SELECT sp.product_id, min(sp.price_per_unit) AS price "
+        "  FROM supplier_products AS sp "
+        "  JOIN suppliers AS su ON su.id = sp.supplier_id AND su.is_active IS NOT FALSE "
+        "  WHERE sp.price_per_unit IS NOT NULL "
+        "  GROUP BY sp.product_id"
+        "), batch AS ("
+        "  SELECT i.hospital_id, i.product_id, i.current_stock, "
+        "    CASE WHEN i.expiry_date <= now() THEN 0 "
+        "         WHEN i.expiry_date <= now() + interval '30 days' THEN 30 "
+        "         WHEN i.expiry_date <= now() + interval '60 days' THEN 60 "
+        "         ELSE 90 END AS within_days "
+        "  FROM inventories AS i "
+        "  JOIN hospitals AS h ON h.id = i.hospital_id AND h.is_active IS NOT FALSE "
+        "  WHERE i.current_stock > 0 AND i.expiry_date <= now() + interval '90 days'"
+        ") "
+        "SELECT b.within_days, count(*) AS batches, "
+        "  count(DISTINCT b.hospital_id) AS hospitals, "
+        "  sum(b.current_stock) AS units, "
+        "  coalesce(sum(b.current_stock * p.price), 0) AS value, "
+        "  count(*) FILTER (WHERE p.price IS NULL) AS unpriced_batches, "
+        "  now() AS refreshed_at "
+        "FROM batch AS b LEFT JOIN price AS p ON p.product_id = b.product_id "
+        "GROUP BY b.within_days",
+        "within_days",
+        None,
+    ),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, (query, unique, extra) in VIEWS.items():
+        op.execute(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {query}")
+        op.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {name}_key ON {name} ({unique})")
+        if extra:
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name}_rank ON {name} ({extra})")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in VIEWS:
+        op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {name}")
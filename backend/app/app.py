@@ -1,16 +1,102 @@
 from fastapi import FastAPI, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from db.db import Base, engine, get_db
+from db.db import Base, SessionLocal, engine, get_db, pool_metrics
 from models.models import Hospital, DrugApplication
 from typing import List
+from contextlib import asynccontextmanager
+import asyncio
+import logging
 import random
 import uuid
 
+from config.config import settings
 from routers.medicines import router as medicines_router
 from routers.suppliers import router as suppliers_router
+from routers.hospitals import router as hospitals_router
+from routers.redistribution import router as redistribution_router
+from routers.usage import router as usage_router
+from routers.inventory import router as inventory_router
+from routers.dashboard import router as dashboard_router
+from routers.reorder import router as reorder_router
+from services.dashboard import refresh_views
+from services.forecasting import update_forecasts
+from services.ingest import usage_ingestor
+from services.nearby import hospital_index
+from services.stock_summary import refresh_expired
+from services.typeahead import typeahead_index
+from services.usage_store import ensure_partitions
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+
+def _with_session(fn):
+    """Run ``fn(db)`` on a fresh session (for startup/background jobs)."""
+    db = SessionLocal()
+    try:
+        return fn(db)
+    finally:
+        db.close()
+
+
+async def _every(seconds: int, fn):
+    """Call blocking ``fn(db)`` in the threadpool every *seconds*."""
+    while True:
+        await asyncio.sleep(seconds)
+        try:
+            await run_in_threadpool(_with_session, fn)
+        except Exception:
+            logger.exception("background refresh %s failed", fn)
+
+
+# ── Startup / shutdown ────────────────────────────────────────────────────
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await run_in_threadpool(_with_session, typeahead_index.build)
+    except Exception:
+        # serve anyway; /suggest answers 503 until the next refresh succeeds
+        logger.exception("typeahead index build failed")
+    try:
+        await run_in_threadpool(_with_session, hospital_index.build)
+    except Exception:
+        # /nearby falls back to the database until the next refresh succeeds
+        logger.exception("hospital index build failed")
+
+    try:
+        await run_in_threadpool(_with_session, ensure_partitions)
+    except Exception:
+        # logs for months without a partition land in usage_logs_default
+        logger.exception("usage_logs partition check failed")
+    usage_ingestor.start()
+
+    tasks = [
+        asyncio.create_task(
+            _every(settings.TYPEAHEAD_REFRESH_SECONDS, typeahead_index.refresh)
+        ),
+        asyncio.create_task(
+            _every(settings.HOSPITAL_INDEX_REFRESH_SECONDS, hospital_index.refresh)
+        ),
+        asyncio.create_task(
+            _every(settings.FORECAST_REFRESH_SECONDS, update_forecasts)
+        ),
+        asyncio.create_task(_every(24 * 3600, ensure_partitions)),
+        asyncio.create_task(
+            _every(settings.INVENTORY_EXPIRY_REFRESH_SECONDS, refresh_expired)
+        ),
+        asyncio.create_task(
+            _every(settings.DASHBOARD_REFRESH_SECONDS, refresh_views)
+        ),
+    ]
+    yield
+    for task in tasks:
+        task.cancel()
+    # flush buffered usage events before the worker exits
+    await run_in_threadpool(usage_ingestor.stop)
+
+
+app = FastAPI(lifespan=lifespan)
 
 # ── CORS (allow frontend dev server) ──────────────────────────────────────
 app.add_middleware(
@@ -24,6 +110,12 @@ app.add_middleware(
 # ── Register routers ──────────────────────────────────────────────────────
 app.include_router(medicines_router)
 app.include_router(suppliers_router)
+app.include_router(hospitals_router)
+app.include_router(redistribution_router)
+app.include_router(usage_router)
+app.include_router(inventory_router)
+app.include_router(dashboard_router)
+app.include_router(reorder_router)
 
 @app.post("/test/add-random-hospital")
 def add_random_hospital(db: Session = Depends(get_db)):
@@ -62,6 +154,14 @@ def add_random_hospital(db: Session = Depends(get_db)):
 	data = {c.name: getattr(hospital, c.name) for c in hospital.__table__.columns}
 	return data
 
+@app.get("/health/db-pool")
+def db_pool_health():
+    return pool_metrics()
+
+@app.get("/health/usage-ingest")
+def usage_ingest_health():
+    return usage_ingestor.metrics()
+
 @app.get("/gethospital")
 def get_hospitals(db:Session = Depends(get_db)):
     hospital =  db.query(DrugApplication).count()
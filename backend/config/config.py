@@ -6,4 +6,71 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     OPENFDA_API_KEY: str
 
+    # serve the API through an asyncpg engine + AsyncSession instead of
+    # psycopg2 in the threadpool; ASYNC_DATABASE_URL defaults to
+    # DATABASE_URL with the driver swapped to postgresql+asyncpg
+    DB_ASYNC: bool = False
+    ASYNC_DATABASE_URL: str | None = None
+
+    # engine profile (db/db.py); size POOL_SIZE + MAX_OVERFLOW per worker
+    # against Postgres max_connections
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30        # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800      # seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int | None = None
+    # behind PgBouncer (transaction pooling): no app-side pool, no startup
+    # options, no asyncpg statement cache
+    DB_EXTERNAL_POOLER: bool = False
+
+    # seconds an estimated listing total (?count=estimate) is reused
+    COUNT_ESTIMATE_TTL_SECONDS: int = 60
+
+    # how often the in-memory medicine name index picks up catalog changes
+    TYPEAHEAD_REFRESH_SECONDS: int = 300
+    # how far each refresh re-reads updated_at before the previous one, for
+    # catalog writes that were in flight while it ran
+    TYPEAHEAD_WATERMARK_LAG_SECONDS: int = 600
+
+    # how often the in-memory nearest-hospital index checks for changes
+    HOSPITAL_INDEX_REFRESH_SECONDS: int = 300
+
+    # stock-out forecasting (services/forecasting.py): EWMA smoothing
+    # factor, days of usage history read by a full run, and the lead time
+    # assumed for inventory rows that do not set one
+    FORECAST_ALPHA: float = 0.3
+    FORECAST_HISTORY_DAYS: int = 120
+    FORECAST_DEFAULT_LEAD_TIME_DAYS: int = 7
+    # how often the app folds new usage logs into the forecasts
+    FORECAST_REFRESH_SECONDS: int = 60
+
+    # POST /api/usage-logs (services/ingest.py): flush when this many
+    # events are buffered or the oldest has waited MAX_DELAY_MS; answer
+    # 503 once MAX_PENDING are waiting; at most MAX_EVENTS per request
+    USAGE_INGEST_BATCH_SIZE: int = 5000
+    USAGE_INGEST_MAX_DELAY_MS: int = 50
+    USAGE_INGEST_MAX_PENDING: int = 100_000
+    USAGE_INGEST_MAX_EVENTS: int = 10_000
+
+    # monthly usage_logs partitions kept ready beyond the current month
+    USAGE_PARTITION_MONTHS_AHEAD: int = 3
+
+    # how often inventory summaries are recomputed for batches that expired
+    INVENTORY_EXPIRY_REFRESH_SECONDS: int = 3600
+    # how long a hospital's in-memory FEFO batch heaps are trusted
+    FEFO_CACHE_TTL_SECONDS: int = 300
+
+    # how often the dashboard materialized views are refreshed
+    DASHBOARD_REFRESH_SECONDS: int = 300
+
+    # response cache for catalog detail endpoints (see services/cache.py);
+    # CACHE_URL (redis://...) shares it across workers and loaders
+    CACHE_URL: str | None = None
+    # redis calls slower than this count as failures (cache miss)
+    CACHE_TIMEOUT_SECONDS: float = 0.5
+    CACHE_TTL_SECONDS: int = 300
+    CACHE_MAX_ENTRIES: int = 4096
+
 settings = Settings()
\ No newline at end of file
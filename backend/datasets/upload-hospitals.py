@@ -1,17 +1,53 @@
+"""
+upload-hospitals.py
+───────────────────
+Loads a random sample of the US hospitals dataset into ``hospitals``.
+
+Records are flattened into columns once, validated column-wise over the
+whole sample with numpy (coordinates, required name, VARCHAR limits), and
+the clean rows are streamed into Postgres with ``COPY ... FROM STDIN``.
+Rejected rows are reported per reason.
+"""
+
+import csv
+import io
 import json
 import random
+import sys
+from collections import Counter
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
+
+import numpy as np
+
+# ── ensure backend root is importable ──────────────────────────────────────
+HERE = Path(__file__).resolve()
+BACKEND_ROOT = HERE.parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
 
-from sqlalchemy.orm import Session
 from sqlalchemy import String
+from sqlalchemy.orm import Session
 
 from db.db import SessionLocal
 from models.models import Hospital
+from services.geo import geohash_encode_many
 
 
 DATA_PATH = Path(__file__).parent / "us-hospitals.json"
 
+# source field -> Hospital column (only columns that exist on the model)
+STRING_FIELDS = {
+    "phone": "telephone",
+    "address_line1": "address",
+    "address_line2": "address2",
+    "city": "city",
+    "state": "state",
+}
+COPY_COLUMNS = (
+    "name", *STRING_FIELDS, "zipCode", "latitude", "longitude", "geohash", "is_active",
+)
+
 
 # --------------------------------------------------
 # Helpers
@@ -26,12 +62,6 @@ def safe_float(value: Any) -> Optional[float]:
         return None
 
 
-def is_valid_lat_lon(lat: Optional[float], lon: Optional[float]) -> bool:
-    if lat is None or lon is None:
-        return False
-    return -90 <= lat <= 90 and -180 <= lon <= 180
-
-
 def get_column_string_limits(model) -> dict[str, int]:
     """
     Dynamically extract VARCHAR limits from SQLAlchemy model.
@@ -46,16 +76,8 @@ def get_column_string_limits(model) -> dict[str, int]:
 COLUMN_LIMITS = get_column_string_limits(Hospital)
 
 
-def enforce_string_limits(data: dict[str, Any]) -> bool:
-    """
-    Return False if any string field exceeds DB limit.
-    """
-    for field, max_len in COLUMN_LIMITS.items():
-        value = data.get(field)
-        if value and isinstance(value, str):
-            if len(value) > max_len:
-                return False
-    return True
+def _text(value: Any) -> str:
+    return value.strip() if isinstance(value, str) else ""
 
 
 # --------------------------------------------------
@@ -85,56 +107,138 @@ def load_hospitals() -> list[dict[str, Any]]:
 
 
 # --------------------------------------------------
-# Record Mapping with Full Validation
+# Column-wise extraction and validation
 # --------------------------------------------------
 
-def map_record_to_hospital(rec: dict[str, Any]) -> Optional[dict[str, Any]]:
-    if not isinstance(rec, dict):
-        return None
-
-    name = rec.get("name") or rec.get("alt_name")
-    if not name or not isinstance(name, str) or not name.strip():
-        return None
-
-    # Extract coordinates safely
-    gp = rec.get("geo_point") or {}
-    geo_shape = rec.get("geo_shape") or {}
-    geometry = geo_shape.get("geometry") or {}
-    coords = geometry.get("coordinates") or [None, None]
-
-    lon = gp.get("lon") if isinstance(gp, dict) else None
-    lat = gp.get("lat") if isinstance(gp, dict) else None
-
-    if lon is None and isinstance(coords, (list, tuple)) and len(coords) >= 2:
-        lon = coords[0]
-    if lat is None and isinstance(coords, (list, tuple)) and len(coords) >= 2:
-        lat = coords[1]
-
-    lat = safe_float(lat)
-    lon = safe_float(lon)
+def _coordinates(rec: dict[str, Any]) -> tuple[Any, Any]:
+    """(lat, lon) from geo_point, falling back to the GeoJSON geometry."""
+    gp = rec.get("geo_point")
+    gp = gp if isinstance(gp, dict) else {}
+    geometry = (rec.get("geo_shape") or {}).get("geometry") or {}
+    coords = geometry.get("coordinates")
+    coords = coords if isinstance(coords, (list, tuple)) and len(coords) >= 2 else (None, None)
+    lat = gp.get("lat")
+    lon = gp.get("lon")
+    return (coords[1] if lat is None else lat), (coords[0] if lon is None else lon)
+
+
+def extract_columns(records: list[Any]) -> dict[str, np.ndarray]:
+    """Flatten raw records into one array per Hospital column."""
+    recs = [rec if isinstance(rec, dict) else {} for rec in records]
+    lat_lon = [_coordinates(rec) for rec in recs]
+
+    cols = {
+        "is_object": np.array([isinstance(rec, dict) for rec in records], dtype=bool),
+        "name": np.array(
+            [_text(rec.get("name")) or _text(rec.get("alt_name")) for rec in recs], dtype=str
+        ),
+        "latitude": np.array(
+            [np.nan if (v := safe_float(lat)) is None else v for lat, _ in lat_lon], dtype=float
+        ),
+        "longitude": np.array(
+            [np.nan if (v := safe_float(lon)) is None else v for _, lon in lat_lon], dtype=float
+        ),
+        "zip": np.array([str(rec.get("zip") or "").strip() for rec in recs], dtype=str),
+    }
+    for column, field in STRING_FIELDS.items():
+        cols[column] = np.array([_text(rec.get(field)) for rec in recs], dtype=str)
+    return cols
 
-    if not is_valid_lat_lon(lat, lon):
-        return None
 
-    mapped = {
-        "name": name.strip(),
-        "email": None,
-        "phone": rec.get("telephone"),
-        "address_line1": rec.get("address"),
-        "address_line2": rec.get("address2"),
-        "city": rec.get("city"),
-        "state": rec.get("state"),
-        "country": rec.get("country"),
-        "postal_code": rec.get("zip"),
-        "latitude": lat,
-        "longitude": lon,
-        "is_active": True,
+def validate(cols: dict[str, np.ndarray]) -> tuple[np.ndarray, Counter]:
+    """
+    Returns (keep mask, rejections by reason).  A row rejected for several
+    reasons is counted under each of them.
+    """
+    lat, lon = cols["latitude"], cols["longitude"]
+    checks = {
+        "not_an_object": ~cols["is_object"],
+        "missing_name": np.char.str_len(cols["name"]) == 0,
+        "bad_coordinates": ~(
+            np.isfinite(lat) & np.isfinite(lon)
+            & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        ),
     }
+    for column in ("name", *STRING_FIELDS):
+        if column in COLUMN_LIMITS and cols[column].size:
+            checks[f"too_long:{column}"] = np.char.str_len(cols[column]) > COLUMN_LIMITS[column]
+
+    rejected = np.zeros(lat.shape, dtype=bool)
+    reasons: Counter = Counter()
+    for reason, bad in checks.items():
+        rejected |= bad
+        if n := int(bad.sum()):
+            reasons[reason] = n
+    return ~rejected, reasons
+
+
+def zip_codes(raw: np.ndarray) -> np.ndarray:
+    """ZIP / ZIP+4 strings -> int5 (``-1`` where unparseable, written as NULL)."""
+    if not raw.size:
+        return np.zeros(0, dtype=np.int64)
+    head = np.char.partition(raw, "-")[:, 0]
+    ok = np.char.isdigit(head) & (np.char.str_len(head) <= 5)
+    out = np.full(raw.shape, -1, dtype=np.int64)
+    out[ok] = head[ok].astype(np.int64)
+    return out
 
-    if not enforce_string_limits(mapped):
-        return None
 
-    return mapped
+# --------------------------------------------------
+# COPY
+# --------------------------------------------------
+
+def iter_rows(cols: dict[str, np.ndarray], keep: np.ndarray) -> Iterator[tuple]:
+    """Clean rows in COPY_COLUMNS order; empty strings become NULL."""
+    zips = zip_codes(cols["zip"][keep])
+    strings = [cols[c][keep].tolist() for c in ("name", *STRING_FIELDS)]
+    lat = cols["latitude"][keep]
+    lon = cols["longitude"][keep]
+    geohashes = geohash_encode_many(lat, lon).tolist()
+    lat, lon = lat.tolist(), lon.tolist()
+    for i, z in enumerate(zips.tolist()):
+        yield (
+            *(s[i] or None for s in strings),
+            z if z >= 0 else None,
+            lat[i],
+            lon[i],
+            geohashes[i],
+            True,
+        )
+
+
+class _CsvStream:
+    """File-like ``read()`` over CSV-encoded rows, so COPY pulls rows lazily."""
+
+    def __init__(self, rows: Iterator[tuple]) -> None:
+        self.rows = rows
+        self.buf = ""
+        self._out = io.StringIO()
+        self._writer = csv.writer(self._out, lineterminator="\n")
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self.buf) + self._out.tell() < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self._writer.writerow(row)
+        if self._out.tell():
+            self.buf += self._out.getvalue()
+            self._out.seek(0)
+            self._out.truncate()
+        if size < 0:
+            size = len(self.buf)
+        out, self.buf = self.buf[:size], self.buf[size:]
+        return out
+
+
+def copy_hospitals(db: Session, rows: Iterator[tuple]) -> None:
+    conn = db.connection()
+    columns = ", ".join(f'"{c}"' for c in COPY_COLUMNS)
+    with conn.connection.driver_connection.cursor() as cur:
+        cur.copy_expert(
+            f"COPY hospitals ({columns}) FROM STDIN WITH (FORMAT csv)",
+            _CsvStream(rows),
+        )
 
 
 # --------------------------------------------------
@@ -151,30 +255,23 @@ def insert_random_hospitals(n: int = 3000):
     n = min(n, len(records))
     sampled = random.sample(records, n)
 
-    valid_records = []
-    skipped = 0
-
-    for rec in sampled:
-        try:
-            mapped = map_record_to_hospital(rec)
-            if mapped:
-                valid_records.append(mapped)
-            else:
-                skipped += 1
-        except Exception:
-            skipped += 1
+    cols = extract_columns(sampled)
+    keep, reasons = validate(cols)
+    valid = int(keep.sum())
 
-    if not valid_records:
+    if not valid:
         print("No valid records to insert.")
         return
 
     db: Session = SessionLocal()
 
     try:
-        db.bulk_insert_mappings(Hospital, valid_records)
+        copy_hospitals(db, iter_rows(cols, keep))
         db.commit()
-        print(f"Inserted {len(valid_records)} hospital records")
-        print(f"Skipped {skipped} corrupted/invalid records")
+        print(f"Inserted {valid} hospital records")
+        print(f"Skipped {n - valid} invalid records")
+        for reason, count in reasons.most_common():
+            print(f"  {reason:<24} {count}")
     except Exception as e:
         db.rollback()
         print(f"Database error occurred: {e}")
@@ -187,4 +284,4 @@ def insert_random_hospitals(n: int = 3000):
 # --------------------------------------------------
 
 if __name__ == "__main__":
-    insert_random_hospitals(3000)
\ No newline at end of file
+    insert_random_hospitals(int(sys.argv[1]) if len(sys.argv) > 1 else 3000)
@@ -0,0 +1,217 @@
+"""
+upload-parallel.py
+──────────────────
+Parallel driver for the FDA drugs load (see upload.py) for full-dataset
+runs.  Three phases:
+
+  1. pre-pass   — stream the JSON once in this process: resolve every
+                  DrugApplication and Supplier (the rows all workers
+                  share), decide which record owns each product NDC, and
+                  partition records by application_number into temporary
+                  NDJSON files.  Shared rows are committed before phase 2.
+  2. workers    — a process pool runs one BulkLoader per partition, seeded
+                  with the shared id maps and the NDCs owned by other
+                  partitions, so workers never write the same row twice.
+                  Each partition commits independently.
+  3. merge      — aggregate the per-partition counts, ANALYZE the loaded
+                  tables and invalidate the catalog cache.
+
+If a worker fails the partitions that finished stay committed; re-run with
+``--sync`` to converge (the upsert path is idempotent).
+
+    python datasets/upload-parallel.py [N | all] [--sync] [--workers W]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from pathlib import Path
+
+# ── ensure backend root is importable ──────────────────────────────────────
+HERE = Path(__file__).resolve()
+BACKEND_ROOT = HERE.parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from sqlalchemy import text
+from db.db import SessionLocal, engine
+from services.cache import CATALOG, response_cache
+from datasets.upload import DATA_PATH, BATCH_SIZE, BulkLoader, batched, load_filtered, product_ndcs
+
+LOADED_TABLES = (
+    "drug_applications",
+    "drug_products",
+    "drug_ingredients",
+    "suppliers",
+    "supplier_products",
+)
+
+
+def partition_of(rec: dict, partitions: int) -> int:
+    # crc32 rather than hash(): stable across processes and runs
+    return zlib.crc32(rec.get("application_number", "").encode("utf-8")) % partitions
+
+
+# ── phase 1: pre-pass ──────────────────────────────────────────────────────
+def prepare(limit: int | None, partitions: int, workdir: Path, sync: bool):
+    """
+    Resolve shared rows and write the partition files; returns
+    (paths, app_ids, supplier_ids, ndc_owner, shared_counts).
+    """
+    paths = [workdir / f"part-{i:03d}.ndjson" for i in range(partitions)]
+    files = [p.open("w", encoding="utf-8") for p in paths]
+    ndc_owner: dict[str, int] = {}
+
+    db = SessionLocal()
+    loader = BulkLoader(db, sync=sync)
+    try:
+        for batch in batched(load_filtered(DATA_PATH, limit), BATCH_SIZE):
+            loader.resolve(batch)
+            for rec in batch:
+                part = partition_of(rec, partitions)
+                for ndc in product_ndcs(rec):
+                    if ndc:
+                        ndc_owner.setdefault(ndc, part)   # first record wins, as in upload.py
+                files[part].write(json.dumps(rec, separators=(",", ":")) + "\n")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        for f in files:
+            f.close()
+
+    shared = {
+        "counts": loader.counts,
+        "updated": loader.updated,
+    }
+    return paths, loader.app_ids, loader.supplier_ids, ndc_owner, shared
+
+
+# ── phase 2: workers ───────────────────────────────────────────────────────
+def _init_worker() -> None:
+    # forked children must not reuse the parent's pooled connections
+    engine.dispose(close=False)
+
+
+def _read_partition(path: Path):
+    with path.open(encoding="utf-8") as fh:
+        for line in fh:
+            yield json.loads(line)
+
+
+def load_partition(path: Path, sync: bool, app_ids: dict, supplier_ids: dict,
+                   foreign_ndcs: set) -> dict:
+    db = SessionLocal()
+    loader = BulkLoader(db, sync=sync)
+    loader.app_ids = app_ids
+    loader.supplier_ids = supplier_ids
+    loader.seen_ndcs = foreign_ndcs
+    try:
+        loader.load(_read_partition(path))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return {
+        "counts": loader.counts,
+        "updated": loader.updated,
+        "unchanged": loader.unchanged,
+        "skipped_without_ndc": loader.skipped_without_ndc,
+    }
+
+
+# ── phase 3: merge ─────────────────────────────────────────────────────────
+def merge(results: list[dict]) -> dict:
+    total = {"counts": {}, "updated": {}, "unchanged": 0, "skipped_without_ndc": 0}
+    for res in results:
+        for group in ("counts", "updated"):
+            for k, v in res.get(group, {}).items():
+                total[group][k] = total[group].get(k, 0) + v
+        total["unchanged"] += res.get("unchanged", 0)
+        total["skipped_without_ndc"] += res.get("skipped_without_ndc", 0)
+    return total
+
+
+def analyze() -> None:
+    with engine.begin() as conn:
+        conn.execute(text(f"ANALYZE {', '.join(LOADED_TABLES)}"))
+
+
+def upload_drugs_parallel(limit: int | None = None, sync: bool = False,
+                          workers: int | None = None) -> None:
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+
+    with tempfile.TemporaryDirectory(prefix="fda-parts-") as tmp:
+        paths, app_ids, supplier_ids, ndc_owner, shared = prepare(
+            limit, workers, Path(tmp), sync
+        )
+        prepared = time.perf_counter()
+        engine.dispose()   # nothing pooled may cross the fork
+
+        results = [shared]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [
+                pool.submit(
+                    load_partition, path, sync, app_ids, supplier_ids,
+                    {ndc for ndc, owner in ndc_owner.items() if owner != part},
+                )
+                for part, path in enumerate(paths)
+                if path.stat().st_size
+            ]
+            done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+            for fut in pending:
+                fut.cancel()
+            failed = [fut.exception() for fut in done if fut.exception()]
+            if failed:
+                raise RuntimeError(
+                    f"{len(failed)} partition(s) failed; finished partitions are "
+                    f"committed — re-run with --sync to converge"
+                ) from failed[0]
+            results += [fut.result() for fut in futures]
+
+    total = merge(results)
+    analyze()
+    if any(total["counts"].values()) or any(total["updated"].values()):
+        response_cache.invalidate(CATALOG)   # cached detail pages are stale now
+
+    elapsed = time.perf_counter() - started
+    c = total["counts"]
+    rows = sum(c.values()) + sum(total["updated"].values())
+    print(
+        f"Done — inserted {c['applications']} applications, "
+        f"{c['products']} products, "
+        f"{c['ingredients']} ingredients, "
+        f"{c['suppliers']} suppliers, "
+        f"{c['links']} supplier↔product links "
+        f"over {len(results) - 1} partitions in {elapsed:.2f}s "
+        f"(pre-pass {prepared - started:.2f}s, {rows / elapsed:,.0f} rows/sec)"
+    )
+    if sync:
+        print(
+            f"Sync — updated {total['updated']['applications']} applications, "
+            f"{total['updated']['products']} products; "
+            f"{total['unchanged']} products unchanged, "
+            f"{total['skipped_without_ndc']} skipped (no NDC)"
+        )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    workers = None
+    if "--workers" in args:
+        i = args.index("--workers")
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+    sync = "--sync" in args
+    args = [a for a in args if a != "--sync"]
+    arg = args[0] if args else "all"
+    upload_drugs_parallel(None if arg == "all" else int(arg), sync=sync, workers=workers)
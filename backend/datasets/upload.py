@@ -2,8 +2,9 @@
 """
 upload-drugs.py
 ───────────────
-Reads the FDA drugs JSON, takes the first 1000 filtered records (those with
-manufacturer_name present), and bulk-inserts:
+Streams the FDA drugs JSON one record at a time, takes the first 1000
+filtered records (those with manufacturer_name present; pass ``all`` on the
+command line for every record), and bulk-inserts:
 
   • DrugApplication  (one per application_number)
   • DrugProduct      (one per product × NDC combo)
@@ -11,13 +12,21 @@ manufacturer_name present), and bulk-inserts:
   • Supplier         (deduplicated by manufacturer name)
   • SupplierProduct  (links every supplier ↔ product)
 
-All inserts happen in a single transaction.
+Rows are written set-wise, BATCH_SIZE records at a time (see BulkLoader),
+and all inserts happen in a single transaction.
+
+``--sync`` re-runs the load against a populated database: existing rows are
+upserted on their natural keys and unchanged products are skipped by
+content hash, so a weekly FDA refresh only writes what changed.
 """
 
+import hashlib
 import json
 import sys
+import time
+from itertools import chain, islice
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator, TextIO
 
 # ── ensure backend root is importable ──────────────────────────────────────
 HERE = Path(__file__).resolve()
@@ -25,8 +34,11 @@ BACKEND_ROOT = HERE.parents[1]
 if str(BACKEND_ROOT) not in sys.path:
     sys.path.insert(0, str(BACKEND_ROOT))
 
+from sqlalchemy import delete, func, insert, literal_column, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from db.db import SessionLocal
+from services.cache import CATALOG, response_cache
 from models.models import (
     DrugApplication,
     DrugProduct,
@@ -38,126 +50,466 @@ from models.models import (
 DATA_PATH = HERE.parent / "drug-drugsfda-0001-of-0001.json"
 
 
-# ── helpers ────────────────────────────────────────────────────────────────
-def load_filtered(path: Path, limit: int = 1000) -> list[dict[str, Any]]:
-    """Return first *limit* records that carry manufacturer_name."""
+# ── incremental JSON reader ────────────────────────────────────────────────
+READ_SIZE = 1 << 20   # characters read from disk at a time
+
+
+class _JsonStream:
+    """
+    Minimal pull parser over a file: walks the top-level object and the
+    ``results`` array token by token, decoding one element at a time with
+    ``JSONDecoder.raw_decode`` so only the current item is ever in memory.
+    """
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, fh: TextIO) -> None:
+        self.fh = fh
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fh.read(READ_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk     # drop what was consumed
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} at offset {self.pos} of buffer")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # a number/literal ending exactly at the buffer edge may be cut short
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_results(path: Path) -> Iterator[dict[str, Any]]:
+    """Yield the items of the top-level ``results`` array one by one."""
     with path.open("r", encoding="utf-8") as fh:
-        raw = json.load(fh)
-    filtered = [
+        stream = _JsonStream(fh)
+        stream.expect("{")
+        while stream.peek() not in ("}", ""):
+            key = stream.value()
+            stream.expect(":")
+            if key != "results":
+                stream.value()                      # e.g. "meta" — skip
+            else:
+                stream.expect("[")
+                while stream.peek() != "]":
+                    yield stream.value()
+                    if stream.peek() == ",":
+                        stream.pos += 1
+                stream.pos += 1
+            if stream.peek() == ",":
+                stream.pos += 1
+
+
+# ── helpers ────────────────────────────────────────────────────────────────
+def load_filtered(path: Path, limit: int | None = 1000) -> Iterator[dict[str, Any]]:
+    """
+    Lazily yield the first *limit* records that carry manufacturer_name
+    (all of them when *limit* is None); reading stops as soon as the limit
+    is reached.
+    """
+    filtered = (
         item
-        for item in raw["results"]
+        for item in iter_results(path)
         if item.get("openfda", {}).get("manufacturer_name")
-    ]
-    return filtered[:limit]
+    )
+    return islice(filtered, limit)
 
 
-def upload_drugs(limit: int = 1000) -> None:
-    records = load_filtered(DATA_PATH, limit)
-    if not records:
-        print("no records found in dataset")
-        return
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
 
-    db: Session = SessionLocal()
 
-    # ── de-duplication caches (keyed on the natural unique value) ──────────
-    app_cache: dict[str, DrugApplication] = {}   # application_number -> obj
-    supplier_cache: dict[str, Supplier] = {}      # manufacturer name   -> obj
-    seen_ndcs: set[str] = set()                   # avoid duplicate product_ndc
-    seen_sp: set[tuple[int, int]] = set()         # (supplier_id, product_id)
+# ── set-based loader ───────────────────────────────────────────────────────
+BATCH_SIZE = 500   # FDA records staged per round of bulk statements
 
-    try:
-        for rec in records:
-            ofd: dict = rec.get("openfda") or {}
-            app_number: str = rec.get("application_number", "")
 
-            # ── 1. DrugApplication ─────────────────────────────────────────
-            if app_number and app_number not in app_cache:
-                app_obj = DrugApplication(
-                    application_number=app_number,
-                    sponsor_name=rec.get("sponsor_name"),
-                )
-                db.add(app_obj)
-                db.flush()                       # get app_obj.id
-                app_cache[app_number] = app_obj
-            app_obj = app_cache.get(app_number)
+def content_hash(product: dict, application_number: str,
+                 ingredients: list[dict], mfr_names: list[str]) -> str:
+    """Fingerprint of everything the loader writes for one product."""
+    payload = {
+        "product": {k: v for k, v in product.items() if k != "application_id"},
+        "application_number": application_number,
+        "ingredients": ingredients,
+        "suppliers": sorted({m.strip() for m in mfr_names if m.strip()}),
+    }
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
-            # ── 2. Suppliers (from manufacturer_name list) ─────────────────
-            mfr_names: list[str] = ofd.get("manufacturer_name") or []
-            for mfr in mfr_names:
+
+def product_ndcs(rec: dict[str, Any]) -> Iterator[str | None]:
+    """The NDC each of *rec*'s products is stored under (round-robin from openfda)."""
+    ndcs = (rec.get("openfda") or {}).get("product_ndc") or []
+    for idx, _ in enumerate(rec.get("products") or []):
+        yield ndcs[idx] if idx < len(ndcs) else (ndcs[0] if ndcs else None)
+
+
+class BulkLoader:
+    """
+    Loads FDA records in batches of BATCH_SIZE.  Each batch costs a handful
+    of multi-row ``INSERT ... RETURNING`` statements (applications,
+    suppliers, products) whose returned ids are matched back to the staged
+    rows, followed by set-wise inserts of ingredients and supplier↔product
+    links — instead of one flush per new row.
+
+    ``sync=True`` makes the load idempotent against a populated database
+    (Postgres only): applications and products are upserted with
+    ``ON CONFLICT`` on ``application_number`` / ``product_ndc``, products
+    whose ``content_hash`` is unchanged are skipped before any write, and
+    ``updated_at`` only moves for rows that really changed.  Products
+    without an NDC have no natural key and are skipped in this mode.
+    """
+
+    def __init__(self, db: Session, sync: bool = False) -> None:
+        self.db = db
+        self.sync = sync
+        # ── de-duplication caches (keyed on the natural unique value) ──────
+        self.app_ids: dict[str, int] = {}        # application_number -> id
+        self.supplier_ids: dict[str, int] = {}   # manufacturer name   -> id
+        self.seen_ndcs: set[str] = set()         # avoid duplicate product_ndc
+        self.seen_sp: set[tuple[int, int]] = set()   # (supplier_id, product_id)
+        self.counts = {
+            "applications": 0,
+            "products": 0,
+            "ingredients": 0,
+            "suppliers": 0,
+            "links": 0,
+        }
+        # sync mode only
+        self.updated = {"applications": 0, "products": 0}
+        self.unchanged = 0
+        self.skipped_without_ndc = 0
+
+    def load(self, records: Iterable[dict[str, Any]]) -> None:
+        for batch in batched(records, BATCH_SIZE):
+            self._load_batch(batch)
+
+    @property
+    def changed(self) -> bool:
+        return any(self.counts.values()) or any(self.updated.values())
+
+    def _insert_returning(self, model, key_col, rows: list[dict]) -> list:
+        """Multi-row INSERT; returns (id, key) in the order of *rows*."""
+        if not rows:
+            return []
+        stmt = insert(model).returning(
+            model.id, key_col, sort_by_parameter_order=True
+        )
+        return self.db.execute(stmt, rows).all()
+
+    def _upsert_returning(self, model, key_col, rows: list[dict], set_cols, extra=None) -> list:
+        """
+        Multi-row ``INSERT ... ON CONFLICT (key) DO UPDATE`` that only touches
+        rows whose *set_cols* differ; returns (id, key, inserted) for every
+        row inserted or updated.
+        """
+        if not rows:
+            return []
+        stmt = pg_insert(model.__table__)
+        changed = or_(*(
+            model.__table__.c[col].is_distinct_from(stmt.excluded[col])
+            for col in set_cols
+        ))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[key_col.name],
+            set_={**{col: stmt.excluded[col] for col in set_cols}, **(extra or {})},
+            where=changed,
+        ).returning(
+            model.__table__.c.id,
+            model.__table__.c[key_col.name],
+            literal_column("(xmax = 0)").label("inserted"),
+        )
+        return self.db.execute(stmt, rows).all()
+
+    # ── 1. DrugApplications ────────────────────────────────────────────────
+    def _resolve_applications(self, batch: list[dict[str, Any]]) -> None:
+        wanted: dict[str, dict] = {}
+        for rec in batch:
+            app_number = rec.get("application_number", "")
+            if app_number and app_number not in self.app_ids:
+                wanted.setdefault(app_number, {
+                    "application_number": app_number,
+                    "sponsor_name": rec.get("sponsor_name"),
+                })
+        if not wanted:
+            return
+
+        if not self.sync:
+            for app_id, app_number in self._insert_returning(
+                DrugApplication, DrugApplication.application_number, list(wanted.values())
+            ):
+                self.app_ids[app_number] = app_id
+            self.counts["applications"] += len(wanted)
+            return
+
+        existing = self.db.execute(
+            select(
+                DrugApplication.id,
+                DrugApplication.application_number,
+                DrugApplication.sponsor_name,
+            ).where(DrugApplication.application_number.in_(wanted))
+        ).all()
+        for app_id, app_number, sponsor in existing:
+            self.app_ids[app_number] = app_id
+            if wanted[app_number]["sponsor_name"] == sponsor:
+                del wanted[app_number]
+        for app_id, app_number, inserted in self._upsert_returning(
+            DrugApplication, DrugApplication.application_number,
+            list(wanted.values()), set_cols=("sponsor_name",),
+        ):
+            self.app_ids[app_number] = app_id
+            if inserted:
+                self.counts["applications"] += 1
+            else:
+                self.updated["applications"] += 1
+
+    # ── 2. Suppliers (from manufacturer_name list) ─────────────────────────
+    def _resolve_suppliers(self, batch: list[dict[str, Any]]) -> None:
+        wanted: dict[str, dict] = {}
+        for rec in batch:
+            for mfr in (rec.get("openfda") or {}).get("manufacturer_name") or []:
                 mfr_key = mfr.strip()
-                if mfr_key and mfr_key not in supplier_cache:
-                    sup = Supplier(name=mfr_key, is_active=True)
-                    db.add(sup)
-                    db.flush()
-                    supplier_cache[mfr_key] = sup
+                if mfr_key and mfr_key not in self.supplier_ids:
+                    wanted.setdefault(mfr_key, {"name": mfr_key, "is_active": True})
+        if not wanted:
+            return
+
+        if self.sync:
+            # suppliers have no unique key; reuse the oldest row per name
+            for name, sup_id in self.db.execute(
+                select(Supplier.name, func.min(Supplier.id))
+                .where(Supplier.name.in_(wanted))
+                .group_by(Supplier.name)
+            ):
+                self.supplier_ids[name] = sup_id
+                del wanted[name]
+
+        for sup_id, name in self._insert_returning(
+            Supplier, Supplier.name, list(wanted.values())
+        ):
+            self.supplier_ids[name] = sup_id
+        self.counts["suppliers"] += len(wanted)
+
+    # ── 3. Products (staged with their children) ───────────────────────────
+    def _stage_products(self, batch: list[dict[str, Any]]) -> list[tuple[dict, list, list]]:
+        staged = []
+        for rec in batch:
+            ofd: dict = rec.get("openfda") or {}
+            app_number = rec.get("application_number", "")
+            app_id = self.app_ids.get(app_number)
+            mfr_names: list[str] = ofd.get("manufacturer_name") or []
 
             # ── shared openfda fields ──────────────────────────────────────
             generic_name = (ofd.get("generic_name") or [None])[0]
-            ndcs = ofd.get("product_ndc") or []
             rxcuis = ofd.get("rxcui") or []
             uniis = ofd.get("unii") or []
 
-            # ── 3. Products + Ingredients ──────────────────────────────────
-            products_raw: list[dict] = rec.get("products") or []
-            for idx, prod in enumerate(products_raw):
-                # pick an NDC for this product (round-robin from openfda list)
-                ndc = ndcs[idx] if idx < len(ndcs) else (ndcs[0] if ndcs else None)
-
+            for idx, (prod, ndc) in enumerate(zip(rec.get("products") or [], product_ndcs(rec))):
                 # skip if we already inserted a product with this NDC
-                if ndc and ndc in seen_ndcs:
+                if ndc and ndc in self.seen_ndcs:
                     continue
                 if ndc:
-                    seen_ndcs.add(ndc)
+                    self.seen_ndcs.add(ndc)
+                elif self.sync:
+                    self.skipped_without_ndc += 1
+                    continue
 
                 rxcui = rxcuis[idx] if idx < len(rxcuis) else (rxcuis[0] if rxcuis else None)
 
-                drug_product = DrugProduct(
-                    application_id=app_obj.id if app_obj else None,
-                    brand_name=prod.get("brand_name"),
-                    generic_name=generic_name,
-                    dosage_form=prod.get("dosage_form"),
-                    route=prod.get("route"),
-                    marketing_status=prod.get("marketing_status"),
-                    product_ndc=ndc,
-                    manufacturer_name=mfr_names[0] if mfr_names else None,
-                    rxcui=rxcui,
+                product = {
+                    "application_id": app_id,
+                    "brand_name": prod.get("brand_name"),
+                    "generic_name": generic_name,
+                    "dosage_form": prod.get("dosage_form"),
+                    "route": prod.get("route"),
+                    "marketing_status": prod.get("marketing_status"),
+                    "product_ndc": ndc,
+                    "manufacturer_name": mfr_names[0] if mfr_names else None,
+                    "rxcui": rxcui,
+                }
+                ingredients = [
+                    {
+                        "name": ai.get("name"),
+                        "strength": ai.get("strength"),
+                        "unii": uniis[0] if uniis else None,
+                    }
+                    for ai in prod.get("active_ingredients") or []
+                ]
+                product["content_hash"] = content_hash(
+                    product, app_number, ingredients, mfr_names
                 )
-                db.add(drug_product)
-                db.flush()  # get drug_product.id
-
-                # ── 3a. Ingredients ────────────────────────────────────────
-                for ai in prod.get("active_ingredients") or []:
-                    unii = uniis[0] if uniis else None
-                    ingredient = DrugIngredient(
-                        product_id=drug_product.id,
-                        name=ai.get("name"),
-                        strength=ai.get("strength"),
-                        unii=unii,
-                    )
-                    db.add(ingredient)
-
-                # ── 4. SupplierProduct links ───────────────────────────────
-                for mfr in mfr_names:
-                    mfr_key = mfr.strip()
-                    sup = supplier_cache.get(mfr_key)
-                    if not sup:
-                        continue
-                    pair = (sup.id, drug_product.id)
-                    if pair not in seen_sp:
-                        seen_sp.add(pair)
-                        db.add(SupplierProduct(
-                            supplier_id=sup.id,
-                            product_id=drug_product.id,
-                        ))
+                staged.append((product, ingredients, mfr_names))
+        return staged
+
+    def _write_products(self, staged) -> tuple[list[tuple[int, list, list]], list[int]]:
+        """Insert/upsert staged products; returns (written, updated_ids)."""
+        rows = [product for product, _, _ in staged]
+        if not self.sync:
+            ids = [
+                row[0]
+                for row in self._insert_returning(DrugProduct, DrugProduct.product_ndc, rows)
+            ]
+            self.counts["products"] += len(ids)
+            return [(pid, ing, mfr) for pid, (_, ing, mfr) in zip(ids, staged)], []
+
+        existing = dict(self.db.execute(
+            select(DrugProduct.product_ndc, DrugProduct.content_hash)
+            .where(DrugProduct.product_ndc.in_([r["product_ndc"] for r in rows]))
+        ).all())
+        pending = {
+            product["product_ndc"]: (ing, mfr)
+            for product, ing, mfr in staged
+            if existing.get(product["product_ndc"]) != product["content_hash"]
+        }
+        self.unchanged += len(staged) - len(pending)
+
+        written, updated_ids = [], []
+        for pid, ndc, inserted in self._upsert_returning(
+            DrugProduct, DrugProduct.product_ndc,
+            [r for r in rows if r["product_ndc"] in pending],
+            set_cols=[c for c in rows[0] if c != "product_ndc"],
+            extra={"updated_at": func.now()},
+        ):
+            written.append((pid, *pending[ndc]))
+            if inserted:
+                self.counts["products"] += 1
+            else:
+                self.updated["products"] += 1
+                updated_ids.append(pid)
+        return written, updated_ids
+
+    # ── 4. Ingredients + SupplierProduct links, set-wise ───────────────────
+    def _write_children(self, written, updated_ids: list[int]) -> None:
+        ingredient_rows: list[dict] = []
+        link_rows: list[dict] = []
+        for product_id, ingredients, mfr_names in written:
+            for ing in ingredients:
+                ingredient_rows.append({"product_id": product_id, **ing})
+            for mfr in mfr_names:
+                sup_id = self.supplier_ids.get(mfr.strip())
+                if sup_id is None:
+                    continue
+                pair = (sup_id, product_id)
+                if pair not in self.seen_sp:
+                    self.seen_sp.add(pair)
+                    link_rows.append({"supplier_id": sup_id, "product_id": product_id})
+
+        if updated_ids:
+            # changed products: replace ingredients, drop links to suppliers
+            # that no longer make them (kept links keep their price)
+            self.db.execute(
+                delete(DrugIngredient).where(DrugIngredient.product_id.in_(updated_ids))
+            )
+            updated = set(updated_ids)
+            keep = [
+                (r["product_id"], r["supplier_id"])
+                for r in link_rows if r["product_id"] in updated
+            ]
+            stale = delete(SupplierProduct).where(SupplierProduct.product_id.in_(updated_ids))
+            if keep:
+                stale = stale.where(
+                    tuple_(SupplierProduct.product_id, SupplierProduct.supplier_id).not_in(keep)
+                )
+            self.db.execute(stale)
+
+        if ingredient_rows:
+            self.db.execute(insert(DrugIngredient), ingredient_rows)
+        if link_rows and self.sync:
+            # most links of a changed product already exist
+            inserted = self.db.execute(
+                pg_insert(SupplierProduct.__table__)
+                .on_conflict_do_nothing(constraint="unique_supplier_product")
+                .returning(SupplierProduct.__table__.c.id),
+                link_rows,
+            ).all()
+            self.counts["links"] += len(inserted)
+        elif link_rows:
+            self.db.execute(insert(SupplierProduct), link_rows)
+            self.counts["links"] += len(link_rows)
+        self.counts["ingredients"] += len(ingredient_rows)
+
+    def resolve(self, batch: list[dict[str, Any]]) -> None:
+        """Write (or look up) the applications and suppliers *batch* refers to."""
+        self._resolve_applications(batch)
+        self._resolve_suppliers(batch)
+
+    def _load_batch(self, batch: list[dict[str, Any]]) -> None:
+        self.resolve(batch)
+        staged = self._stage_products(batch)
+        if staged:
+            self._write_children(*self._write_products(staged))
+
+
+def upload_drugs(limit: int | None = 1000, sync: bool = False) -> None:
+    records = load_filtered(DATA_PATH, limit)
+    first = next(records, None)
+    if first is None:
+        print("no records found in dataset")
+        return
+    records = chain([first], records)
+
+    db: Session = SessionLocal()
+    loader = BulkLoader(db, sync=sync)
+    started = time.perf_counter()
+
+    try:
+        loader.load(records)
 
         # ── commit everything in one shot ──────────────────────────────────
         db.commit()
+        if loader.changed:
+            response_cache.invalidate(CATALOG)   # cached detail pages are stale now
+
+        elapsed = time.perf_counter() - started
+        c = loader.counts
+        rows = sum(c.values()) + sum(loader.updated.values())
         print(
-            f"Done — inserted {len(app_cache)} applications, "
-            f"{len(seen_ndcs)} products, "
-            f"{len(supplier_cache)} suppliers, "
-            f"{len(seen_sp)} supplier↔product links"
+            f"Done — inserted {c['applications']} applications, "
+            f"{c['products']} products, "
+            f"{c['ingredients']} ingredients, "
+            f"{c['suppliers']} suppliers, "
+            f"{c['links']} supplier↔product links "
+            f"in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/sec)"
         )
+        if sync:
+            print(
+                f"Sync — updated {loader.updated['applications']} applications, "
+                f"{loader.updated['products']} products; "
+                f"{loader.unchanged} products unchanged, "
+                f"{loader.skipped_without_ndc} skipped (no NDC)"
+            )
 
     except Exception:
         db.rollback()
@@ -167,4 +519,7 @@ def upload_drugs(limit: int = 1000) -> None:
 
 
 if __name__ == "__main__":
-    upload_drugs(1000)
\ No newline at end of file
+    # python datasets/upload.py [N | all] [--sync]
+    args = [a for a in sys.argv[1:] if a != "--sync"]
+    arg = args[0] if args else "1000"
+    upload_drugs(None if arg == "all" else int(arg), sync="--sync" in sys.argv)
@@ -1,11 +1,108 @@
-from sqlalchemy import create_engine
+import threading
+from typing import Any, Awaitable, Callable
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import NullPool
 from config.config import settings
 
+
+# ── Engine profile (all knobs come from Settings / .env) ──────────────────
+def engine_options(url: str) -> dict[str, Any]:
+    """
+    create_engine / create_async_engine kwargs for *url*.
+
+    With DB_EXTERNAL_POOLER (PgBouncer in transaction mode and friends) the
+    app keeps no pool of its own and sends no startup options, since the
+    pooler would hand them to whichever client borrows the server
+    connection next; statement_timeout is then applied per transaction.
+    """
+    parsed = make_url(url)
+    options: dict[str, Any] = {"echo": settings.DB_ECHO}
+
+    if settings.DB_EXTERNAL_POOLER:
+        options["poolclass"] = NullPool
+        if parsed.get_driver_name() == "asyncpg":
+            # prepared statements do not survive server-connection switching
+            options["connect_args"] = {"statement_cache_size": 0}
+        return options
+
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    if settings.DB_STATEMENT_TIMEOUT_MS and parsed.get_backend_name() == "postgresql":
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if parsed.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+# ── Pool metrics ──────────────────────────────────────────────────────────
+_pool_counters: dict[str, dict[str, int]] = {}
+_pool_counters_lock = threading.Lock()
+
+
+def instrument(engine: Engine, name: str) -> None:
+    """Count pool events for *engine* and apply per-transaction settings."""
+    counters = _pool_counters.setdefault(
+        name, {"connects": 0, "checkouts": 0, "checkins": 0, "invalidations": 0}
+    )
+
+    def bump(key):
+        def listener(*_):
+            with _pool_counters_lock:
+                counters[key] += 1
+        return listener
+
+    event.listen(engine, "connect", bump("connects"))
+    event.listen(engine, "checkout", bump("checkouts"))
+    event.listen(engine, "checkin", bump("checkins"))
+    event.listen(engine, "invalidate", bump("invalidations"))
+
+    if (
+        settings.DB_EXTERNAL_POOLER
+        and settings.DB_STATEMENT_TIMEOUT_MS
+        and engine.dialect.name == "postgresql"
+    ):
+        @event.listens_for(engine, "begin")
+        def _statement_timeout(conn):
+            conn.exec_driver_sql(
+                f"SET LOCAL statement_timeout = {int(settings.DB_STATEMENT_TIMEOUT_MS)}"
+            )
+
+
+def pool_metrics() -> dict[str, dict[str, Any]]:
+    """Current pool occupancy plus lifetime event counts, per engine."""
+    engines = {"sync": engine}
+    if async_engine is not None:
+        engines["async"] = async_engine.sync_engine
+
+    metrics = {}
+    for name, eng in engines.items():
+        pool = eng.pool
+        stats: dict[str, Any] = {"pool": type(pool).__name__}
+        for attr in ("size", "checkedin", "checkedout", "overflow"):
+            if hasattr(pool, attr):
+                stats[attr] = getattr(pool, attr)()
+        with _pool_counters_lock:
+            stats.update(_pool_counters.get(name, {}))
+        metrics[name] = stats
+    return metrics
+
+
 engine = create_engine(
     settings.DATABASE_URL,
-    echo=True,
+    **engine_options(settings.DATABASE_URL),
 )
+instrument(engine, "sync")
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -20,4 +117,63 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# ── Async stack (DB_ASYNC=true) ───────────────────────────────────────────
+def async_database_url() -> str:
+    """ASYNC_DATABASE_URL, or DATABASE_URL switched to the asyncpg driver."""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(settings.DATABASE_URL)
+    return url.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_url = async_database_url()
+    async_engine = create_async_engine(async_url, **engine_options(async_url))
+    instrument(async_engine.sync_engine, "async")
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# run(fn, *args) -> await fn(session, *args) on whichever stack is configured
+DbRunner = Callable[..., Awaitable[Any]]
+
+
+async def get_db_runner():
+    """
+    Yield a ``run(fn, *args)`` coroutine that calls ``fn(session, *args)``.
+
+    With ``DB_ASYNC`` the session is the sync facade of an ``AsyncSession``
+    (``run_sync``), so queries go through asyncpg on the event loop and no
+    thread is held while Postgres works.  Otherwise ``fn`` runs on a
+    psycopg2 ``Session`` in Starlette's threadpool, as before.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            async def run(fn, *args):
+                return await session.run_sync(fn, *args)
+            yield run
+        return
+
+    db = SessionLocal()
+    try:
+        async def run(fn, *args):
+            return await run_in_threadpool(fn, db, *args)
+        yield run
+    finally:
+        await run_in_threadpool(db.close)
@@ -0,0 +1,57 @@
+"""
+forecast.py
+───────────
+Batch stock-out forecast: recomputes ``predicted_days_to_zero`` and
+``predicted_risk_score`` for every inventory row from ``usage_logs``
+(see services/forecasting.py).  Meant to run from cron, e.g. nightly:
+
+    python jobs/forecast.py
+
+With ``--incremental`` only usage logs added since the last run are
+folded in and only the series they touch are rescored (the app does this
+every FORECAST_REFRESH_SECONDS as well):
+
+    python jobs/forecast.py --incremental
+"""
+
+import sys
+from pathlib import Path
+
+# ── ensure backend root is importable ──────────────────────────────────────
+HERE = Path(__file__).resolve()
+BACKEND_ROOT = HERE.parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from db.db import SessionLocal
+from services.forecasting import run_forecast, update_forecasts
+
+
+def main(incremental: bool = False) -> None:
+    db = SessionLocal()
+    try:
+        summary = update_forecasts(db) if incremental else run_forecast(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    if summary.get("skipped"):
+        print("Skipped — another forecast run is in progress")
+    elif "new_logs" in summary:
+        print(
+            f"Done — folded {summary['new_logs']:,} new usage logs into {summary['series']:,} series; "
+            f"updated {summary['rows_updated']:,} inventory rows "
+            f"({summary['at_risk']:,} series at risk) in {summary['seconds']}s"
+        )
+    else:
+        print(
+            f"Done — {summary['usage_days']:,} usage days over {summary['series']:,} series; "
+            f"updated {summary['rows_updated']:,} inventory rows "
+            f"({summary['at_risk']:,} series at risk) in {summary['seconds']}s"
+        )
+
+
+if __name__ == "__main__":
+    main(incremental="--incremental" in sys.argv[1:])
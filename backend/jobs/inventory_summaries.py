@@ -0,0 +1,41 @@
+"""
+inventory_summaries.py
+──────────────────────
+Recomputes ``inventory_summaries`` from the batch rows in ``inventories``
+(see services/stock_summary.py).  The triggers keep the summaries current
+on every write, so this is only needed after restoring a dump without
+them or to correct drift; ``--expired`` refreshes just the summaries whose
+nearest expiry has passed, as the app does hourly.
+
+    python jobs/inventory_summaries.py [--expired]
+"""
+
+import sys
+from pathlib import Path
+
+# ── ensure backend root is importable ──────────────────────────────────────
+HERE = Path(__file__).resolve()
+BACKEND_ROOT = HERE.parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from db.db import SessionLocal
+from services.stock_summary import rebuild_summaries, refresh_expired
+
+
+def main(expired_only: bool = False) -> None:
+    db = SessionLocal()
+    try:
+        if expired_only:
+            print(f"Refreshed {refresh_expired(db):,} summaries past their nearest expiry")
+        else:
+            print(f"Rebuilt {rebuild_summaries(db):,} inventory summaries")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main(expired_only="--expired" in sys.argv[1:])
@@ -0,0 +1,44 @@
+"""
+reorder.py
+──────────
+Creates purchase orders for every low (hospital, medicine) position across
+the network, each from the medicine's cheapest active supplier, one order
+per (hospital, supplier) — see services/reorder.py.  Positions that already
+have an open order are skipped, so the job can run as often as needed.
+
+    python jobs/reorder.py [--dry-run]
+"""
+
+import sys
+from pathlib import Path
+
+# ── ensure backend root is importable ──────────────────────────────────────
+HERE = Path(__file__).resolve()
+BACKEND_ROOT = HERE.parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from db.db import SessionLocal
+from services.reorder import plan_reorders
+
+
+def main(dry_run: bool = False) -> None:
+    db = SessionLocal()
+    try:
+        result = plan_reorders(db, dry_run=dry_run)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    verb = "Would create" if dry_run else "Created"
+    print(
+        f"{verb} {result.orders:,} purchase orders with {result.lines:,} lines "
+        f"({result.units:,} units, {result.value:,.2f} total)"
+    )
+    print(f"Low positions: {result.low:,} — no active supplier for {result.unsourced:,}")
+
+
+if __name__ == "__main__":
+    main(dry_run="--dry-run" in sys.argv[1:])
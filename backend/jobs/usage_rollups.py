@@ -0,0 +1,45 @@
+"""
+usage_rollups.py
+────────────────
+Maintenance for usage log storage (see services/usage_store.py): creates
+any missing monthly ``usage_logs`` partitions and, with ``--rebuild``,
+recomputes the ``usage_daily`` / ``usage_weekly`` rollups from the logs —
+needed only after loading logs without going through the ingestion API.
+
+    python jobs/usage_rollups.py [--rebuild]
+"""
+
+import sys
+from pathlib import Path
+
+# ── ensure backend root is importable ──────────────────────────────────────
+HERE = Path(__file__).resolve()
+BACKEND_ROOT = HERE.parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from db.db import SessionLocal
+from services.usage_store import ensure_partitions, rebuild_rollups
+
+
+def main(rebuild: bool = False) -> None:
+    db = SessionLocal()
+    try:
+        created = ensure_partitions(db)
+        counts = rebuild_rollups(db) if rebuild else None
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f"Partitions created: {', '.join(created) or 'none'}")
+    if counts is not None:
+        print(
+            f"Rebuilt rollups — {counts['usage_daily']:,} daily and "
+            f"{counts['usage_weekly']:,} weekly rows"
+        )
+
+
+if __name__ == "__main__":
+    main(rebuild="--rebuild" in sys.argv[1:])
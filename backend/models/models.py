@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, UniqueConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, ForeignKey, Boolean, UniqueConstraint, Index, Computed, DDL
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy import event
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from db.db import Base
 
@@ -22,6 +24,8 @@ class Hospital(Base):
 
     latitude = Column(Float)     # for redistribution optimization
     longitude = Column(Float)
+    # derived from latitude/longitude; prefix-searchable for nearby lookups
+    geohash = Column(String(12))
 
     is_active = Column(Boolean, default=True)
 
@@ -44,7 +48,18 @@ class Hospital(Base):
         "PurchaseOrder",
         back_populates="hospital"
     )
-   
+
+    __table_args__ = (
+        # LIKE 'prefix%' needs pattern ops under a non-C collation
+        Index(
+            "ix_hospitals_geohash",
+            "geohash",
+            postgresql_ops={"geohash": "varchar_pattern_ops"},
+        ),
+        Index("ix_hospitals_latitude_longitude", "latitude", "longitude"),
+    )
+
+
 # =========================
 # DRUG APPLICATION (NDA / ANDA)
 # =========================
@@ -101,9 +116,42 @@ class DrugProduct(Base):
     manufacturer_name = Column(String(255))
     rxcui = Column(String(50), index=True)
 
+    # sha256 of the source record fields; lets a re-sync skip unchanged rows
+    content_hash = Column(String(64))
+
+    # maintained by Postgres; searched via services/search.py, never loaded
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('simple', coalesce(brand_name, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(generic_name, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(manufacturer_name, '')), 'C')",
+            persisted=True,
+        ),
+    ))
+
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # keyset pagination seeks on (brand_name, id)
+        Index("ix_drug_products_brand_name_id", "brand_name", "id"),
+        # full-text prefix search + trigram-backed ILIKE '%q%'
+        Index("ix_drug_products_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_drug_products_brand_name_trgm", "brand_name",
+            postgresql_using="gin", postgresql_ops={"brand_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_drug_products_generic_name_trgm", "generic_name",
+            postgresql_using="gin", postgresql_ops={"generic_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_drug_products_manufacturer_name_trgm", "manufacturer_name",
+            postgresql_using="gin", postgresql_ops={"manufacturer_name": "gin_trgm_ops"},
+        ),
+    )
+
     application = relationship("DrugApplication", back_populates="products")
 
     ingredients = relationship(
@@ -117,6 +165,11 @@ class DrugProduct(Base):
         back_populates="product"
     )
 
+    supplier_products = relationship(
+        "SupplierProduct",
+        back_populates="product"
+    )
+
 
 # =========================
 # DRUG INGREDIENT
@@ -187,18 +240,65 @@ class Inventory(Base):
     product = relationship("DrugProduct", back_populates="inventories")
 
 
+# =========================
+# INVENTORY SUMMARY (Per-product Stock Position)
+# =========================
+# One row per (hospital, product) with batches, kept current by triggers
+# on inventories (see services/stock_summary.py).  Figures other than
+# expired_stock cover non-expired batches only.
+class InventorySummary(Base):
+    __tablename__ = "inventory_summaries"
+
+    hospital_id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+
+    total_stock = Column(BigInteger, nullable=False, server_default="0")
+    expired_stock = Column(BigInteger, nullable=False, server_default="0")
+    batches = Column(Integer, nullable=False, server_default="0")
+    nearest_expiry = Column(DateTime(timezone=True))
+
+    days_to_zero = Column(Float)
+    risk_score = Column(Float)
+    safety_stock = Column(Integer, nullable=False, server_default="0")
+    lead_time_days = Column(Integer)
+
+    # out of stock, under the safety level, or forecast to run dry
+    # before a resupply could arrive
+    is_low = Column(
+        Boolean,
+        Computed(
+            "total_stock <= 0 OR total_stock < safety_stock "
+            "OR coalesce(days_to_zero < lead_time_days, false)",
+            persisted=True,
+        ),
+    )
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # "what is low at hospital X"
+        Index(
+            "ix_inventory_summaries_low",
+            "hospital_id", "product_id",
+            postgresql_where=is_low,
+        ),
+    )
+
+
 # =========================
 # USAGE LOG (For ML Forecasting)
 # =========================
 class UsageLog(Base):
     __tablename__ = "usage_logs"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # range-partitioned by month on ``date`` (Postgres requires the
+    # partition key in the primary key); partitions are created ahead of
+    # time by services/usage_store.py, stragglers land in usage_logs_default
+    id = Column(Integer, primary_key=True, autoincrement=True)
 
     hospital_id = Column(
         Integer,
         ForeignKey("hospitals.id"),
-        index=True
     )
 
     product_id = Column(
@@ -207,15 +307,102 @@ class UsageLog(Base):
         index=True
     )
 
-    date = Column(DateTime(timezone=True), nullable=False)
+    date = Column(DateTime(timezone=True), primary_key=True, nullable=False)
     quantity_used = Column(Integer, nullable=False)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # per-series time windows (forecasting, dashboards)
+        Index("ix_usage_logs_hospital_id_product_id_date", "hospital_id", "product_id", "date"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
+
     hospital = relationship("Hospital", back_populates="usage_logs")
     product = relationship("DrugProduct")
 
 
+event.listen(
+    UsageLog.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS usage_logs_default PARTITION OF usage_logs DEFAULT")
+    .execute_if(dialect="postgresql"),
+)
+
+
+# =========================
+# USAGE ROLLUPS (Pre-aggregated Usage)
+# =========================
+# Per (hospital, product) usage totals, maintained together with every
+# usage_logs insert (see services/usage_store.py).
+class UsageDaily(Base):
+    __tablename__ = "usage_daily"
+
+    hospital_id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    quantity = Column(BigInteger, nullable=False)
+    events = Column(Integer, nullable=False)
+    # highest usage_logs.id counted in this row
+    last_log_id = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # network-wide windows ("last 30 days")
+        Index("ix_usage_daily_day", "day"),
+    )
+
+
+class UsageWeekly(Base):
+    __tablename__ = "usage_weekly"
+
+    hospital_id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    week_start = Column(Date, primary_key=True)   # Monday
+
+    quantity = Column(BigInteger, nullable=False)
+    events = Column(Integer, nullable=False)
+
+
+# =========================
+# FORECAST STATE (Incremental Forecasting)
+# =========================
+# Running EWMA sums of daily usage per (hospital, product), decayed to
+# as_of_day (see services/forecasting.py).  Days are day numbers since
+# 1970-01-01.
+class ForecastState(Base):
+    __tablename__ = "forecast_states"
+
+    hospital_id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+
+    first_day = Column(Integer, nullable=False)
+    as_of_day = Column(Integer, nullable=False)
+    ew_usage = Column(Float, nullable=False)
+    ew_usage_sq = Column(Float, nullable=False)
+
+    # highest usage_logs.id folded into the sums
+    last_log_id = Column(Integer, nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+# Usage not yet folded into forecast_states: written with every usage_logs
+# insert, emptied by each forecast run in the statement that reads the
+# usage it folds.
+class ForecastPending(Base):
+    __tablename__ = "forecast_pending"
+
+    id = Column(BigInteger, primary_key=True)
+
+    hospital_id = Column(Integer, nullable=False)
+    product_id = Column(Integer, nullable=False)
+    day = Column(Date, nullable=False)
+
+    quantity = Column(BigInteger, nullable=False)
+    events = Column(Integer, nullable=False)
+
+
 # =========================
 # SUPPLIER
 # =========================
@@ -232,6 +419,11 @@ class Supplier(Base):
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # keyset pagination seeks on (name, id)
+        Index("ix_suppliers_name_id", "name", "id"),
+    )
+
     supplier_products = relationship(
         "SupplierProduct",
         back_populates="supplier",
@@ -271,7 +463,7 @@ class SupplierProduct(Base):
     )
 
     supplier = relationship("Supplier", back_populates="supplier_products")
-    product = relationship("DrugProduct")
+    product = relationship("DrugProduct", back_populates="supplier_products")
 
 
 # =========================
@@ -0,0 +1,46 @@
+"""
+/api/dashboard — network-wide aggregates (served from materialized views).
+"""
+
+from fastapi import APIRouter, Depends, Query
+
+from db.db import DbRunner, get_db_runner
+from services import dashboard
+from schemas.response import (
+    DashboardOverview,
+    ExpiringStockReport,
+    ProductsAtRiskReport,
+    StockoutsByStateReport,
+)
+
+router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
+
+
+# ── Everything the landing page shows, in one call ───────────────────────
+@router.get("", response_model=DashboardOverview)
+async def get_overview(
+    limit: int = Query(10, ge=1, le=100, description="Products at risk to list"),
+    run: DbRunner = Depends(get_db_runner),
+):
+    return await run(dashboard.overview, limit)
+
+
+# ── Medicines low at one or more hospitals, most widespread first ───────
+@router.get("/products-at-risk", response_model=ProductsAtRiskReport)
+async def get_products_at_risk(
+    limit: int = Query(50, ge=1, le=1000),
+    run: DbRunner = Depends(get_db_runner),
+):
+    return await run(dashboard.products_at_risk, limit)
+
+
+# ── Stock-outs per hospital state ────────────────────────────────────────
+@router.get("/stockouts-by-state", response_model=StockoutsByStateReport)
+async def get_stockouts_by_state(run: DbRunner = Depends(get_db_runner)):
+    return await run(dashboard.stockouts_by_state)
+
+
+# ── Expired / soon-expiring stock and its value ──────────────────────────
+@router.get("/expiring-stock", response_model=ExpiringStockReport)
+async def get_expiring_stock(run: DbRunner = Depends(get_db_runner)):
+    return await run(dashboard.expiring_stock)
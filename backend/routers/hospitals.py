@@ -0,0 +1,25 @@
+"""
+/api/hospitals — spatial lookups over hospitals.
+"""
+
+from fastapi import APIRouter, Depends, Query
+
+from db.db import DbRunner, get_db_runner
+from services.nearby import hospital_index, nearby_from_db
+from schemas.response import NearbyHospital
+
+router = APIRouter(prefix="/api/hospitals", tags=["hospitals"])
+
+
+# ── k nearest hospitals to a point (served from memory) ─────────────────
+@router.get("/nearby", response_model=list[NearbyHospital])
+async def nearby_hospitals(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(50, gt=0, le=20040, description="Search radius in km"),
+    k: int = Query(10, ge=1, le=100),
+    run: DbRunner = Depends(get_db_runner),
+):
+    if hospital_index.ready:
+        return hospital_index.nearby(lat, lon, radius, k)
+    return await run(nearby_from_db, lat, lon, radius, k)
@@ -0,0 +1,67 @@
+"""
+/api/inventory — per-hospital stock positions and FEFO dispensing.
+"""
+
+import asyncio
+import random
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.exc import OperationalError
+
+from db.db import DbRunner, get_db_runner
+from services.fefo import deadlocked, dispense
+from services.inventory import hospital_inventory, product_inventory
+from schemas.response import (
+    DispenseRequest,
+    DispenseResult,
+    InventoryDetail,
+    PaginatedInventory,
+)
+
+router = APIRouter(prefix="/api/inventory", tags=["inventory"])
+
+# whole-transaction attempts when Postgres picks a dispense as deadlock victim
+_DISPENSE_ATTEMPTS = 3
+
+
+# ── Stock of every medicine at a hospital (paginated) ───────────────────
+@router.get("/hospitals/{hospital_id}", response_model=PaginatedInventory)
+async def list_hospital_inventory(
+    hospital_id: int,
+    low_only: bool = Query(
+        False, description="Only medicines out of stock, under safety stock, or at risk"
+    ),
+    cursor: str | None = Query(None, description="Opaque next_cursor from the previous page"),
+    per_page: int = Query(50, ge=1, le=500),
+    run: DbRunner = Depends(get_db_runner),
+):
+    return await run(hospital_inventory, hospital_id, low_only, cursor, per_page)
+
+
+# ── One medicine at a hospital, with its batches ────────────────────────
+@router.get("/hospitals/{hospital_id}/products/{product_id}", response_model=InventoryDetail)
+async def get_product_inventory(
+    hospital_id: int, product_id: int, run: DbRunner = Depends(get_db_runner)
+):
+    return await run(product_inventory, hospital_id, product_id)
+
+
+# ── Dispense stock, earliest-expiring batches first ──────────────────────
+@router.post("/dispense", response_model=DispenseResult)
+async def dispense_stock(body: DispenseRequest, run: DbRunner = Depends(get_db_runner)):
+    """
+    Draws each line from the hospital's usable batches (FEFO) and logs it
+    as usage.  Lines without enough stock are filled partially; see
+    ``shortfall``.  A dispense aborted by a deadlock is retried after a
+    short randomized pause; 503 if it keeps losing.
+    """
+    lines = [(line.hospital_id, line.product_id, line.quantity) for line in body.lines]
+    for attempt in range(_DISPENSE_ATTEMPTS):
+        if attempt:
+            await asyncio.sleep(random.uniform(0.01, 0.05) * attempt)
+        try:
+            return await run(dispense, lines)
+        except OperationalError as e:
+            if not deadlocked(e):
+                raise
+    raise HTTPException(status_code=503, detail="Stock is busy, retry the dispense")
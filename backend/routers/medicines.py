@@ -2,18 +2,22 @@
 /api/medicines — endpoints to browse, search, and inspect drug products.
 """
 
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
-from db.db import get_db
-from models.models import DrugProduct, SupplierProduct, Supplier
+from db.db import DbRunner, get_db_runner
+from services import catalog
+from services.cache import CATALOG, response_cache
+from services.counting import CountMode
+from services.export import CONTENT_TYPES, ExportFormat, export_catalog
+from services.typeahead import typeahead_index
 from schemas.response import (
     PaginatedMedicines,
-    MedicineListItem,
+    MedicineSuggestion,
     MedicineDetail,
     MedicineWithSuppliers,
-    SupplierListItem,
+    MedicineBatchRequest,
+    MedicineBatchResponse,
 )
 
 router = APIRouter(prefix="/api/medicines", tags=["medicines"])
@@ -21,96 +25,76 @@ router = APIRouter(prefix="/api/medicines", tags=["medicines"])
 
 # ── List all medicines (paginated) ────────────────────────────────────────
 @router.get("", response_model=PaginatedMedicines)
-def list_medicines(
+async def list_medicines(
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: str | None = Query(
+        None, description="Opaque next_cursor from a previous page; overrides page"
+    ),
+    count: CountMode = Query("exact", description="How to compute total"),
+    run: DbRunner = Depends(get_db_runner),
 ):
-    q = db.query(DrugProduct)
-    total = q.count()
-    items = (
-        q.order_by(DrugProduct.brand_name)
-        .offset((page - 1) * per_page)
-        .limit(per_page)
-        .all()
-    )
-    return PaginatedMedicines(
-        total=total,
-        page=page,
-        per_page=per_page,
-        items=[MedicineListItem.model_validate(i) for i in items],
-    )
+    return await run(catalog.list_medicines, page, per_page, cursor, count)
 
 
-# ── Search medicines by name (brand or generic) ──────────────────────────
+# ── Search medicines by name (brand, generic or manufacturer) ───────────
 @router.get("/search", response_model=PaginatedMedicines)
-def search_medicines(
+async def search_medicines(
     q: str = Query("", min_length=1, description="Search term"),
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    count: CountMode = Query("exact", description="How to compute total"),
+    run: DbRunner = Depends(get_db_runner),
 ):
-    pattern = f"%{q}%"
-    query = db.query(DrugProduct).filter(
-        or_(
-            DrugProduct.brand_name.ilike(pattern),
-            DrugProduct.generic_name.ilike(pattern),
-            DrugProduct.manufacturer_name.ilike(pattern),
-        )
-    )
-    total = query.count()
-    items = (
-        query.order_by(DrugProduct.brand_name)
-        .offset((page - 1) * per_page)
-        .limit(per_page)
-        .all()
-    )
-    return PaginatedMedicines(
-        total=total,
-        page=page,
-        per_page=per_page,
-        items=[MedicineListItem.model_validate(i) for i in items],
+    return await run(catalog.search_medicines, q, page, per_page, count)
+
+
+# ── Autocomplete medicine names (served from memory) ─────────────────────
+@router.get("/suggest", response_model=list[MedicineSuggestion])
+async def suggest_medicines(
+    q: str = Query(..., min_length=1, description="Name prefix"),
+    limit: int = Query(10, ge=1, le=50),
+):
+    if not typeahead_index.ready:
+        raise HTTPException(status_code=503, detail="Suggestion index is warming up")
+    return typeahead_index.suggest(q, limit)
+
+
+# ── Resolve many medicines at once (by id and/or NDC) ───────────────────
+@router.post("/batch", response_model=MedicineBatchResponse)
+async def get_medicines_batch(
+    body: MedicineBatchRequest, run: DbRunner = Depends(get_db_runner)
+):
+    return await run(catalog.get_medicines_batch, body.ids, body.ndcs)
+
+
+# ── Stream the whole catalog (products + ingredients + suppliers) ───────
+@router.get("/export")
+def export_medicines(format: ExportFormat = Query("ndjson")):
+    return StreamingResponse(
+        export_catalog(format),
+        media_type=CONTENT_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="medicines.{format}"'
+        },
     )
 
 
 # ── Get single medicine detail (with ingredients) ────────────────────────
 @router.get("/{medicine_id}", response_model=MedicineDetail)
-def get_medicine(medicine_id: int, db: Session = Depends(get_db)):
-    med = (
-        db.query(DrugProduct)
-        .options(joinedload(DrugProduct.ingredients))
-        .filter(DrugProduct.id == medicine_id)
-        .first()
+async def get_medicine(
+    medicine_id: int, request: Request, run: DbRunner = Depends(get_db_runner)
+):
+    return await response_cache.respond(
+        request, CATALOG, lambda: run(catalog.get_medicine, medicine_id)
     )
-    if not med:
-        raise HTTPException(status_code=404, detail="Medicine not found")
-    return MedicineDetail.model_validate(med)
 
 
 # ── Get suppliers for a medicine ─────────────────────────────────────────
 @router.get("/{medicine_id}/suppliers", response_model=MedicineWithSuppliers)
-def get_medicine_suppliers(medicine_id: int, db: Session = Depends(get_db)):
-    med = (
-        db.query(DrugProduct)
-        .options(joinedload(DrugProduct.ingredients))
-        .filter(DrugProduct.id == medicine_id)
-        .first()
-    )
-    if not med:
-        raise HTTPException(status_code=404, detail="Medicine not found")
-
-    sp_rows = (
-        db.query(SupplierProduct)
-        .options(joinedload(SupplierProduct.supplier))
-        .filter(SupplierProduct.product_id == medicine_id)
-        .all()
+async def get_medicine_suppliers(
+    medicine_id: int, request: Request, run: DbRunner = Depends(get_db_runner)
+):
+    return await response_cache.respond(
+        request, CATALOG, lambda: run(catalog.get_medicine_suppliers, medicine_id)
     )
-    suppliers = [
-        SupplierListItem.model_validate(row.supplier)
-        for row in sp_rows
-        if row.supplier
-    ]
-
-    data = MedicineDetail.model_validate(med).model_dump()
-    data["suppliers"] = suppliers
-    return MedicineWithSuppliers(**data)
@@ -0,0 +1,29 @@
+"""
+/api/redistribution — plan stock transfers between hospitals.
+"""
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+
+from db.db import DbRunner, get_db_runner
+from services.redistribution import hospital_positions, plan_transfers
+from schemas.response import RedistributionPlan
+
+router = APIRouter(prefix="/api/redistribution", tags=["redistribution"])
+
+
+# ── Transfer plan for one medicine ───────────────────────────────────────
+@router.get("/{product_id}", response_model=RedistributionPlan)
+async def plan_redistribution(
+    product_id: int,
+    time_budget_ms: int = Query(
+        500, ge=10, le=10_000, description="Solver time budget; best plan so far is returned"
+    ),
+    max_distance_km: float | None = Query(
+        None, gt=0, description="Never ship further than this"
+    ),
+    run: DbRunner = Depends(get_db_runner),
+):
+    rows = await run(hospital_positions, product_id)
+    # the solver can spend the whole budget on CPU; keep it off the event loop
+    return await run_in_threadpool(plan_transfers, product_id, rows, time_budget_ms, max_distance_km)
@@ -0,0 +1,20 @@
+"""
+/api/reorder — turn low stock into purchase orders.
+"""
+
+from fastapi import APIRouter, Depends, Query
+
+from db.db import DbRunner, get_db_runner
+from services.reorder import plan_reorders
+from schemas.response import ReorderResult
+
+router = APIRouter(prefix="/api/reorder", tags=["reorder"])
+
+
+# ── Order every low position from its cheapest active supplier ──────────
+@router.post("", response_model=ReorderResult)
+async def run_reorder(
+    dry_run: bool = Query(False, description="Only report what would be ordered"),
+    run: DbRunner = Depends(get_db_runner),
+):
+    return await run(plan_reorders, dry_run)
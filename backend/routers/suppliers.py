@@ -2,16 +2,17 @@
 /api/suppliers — endpoints to browse suppliers and see their medicines.
 """
 
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, Query, Request
 
-from db.db import get_db
-from models.models import Supplier, SupplierProduct
+from db.db import DbRunner, get_db_runner
+from services import catalog
+from services.cache import CATALOG, response_cache
+from services.counting import CountMode
 from schemas.response import (
     PaginatedSuppliers,
-    SupplierListItem,
     SupplierWithMedicines,
-    MedicineListItem,
+    SupplierBatchRequest,
+    SupplierBatchResponse,
 )
 
 router = APIRouter(prefix="/api/suppliers", tags=["suppliers"])
@@ -19,46 +20,31 @@ router = APIRouter(prefix="/api/suppliers", tags=["suppliers"])
 
 # ── List all suppliers (paginated) ────────────────────────────────────────
 @router.get("", response_model=PaginatedSuppliers)
-def list_suppliers(
+async def list_suppliers(
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: str | None = Query(
+        None, description="Opaque next_cursor from a previous page; overrides page"
+    ),
+    count: CountMode = Query("exact", description="How to compute total"),
+    run: DbRunner = Depends(get_db_runner),
 ):
-    q = db.query(Supplier)
-    total = q.count()
-    items = (
-        q.order_by(Supplier.name)
-        .offset((page - 1) * per_page)
-        .limit(per_page)
-        .all()
-    )
-    return PaginatedSuppliers(
-        total=total,
-        page=page,
-        per_page=per_page,
-        items=[SupplierListItem.model_validate(i) for i in items],
-    )
+    return await run(catalog.list_suppliers, page, per_page, cursor, count)
+
+
+# ── Resolve many suppliers at once ───────────────────────────────────────
+@router.post("/batch", response_model=SupplierBatchResponse)
+async def get_suppliers_batch(
+    body: SupplierBatchRequest, run: DbRunner = Depends(get_db_runner)
+):
+    return await run(catalog.get_suppliers_batch, body.ids)
 
 
 # ── Get supplier detail with all its medicines ───────────────────────────
 @router.get("/{supplier_id}", response_model=SupplierWithMedicines)
-def get_supplier(supplier_id: int, db: Session = Depends(get_db)):
-    sup = db.query(Supplier).filter(Supplier.id == supplier_id).first()
-    if not sup:
-        raise HTTPException(status_code=404, detail="Supplier not found")
-
-    sp_rows = (
-        db.query(SupplierProduct)
-        .options(joinedload(SupplierProduct.product))
-        .filter(SupplierProduct.supplier_id == supplier_id)
-        .all()
+async def get_supplier(
+    supplier_id: int, request: Request, run: DbRunner = Depends(get_db_runner)
+):
+    return await response_cache.respond(
+        request, CATALOG, lambda: run(catalog.get_supplier, supplier_id)
     )
-    medicines = [
-        MedicineListItem.model_validate(row.product)
-        for row in sp_rows
-        if row.product
-    ]
-
-    data = SupplierListItem.model_validate(sup).model_dump()
-    data["medicines"] = medicines
-    return SupplierWithMedicines(**data)
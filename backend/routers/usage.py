@@ -0,0 +1,61 @@
+"""
+/api/usage-logs — ingestion of dispensing events.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+
+from config.config import settings
+from services.ingest import Event, usage_ingestor
+from schemas.response import UsageEvent, UsageIngestResult
+
+router = APIRouter(prefix="/api/usage-logs", tags=["usage"])
+
+_events = TypeAdapter(list[UsageEvent])
+_NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def _parse_events(body: bytes, content_type: str) -> list[Event]:
+    """A JSON array (or single object), or one JSON object per line."""
+    body = body.strip()
+    if content_type.split(";")[0].strip().lower() in _NDJSON_TYPES:
+        body = b"[" + b",".join(line for line in body.splitlines() if line.strip()) + b"]"
+    elif body.startswith(b"{"):
+        body = b"[" + body + b"]"
+    try:
+        parsed = _events.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False)) from None
+
+    if len(parsed) > settings.USAGE_INGEST_MAX_EVENTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"at most {settings.USAGE_INGEST_MAX_EVENTS} events per request",
+        )
+    now = datetime.now(timezone.utc)
+    return [
+        (
+            e.hospital_id,
+            e.product_id,
+            now if e.date is None else e.date if e.date.tzinfo else e.date.replace(tzinfo=timezone.utc),
+            e.quantity_used,
+        )
+        for e in parsed
+    ]
+
+
+# ── Record usage events (buffered, group-committed) ─────────────────────
+@router.post("", response_model=UsageIngestResult, status_code=201)
+async def ingest_usage(request: Request):
+    """
+    Body: a JSON array of ``UsageEvent`` objects, or NDJSON (one per line)
+    with ``Content-Type: application/x-ndjson``.  Answers once the events
+    are committed; on 503 the client should retry the whole request.
+    """
+    events = _parse_events(await request.body(), request.headers.get("content-type", ""))
+    accepted = await asyncio.wrap_future(usage_ingestor.submit(events))
+    return {"accepted": accepted}
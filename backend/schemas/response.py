@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import AliasChoices, AliasPath, BaseModel, ConfigDict, Field, field_validator, model_validator
 from datetime import datetime
 
 
@@ -11,6 +11,13 @@ class HospitalResponse(BaseModel):
     longitude: float | None = None
 
 
+class NearbyHospital(HospitalResponse):
+    """A hospital ranked by great-circle distance from the query point."""
+    city: str | None = None
+    state: str | None = None
+    distance_km: float
+
+
 # ── Ingredient ─────────────────────────────────────────────────────────────
 class IngredientResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -34,6 +41,13 @@ class MedicineListItem(BaseModel):
     manufacturer_name: str | None = None
 
 
+class MedicineSuggestion(BaseModel):
+    """One autocomplete entry from the in-memory name index."""
+    text: str
+    kind: str   # brand | generic | manufacturer
+    count: int  # number of products carrying this name
+
+
 class MedicineDetail(MedicineListItem):
     """Full detail view including ingredients."""
     rxcui: str | None = None
@@ -51,26 +65,302 @@ class SupplierListItem(BaseModel):
     is_active: bool = True
 
 
+# ── Supplier ↔ product offers (validated straight from SupplierProduct) ──
+def _via(*path: str) -> AliasChoices:
+    """
+    Accept the attribute path on SupplierProduct, or the flat field name.
+    The path goes first: flat names such as ``id`` also exist on
+    SupplierProduct itself and would shadow the related object's.
+    """
+    return AliasChoices(AliasPath(*path), path[-1])
+
+
+def _drop_orphans(rows, attr: str):
+    return [r for r in rows if getattr(r, attr, True) is not None]
+
+
+class SupplierOffer(BaseModel):
+    """A supplier of a given medicine, with its unit price."""
+    model_config = ConfigDict(from_attributes=True)
+    id: int = Field(validation_alias=_via("supplier", "id"))
+    name: str = Field(validation_alias=_via("supplier", "name"))
+    email: str | None = Field(None, validation_alias=_via("supplier", "email"))
+    phone: str | None = Field(None, validation_alias=_via("supplier", "phone"))
+    is_active: bool = Field(True, validation_alias=_via("supplier", "is_active"))
+    price_per_unit: float | None = None
+
+
+class MedicineOffer(BaseModel):
+    """A medicine offered by a given supplier, with its unit price."""
+    model_config = ConfigDict(from_attributes=True)
+    id: int = Field(validation_alias=_via("product", "id"))
+    brand_name: str | None = Field(None, validation_alias=_via("product", "brand_name"))
+    generic_name: str | None = Field(None, validation_alias=_via("product", "generic_name"))
+    dosage_form: str | None = Field(None, validation_alias=_via("product", "dosage_form"))
+    route: str | None = Field(None, validation_alias=_via("product", "route"))
+    marketing_status: str | None = Field(None, validation_alias=_via("product", "marketing_status"))
+    product_ndc: str | None = Field(None, validation_alias=_via("product", "product_ndc"))
+    manufacturer_name: str | None = Field(None, validation_alias=_via("product", "manufacturer_name"))
+    price_per_unit: float | None = None
+
+
 class SupplierWithMedicines(SupplierListItem):
     """Supplier with the list of medicines it provides."""
-    medicines: list[MedicineListItem] = []
+    medicines: list[MedicineOffer] = Field(
+        [], validation_alias=AliasChoices("medicines", "supplier_products")
+    )
+
+    @field_validator("medicines", mode="before")
+    @classmethod
+    def _skip_missing_products(cls, rows):
+        return _drop_orphans(rows, "product")
 
 
 class MedicineWithSuppliers(MedicineDetail):
     """Medicine with the list of suppliers."""
-    suppliers: list[SupplierListItem] = []
+    suppliers: list[SupplierOffer] = Field(
+        [], validation_alias=AliasChoices("suppliers", "supplier_products")
+    )
+
+    @field_validator("suppliers", mode="before")
+    @classmethod
+    def _skip_missing_suppliers(cls, rows):
+        return _drop_orphans(rows, "supplier")
 
 
 # ── Paginated wrapper ─────────────────────────────────────────────────────
 class PaginatedMedicines(BaseModel):
-    total: int
+    total: int | None  # None when ?count=none; estimated when ?count=estimate
     page: int
     per_page: int
+    has_more: bool = False
+    next_cursor: str | None = None  # pass back as ?cursor= for the next page
     items: list[MedicineListItem]
 
 
 class PaginatedSuppliers(BaseModel):
-    total: int
+    total: int | None  # None when ?count=none; estimated when ?count=estimate
     page: int
     per_page: int
+    has_more: bool = False
+    next_cursor: str | None = None  # pass back as ?cursor= for the next page
     items: list[SupplierListItem]
+
+
+# ── Batch lookups ─────────────────────────────────────────────────────────
+MAX_BATCH_SIZE = 500
+
+
+class MedicineBatchRequest(BaseModel):
+    """Medicines to resolve by primary key and/or product NDC."""
+    ids: list[int] = []
+    ndcs: list[str] = []
+
+    @model_validator(mode="after")
+    def _check_size(self):
+        if not self.ids and not self.ndcs:
+            raise ValueError("provide at least one id or ndc")
+        if len(self.ids) + len(self.ndcs) > MAX_BATCH_SIZE:
+            raise ValueError(f"at most {MAX_BATCH_SIZE} ids + ndcs per request")
+        return self
+
+
+class MedicineBatchResponse(BaseModel):
+    by_id: dict[int, MedicineDetail] = {}
+    by_ndc: dict[str, MedicineDetail] = {}
+    missing_ids: list[int] = []
+    missing_ndcs: list[str] = []
+
+
+class SupplierBatchRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class SupplierBatchResponse(BaseModel):
+    by_id: dict[int, SupplierListItem] = {}
+    missing_ids: list[int] = []
+
+
+# ── Redistribution ────────────────────────────────────────────────────────
+class Transfer(BaseModel):
+    from_hospital_id: int
+    to_hospital_id: int
+    quantity: int
+    distance_km: float
+
+
+class RedistributionPlan(BaseModel):
+    """Surplus → deficit transfers for one product at minimum total unit-km."""
+    product_id: int
+    surplus_hospitals: int
+    deficit_hospitals: int
+    total_surplus: int
+    total_deficit: int
+    units_shipped: int
+    unit_km: float
+    optimal: bool    # False when the time budget ran out first
+    solve_ms: float
+    transfers: list[Transfer]
+
+
+# ── Usage ingestion ───────────────────────────────────────────────────────
+class UsageEvent(BaseModel):
+    """One dispensing event; ``date`` defaults to the time it is received."""
+    hospital_id: int = Field(..., gt=0)
+    product_id: int = Field(..., gt=0)
+    quantity_used: int = Field(..., ge=0)
+    date: datetime | None = None
+
+
+class UsageIngestResult(BaseModel):
+    accepted: int
+
+
+# ── Inventory ─────────────────────────────────────────────────────────────
+class InventorySummaryItem(BaseModel):
+    """One medicine's stock position at a hospital (non-expired batches)."""
+    model_config = ConfigDict(from_attributes=True)
+    product_id: int
+    brand_name: str | None = None
+    generic_name: str | None = None
+    total_stock: int
+    expired_stock: int = 0
+    batches: int       # non-expired batches with stock
+    nearest_expiry: datetime | None = None
+    days_to_zero: float | None = None
+    risk_score: float | None = None
+    safety_stock: int = 0
+    lead_time_days: int | None = None
+    is_low: bool
+    updated_at: datetime | None = None
+
+
+class PaginatedInventory(BaseModel):
+    hospital_id: int
+    total: int
+    per_page: int
+    has_more: bool = False
+    next_cursor: str | None = None  # pass back as ?cursor= for the next page
+    items: list[InventorySummaryItem]
+
+
+class InventoryBatch(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    batch_number: str | None = None
+    expiry_date: datetime | None = None
+    current_stock: int
+    safety_stock_level: int | None = None
+    predicted_days_to_zero: float | None = None
+    predicted_risk_score: float | None = None
+    last_restocked_at: datetime | None = None
+    lead_time_days: int | None = None
+    expired: bool = False
+
+
+class InventoryDetail(BaseModel):
+    """A medicine's summary at a hospital with its batches, earliest expiry first."""
+    hospital_id: int
+    summary: InventorySummaryItem
+    batches: list[InventoryBatch]
+
+
+MAX_DISPENSE_LINES = 500
+
+
+class DispenseLine(BaseModel):
+    hospital_id: int = Field(..., gt=0)
+    product_id: int = Field(..., gt=0)
+    quantity: int = Field(..., gt=0)
+
+
+class DispenseRequest(BaseModel):
+    lines: list[DispenseLine] = Field(..., min_length=1, max_length=MAX_DISPENSE_LINES)
+
+
+class DispensedBatch(BaseModel):
+    batch_id: int
+    batch_number: str | None = None
+    expiry_date: datetime | None = None
+    quantity: int
+
+
+class DispenseLineResult(BaseModel):
+    """Batches drawn for one (hospital, medicine), earliest expiry first."""
+    hospital_id: int
+    product_id: int
+    requested: int
+    dispensed: int
+    shortfall: int     # not enough usable stock
+    batches: list[DispensedBatch]
+
+
+class DispenseResult(BaseModel):
+    dispensed: int
+    shortfall: int
+    lines: list[DispenseLineResult]
+
+
+# ── Dashboard ─────────────────────────────────────────────────────────────
+class ProductAtRisk(BaseModel):
+    product_id: int
+    brand_name: str | None = None
+    generic_name: str | None = None
+    hospitals: int           # active hospitals stocking it
+    hospitals_low: int
+    hospitals_out: int
+    total_stock: int
+    min_days_to_zero: float | None = None
+    max_risk_score: float | None = None
+
+
+class ProductsAtRiskReport(BaseModel):
+    refreshed_at: datetime | None = None
+    total: int
+    items: list[ProductAtRisk]
+
+
+class StateStockouts(BaseModel):
+    state: str | None = None
+    hospitals: int
+    hospitals_with_stockouts: int
+    stockouts: int           # (hospital, medicine) pairs with no usable stock
+    low: int
+
+
+class StockoutsByStateReport(BaseModel):
+    refreshed_at: datetime | None = None
+    items: list[StateStockouts]
+
+
+class ExpiringStock(BaseModel):
+    """Stock expiring within ``within_days`` (0 = already expired)."""
+    within_days: int
+    batches: int
+    hospitals: int
+    units: int
+    value: float             # at the cheapest active supplier's price
+    unpriced_batches: int
+
+
+class ExpiringStockReport(BaseModel):
+    refreshed_at: datetime | None = None
+    items: list[ExpiringStock]
+
+
+class DashboardOverview(BaseModel):
+    products_at_risk: ProductsAtRiskReport
+    stockouts_by_state: StockoutsByStateReport
+    expiring_stock: ExpiringStockReport
+
+
+# ── Reordering ────────────────────────────────────────────────────────────
+class ReorderResult(BaseModel):
+    """Outcome of a network-wide reorder run (or what it would do)."""
+    dry_run: bool
+    low: int           # low positions without an open order
+    unsourced: int     # of those, medicines no active supplier prices
+    orders: int
+    lines: int
+    units: int
+    value: float
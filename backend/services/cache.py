@@ -0,0 +1,225 @@
+"""
+Response cache for the read-mostly catalog endpoints.
+
+Entries are keyed on ``namespace + generation + route + query params``.
+Invalidation never scans keys: it bumps the namespace's generation counter
+so every older key simply stops being addressed and ages out via TTL/LRU.
+That works the same for the in-process LRU and for a shared backend.
+
+Each cached body carries a content hash that is sent as the ``ETag``;
+clients repeating it in ``If-None-Match`` get an empty 304.
+
+Backends
+────────
+* ``MemoryCache``  — bounded LRU with per-entry TTL, per process (default).
+* ``RedisCache``   — any redis-py compatible client (``get``/``set``/``incr``),
+  enabled by ``CACHE_URL``.  A stand-in such as ``fakeredis`` can be passed
+  in directly.  Redis being down or slow never fails a request: reads
+  count as misses, writes are skipped, and while the generation cannot be
+  read responses bypass the cache (an old generation could be stale).
+
+With the memory backend, invalidation from another process (e.g. a
+dataset loader) cannot reach the API workers, so entries there live at
+most ``CACHE_TTL_SECONDS`` after a load; ``invalidate`` logs a warning
+when called on a non-shared backend.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Protocol
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+
+from config.config import settings
+
+logger = logging.getLogger(__name__)
+
+# everything derived from the FDA catalog tables (products, suppliers, links)
+CATALOG = "catalog"
+
+
+class CacheBackend(Protocol):
+    blocking: bool  # True when calls do network I/O
+    shared: bool    # True when other processes see the same entries
+    def get(self, key: str) -> bytes | None: ...
+    def set(self, key: str, value: bytes, ttl: int) -> None: ...
+    def incr(self, key: str) -> int | None: ...
+    def counter(self, key: str) -> int | None: ...   # None: unavailable
+
+
+class MemoryCache:
+    """Thread-safe LRU dict with a per-entry expiry."""
+
+    blocking = False
+    shared = False
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            if hit[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return hit[1]
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def incr(self, key: str) -> int:
+        # counters live outside the LRU so a generation is never evicted
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+
+class RedisCache:
+    """
+    Adapter over a redis-py compatible client.  *errors* are the client's
+    exception types; each failed call is logged once per outage and
+    treated as a miss / no-op.
+    """
+
+    blocking = True
+    shared = True
+
+    def __init__(self, client, errors: tuple[type[Exception], ...] = (OSError,)) -> None:
+        self.client = client
+        self.errors = errors
+        self._down = False
+
+    def _call(self, op: str, fn):
+        try:
+            result = fn()
+        except self.errors as e:
+            if not self._down:
+                self._down = True
+                logger.warning("response cache unavailable (%s failed: %s); serving uncached", op, e)
+            return None
+        if self._down:
+            self._down = False
+            logger.info("response cache available again")
+        return result
+
+    def get(self, key: str) -> bytes | None:
+        return self._call("get", lambda: self.client.get(key))
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._call("set", lambda: self.client.set(key, value, ex=ttl))
+
+    def incr(self, key: str) -> int | None:
+        return self._call("incr", lambda: int(self.client.incr(key)))
+
+    def counter(self, key: str) -> int | None:
+        return self._call("get", lambda: int(self.client.get(key) or 0))
+
+
+def make_backend() -> CacheBackend:
+    if settings.CACHE_URL:
+        try:
+            import redis
+        except ImportError:
+            logger.warning("CACHE_URL is set but redis is not installed; "
+                           "falling back to the in-process cache")
+        else:
+            client = redis.Redis.from_url(
+                settings.CACHE_URL,
+                socket_timeout=settings.CACHE_TIMEOUT_SECONDS,
+                socket_connect_timeout=settings.CACHE_TIMEOUT_SECONDS,
+            )
+            return RedisCache(client, errors=(redis.exceptions.RedisError, OSError))
+    return MemoryCache(settings.CACHE_MAX_ENTRIES)
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend, ttl: int) -> None:
+        self.backend = backend
+        self.ttl = ttl
+
+    def invalidate(self, namespace: str) -> None:
+        """Drop every cached response in *namespace*."""
+        if not self.backend.shared:
+            logger.warning(
+                "response cache is per process (no CACHE_URL): running API workers "
+                "keep serving cached %s responses for up to %ds", namespace, self.ttl,
+            )
+        if self.backend.incr(f"gen:{namespace}") is None:
+            logger.error("could not invalidate cached %s responses; they may be stale "
+                         "for up to %ds", namespace, self.ttl)
+
+    async def respond(
+        self,
+        request: Request,
+        namespace: str,
+        load: Callable[[], Awaitable[BaseModel]],
+    ) -> Response:
+        """
+        Serve *request* from cache, awaiting *load()* on a miss.
+
+        *load* may raise ``HTTPException``; errors are never cached.
+        """
+        generation = await self._io(self.backend.counter, f"gen:{namespace}")
+        if generation is None:
+            body = (await load()).model_dump_json().encode("utf-8")
+            return self._response(request, body, self._etag(body))
+        params = urlencode(sorted(request.query_params.multi_items()))
+        key = f"resp:{namespace}:{generation}:{request.url.path}?{params}"
+
+        cached = await self._io(self.backend.get, key)
+        if cached is not None:
+            etag, body = cached.split(b"\n", 1)
+            etag = etag.decode("ascii")
+        else:
+            body = (await load()).model_dump_json().encode("utf-8")
+            etag = self._etag(body)
+            await self._io(
+                self.backend.set, key, etag.encode("ascii") + b"\n" + body, self.ttl
+            )
+        return self._response(request, body, etag)
+
+    @staticmethod
+    def _etag(body: bytes) -> str:
+        return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+    @staticmethod
+    def _response(request: Request, body: bytes, etag: str) -> Response:
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+    async def _io(self, fn, *args):
+        # network backends must not block the event loop
+        if self.backend.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+
+response_cache = ResponseCache(make_backend(), settings.CACHE_TTL_SECONDS)
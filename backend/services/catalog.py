@@ -0,0 +1,193 @@
+"""
+Catalog queries behind /api/medicines and /api/suppliers.
+
+Every function takes a plain sync ``Session`` as its first argument so the
+routers can run it either in the threadpool (psycopg2 engine) or through
+``AsyncSession.run_sync`` (asyncpg engine) — see ``db.db.get_db_runner``.
+"""
+
+from fastapi import HTTPException
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from models.models import DrugProduct, SupplierProduct, Supplier
+from services.counting import CountMode, count_rows
+from services.pagination import encode_cursor, seek_page
+from services.search import search_filter, search_rank
+from schemas.response import (
+    PaginatedMedicines,
+    PaginatedSuppliers,
+    MedicineListItem,
+    MedicineDetail,
+    MedicineWithSuppliers,
+    MedicineBatchResponse,
+    SupplierListItem,
+    SupplierWithMedicines,
+    SupplierBatchResponse,
+)
+
+
+# ── Medicines ─────────────────────────────────────────────────────────────
+def list_medicines(
+    db: Session, page: int, per_page: int, cursor: str | None, count: CountMode
+) -> PaginatedMedicines:
+    q = db.query(DrugProduct)
+    total = count_rows(db, q, count, table=DrugProduct.__tablename__)
+    if cursor:
+        items = seek_page(q, DrugProduct.brand_name, DrugProduct.id, cursor, per_page + 1)
+    else:
+        items = (
+            q.order_by(DrugProduct.brand_name.asc().nulls_last(), DrugProduct.id)
+            .offset((page - 1) * per_page)
+            .limit(per_page + 1)
+            .all()
+        )
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    return PaginatedMedicines(
+        total=total,
+        page=page,
+        per_page=per_page,
+        has_more=has_more,
+        next_cursor=(
+            encode_cursor(items[-1].brand_name, items[-1].id) if has_more else None
+        ),
+        items=[MedicineListItem.model_validate(i) for i in items],
+    )
+
+
+def search_medicines(
+    db: Session, q: str, page: int, per_page: int, count: CountMode
+) -> PaginatedMedicines:
+    query = db.query(DrugProduct).filter(search_filter(q))
+    total = count_rows(db, query, count)
+    items = (
+        query.order_by(
+            search_rank(q).desc(), DrugProduct.brand_name, DrugProduct.id
+        )
+        .offset((page - 1) * per_page)
+        .limit(per_page + 1)
+        .all()
+    )
+    return PaginatedMedicines(
+        total=total,
+        page=page,
+        per_page=per_page,
+        has_more=len(items) > per_page,
+        items=[MedicineListItem.model_validate(i) for i in items[:per_page]],
+    )
+
+
+def get_medicine(db: Session, medicine_id: int) -> MedicineDetail:
+    med = (
+        db.query(DrugProduct)
+        .options(joinedload(DrugProduct.ingredients))
+        .filter(DrugProduct.id == medicine_id)
+        .first()
+    )
+    if not med:
+        raise HTTPException(status_code=404, detail="Medicine not found")
+    return MedicineDetail.model_validate(med)
+
+
+def get_medicine_suppliers(db: Session, medicine_id: int) -> MedicineWithSuppliers:
+    # product ⟕ supplier_products ⟕ suppliers, then ingredients by IN —
+    # joining both collections would multiply their rows
+    med = (
+        db.query(DrugProduct)
+        .options(
+            selectinload(DrugProduct.ingredients),
+            joinedload(DrugProduct.supplier_products)
+            .joinedload(SupplierProduct.supplier),
+        )
+        .filter(DrugProduct.id == medicine_id)
+        .first()
+    )
+    if not med:
+        raise HTTPException(status_code=404, detail="Medicine not found")
+    return MedicineWithSuppliers.model_validate(med)
+
+
+def get_medicines_batch(
+    db: Session, ids: list[int], ndcs: list[str]
+) -> MedicineBatchResponse:
+    """Resolve many medicines (with ingredients) in one ``IN`` query."""
+    clauses = []
+    if ids:
+        clauses.append(DrugProduct.id.in_(set(ids)))
+    if ndcs:
+        clauses.append(DrugProduct.product_ndc.in_(set(ndcs)))
+    rows = (
+        db.query(DrugProduct)
+        .options(joinedload(DrugProduct.ingredients))
+        .filter(or_(*clauses))
+        .all()
+    )
+
+    wanted_ids, wanted_ndcs = set(ids), set(ndcs)
+    by_id, by_ndc = {}, {}
+    for row in rows:
+        item = MedicineDetail.model_validate(row)
+        if row.id in wanted_ids:
+            by_id[row.id] = item
+        if row.product_ndc in wanted_ndcs:
+            by_ndc[row.product_ndc] = item
+    return MedicineBatchResponse(
+        by_id=by_id,
+        by_ndc=by_ndc,
+        missing_ids=[i for i in dict.fromkeys(ids) if i not in by_id],
+        missing_ndcs=[n for n in dict.fromkeys(ndcs) if n not in by_ndc],
+    )
+
+
+# ── Suppliers ─────────────────────────────────────────────────────────────
+def list_suppliers(
+    db: Session, page: int, per_page: int, cursor: str | None, count: CountMode
+) -> PaginatedSuppliers:
+    q = db.query(Supplier)
+    total = count_rows(db, q, count, table=Supplier.__tablename__)
+    if cursor:
+        items = seek_page(q, Supplier.name, Supplier.id, cursor, per_page + 1)
+    else:
+        items = (
+            q.order_by(Supplier.name.asc().nulls_last(), Supplier.id)
+            .offset((page - 1) * per_page)
+            .limit(per_page + 1)
+            .all()
+        )
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    return PaginatedSuppliers(
+        total=total,
+        page=page,
+        per_page=per_page,
+        has_more=has_more,
+        next_cursor=encode_cursor(items[-1].name, items[-1].id) if has_more else None,
+        items=[SupplierListItem.model_validate(i) for i in items],
+    )
+
+
+def get_supplier(db: Session, supplier_id: int) -> SupplierWithMedicines:
+    # one statement: supplier ⟕ supplier_products ⟕ drug_products
+    sup = (
+        db.query(Supplier)
+        .options(
+            joinedload(Supplier.supplier_products)
+            .joinedload(SupplierProduct.product)
+        )
+        .filter(Supplier.id == supplier_id)
+        .first()
+    )
+    if not sup:
+        raise HTTPException(status_code=404, detail="Supplier not found")
+    return SupplierWithMedicines.model_validate(sup)
+
+
+def get_suppliers_batch(db: Session, ids: list[int]) -> SupplierBatchResponse:
+    """Resolve many suppliers in one ``IN`` query."""
+    rows = db.query(Supplier).filter(Supplier.id.in_(set(ids))).all()
+    by_id = {row.id: SupplierListItem.model_validate(row) for row in rows}
+    return SupplierBatchResponse(
+        by_id=by_id,
+        missing_ids=[i for i in dict.fromkeys(ids) if i not in by_id],
+    )
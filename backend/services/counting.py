@@ -0,0 +1,89 @@
+"""
+Total-count strategies for the paginated listings.
+
+``exact``     runs ``SELECT count(*)`` over the filtered query (the old
+              behaviour).
+``estimate``  reads planner statistics instead — ``pg_class.reltuples`` for
+              a whole table, or the row estimate of ``EXPLAIN`` for a
+              filtered query — and caches the figure for a short TTL.
+``none``      skips counting entirely; callers report ``has_more`` from an
+              over-fetched page instead.
+"""
+
+import json
+import threading
+import time
+from typing import Literal
+
+from sqlalchemy import text
+from sqlalchemy.orm import Query, Session
+
+from config.config import settings
+
+CountMode = Literal["exact", "estimate", "none"]
+
+_MAX_CACHED_ESTIMATES = 1024
+
+_estimate_cache: dict[str, tuple[float, int]] = {}
+_estimate_lock = threading.Lock()
+
+
+def _cached(key: str, compute) -> int:
+    now = time.monotonic()
+    with _estimate_lock:
+        hit = _estimate_cache.get(key)
+        if hit and hit[0] > now:
+            return hit[1]
+    value = compute()
+    with _estimate_lock:
+        if len(_estimate_cache) >= _MAX_CACHED_ESTIMATES:
+            for stale in [k for k, (exp, _) in _estimate_cache.items() if exp <= now]:
+                del _estimate_cache[stale]
+            if len(_estimate_cache) >= _MAX_CACHED_ESTIMATES:
+                _estimate_cache.clear()
+        _estimate_cache[key] = (now + settings.COUNT_ESTIMATE_TTL_SECONDS, value)
+    return value
+
+
+def _table_estimate(db: Session, query: Query, table: str) -> int:
+    reltuples = db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:t)"),
+        {"t": table},
+    ).scalar()
+    # -1 / NULL means the table was never analyzed; fall back to a real count
+    if reltuples is None or reltuples < 0:
+        return query.count()
+    return int(reltuples)
+
+
+def _plan_estimate(db: Session, query: Query) -> int:
+    conn = db.connection()
+    compiled = query.statement.compile(dialect=conn.dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_rows(
+    db: Session, query: Query, mode: CountMode, table: str | None = None
+) -> int | None:
+    """
+    Total for *query* according to *mode*.
+
+    Pass *table* when *query* is an unfiltered scan of that table so the
+    estimate can come straight from ``pg_class``.
+    """
+    if mode == "none":
+        return None
+    if mode == "exact":
+        return query.count()
+
+    if table:
+        return _cached(f"table:{table}", lambda: _table_estimate(db, query, table))
+    compiled = query.statement.compile()
+    key = f"plan:{compiled}|{sorted(compiled.params.items())}"
+    return _cached(key, lambda: _plan_estimate(db, query))
@@ -0,0 +1,186 @@
+"""
+Network-wide aggregates behind /api/dashboard, served from materialized
+views.
+
+  dashboard_products_at_risk    per medicine low anywhere: hospitals low /
+                                out of stock, network stock, lowest
+                                days-to-zero (from inventory_summaries)
+  dashboard_stockouts_by_state  per hospital state: hospitals, stock-outs
+                                and low items
+  dashboard_expiring_stock      stock expired or expiring within 30 / 60 /
+                                90 days, valued at the cheapest active
+                                supplier's unit price
+
+Reads are a scan of a few hundred precomputed rows at most, whatever the
+size of ``inventories``.  ``refresh_views`` rebuilds them every
+``DASHBOARD_REFRESH_SECONDS`` with ``REFRESH MATERIALIZED VIEW
+CONCURRENTLY`` (each view has a unique index), so readers keep seeing
+the previous contents while a refresh runs; an advisory lock lets only
+one worker refresh at a time.  Figures are as of each view's
+``refreshed_at``.
+
+Migrations create frozen copies of the views; ``install`` also runs after
+``Base.metadata.create_all`` once this module is imported.
+"""
+
+import logging
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from db.db import Base
+
+from schemas.response import (
+    DashboardOverview,
+    ExpiringStock,
+    ExpiringStockReport,
+    ProductAtRisk,
+    ProductsAtRiskReport,
+    StateStockouts,
+    StockoutsByStateReport,
+)
+
+logger = logging.getLogger(__name__)
+
+# pg advisory lock serializing refreshes across workers
+_LOCK_KEY = 0x0DA5B0A2
+
+# name -> (query, unique index columns, extra index columns)
+_VIEWS: dict[str, tuple[str, str, str | None]] = {
+    "dashboard_products_at_risk": (
+        "SELECT s.product_id, p.brand_name, p.generic_name, "
+        "  count(*) AS hospitals, "
+        "  count(*) FILTER (WHERE s.is_low) AS hospitals_low, "
+        "  count(*) FILTER (WHERE s.total_stock <= 0) AS hospitals_out, "
+        "  sum(s.total_stock) AS total_stock, "
+        "  min(s.days_to_zero) AS min_days_to_zero, "
+        "  max(s.risk_score) AS max_risk_score, "
+        "  now() AS refreshed_at "
+        "FROM inventory_summaries AS s "
+        "JOIN hospitals AS h ON h.id = s.hospital_id AND h.is_active IS NOT FALSE "
+        "LEFT JOIN drug_products AS p ON p.id = s.product_id "
+        "GROUP BY s.product_id, p.brand_name, p.generic_name "
+        "HAVING count(*) FILTER (WHERE s.is_low) > 0",
+        "product_id",
+        "hospitals_low DESC, product_id",
+    ),
+    "dashboard_stockouts_by_state": (
+        "SELECT coalesce(h.state, '') AS state, "
+        "  count(DISTINCT h.id) AS hospitals, "
+        "  count(DISTINCT s.hospital_id) FILTER (WHERE s.total_stock <= 0) "
+        "    AS hospitals_with_stockouts, "
+        "  count(s.product_id) FILTER (WHERE s.total_stock <= 0) AS stockouts, "
+        "  count(s.product_id) FILTER (WHERE s.is_low) AS low, "
+        "  now() AS refreshed_at "
+        "FROM hospitals AS h "
+        "LEFT JOIN inventory_summaries AS s ON s.hospital_id = h.id "
+        "WHERE h.is_active IS NOT FALSE "
+        "GROUP BY 1",
+        "state",
+        None,
+    ),
+    "dashboard_expiring_stock": (
+        "WITH price AS ("
+        "  SELECT sp.product_id, min(sp.price_per_unit) AS price "
+        "  FROM supplier_products AS sp "
+        "  JOIN suppliers AS su ON su.id = sp.supplier_id AND su.is_active IS NOT FALSE "
+        "  WHERE sp.price_per_unit IS NOT NULL "
+        "  GROUP BY sp.product_id"
+        "), batch AS ("
+        "  SELECT i.hospital_id, i.product_id, i.current_stock, "
+        "    CASE WHEN i.expiry_date <= now() THEN 0 "
+        "         WHEN i.expiry_date <= now() + interval '30 days' THEN 30 "
+        "         WHEN i.expiry_date <= now() + interval '60 days' THEN 60 "
+        "         ELSE 90 END AS within_days "
+        "  FROM inventories AS i "
+        "  JOIN hospitals AS h ON h.id = i.hospital_id AND h.is_active IS NOT FALSE "
+        "  WHERE i.current_stock > 0 AND i.expiry_date <= now() + interval '90 days'"
+        ") "
+        "SELECT b.within_days, count(*) AS batches, "
+        "  count(DISTINCT b.hospital_id) AS hospitals, "
+        "  sum(b.current_stock) AS units, "
+        "  coalesce(sum(b.current_stock * p.price), 0) AS value, "
+        "  count(*) FILTER (WHERE p.price IS NULL) AS unpriced_batches, "
+        "  now() AS refreshed_at "
+        "FROM batch AS b LEFT JOIN price AS p ON p.product_id = b.product_id "
+        "GROUP BY b.within_days",
+        "within_days",
+        None,
+    ),
+}
+
+
+# ── schema ─────────────────────────────────────────────────────────────────
+def install(bind) -> None:
+    """Create (and populate) the views with their indexes."""
+    for name, (query, unique, extra) in _VIEWS.items():
+        bind.execute(text(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {query}"))
+        bind.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {name}_key ON {name} ({unique})"))
+        if extra:
+            bind.execute(text(f"CREATE INDEX IF NOT EXISTS {name}_rank ON {name} ({extra})"))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _install_after_create(target, connection, **kw):
+    if connection.dialect.name == "postgresql":
+        install(connection)
+
+
+def refresh_views(db: Session) -> bool:
+    """Refresh every view unless another worker is at it; True if refreshed."""
+    if not db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _LOCK_KEY}).scalar():
+        db.rollback()
+        return False
+    for name in _VIEWS:
+        db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"))
+    db.commit()
+    logger.debug("dashboard views refreshed")
+    return True
+
+
+# ── reads ──────────────────────────────────────────────────────────────────
+def _rows(db: Session, sql: str, **params) -> list[dict]:
+    return [dict(r) for r in db.execute(text(sql), params).mappings()]
+
+
+def _refreshed_at(rows: list[dict]):
+    return rows[0]["refreshed_at"] if rows else None
+
+
+def products_at_risk(db: Session, limit: int) -> ProductsAtRiskReport:
+    rows = _rows(
+        db,
+        "SELECT * FROM dashboard_products_at_risk "
+        "ORDER BY hospitals_low DESC, product_id LIMIT :limit",
+        limit=limit,
+    )
+    total = db.scalar(text("SELECT count(*) FROM dashboard_products_at_risk"))
+    return ProductsAtRiskReport(
+        refreshed_at=_refreshed_at(rows),
+        total=total,
+        items=[ProductAtRisk(**r) for r in rows],
+    )
+
+
+def stockouts_by_state(db: Session) -> StockoutsByStateReport:
+    rows = _rows(db, "SELECT * FROM dashboard_stockouts_by_state ORDER BY stockouts DESC, state")
+    return StockoutsByStateReport(
+        refreshed_at=_refreshed_at(rows),
+        items=[StateStockouts(**{**r, "state": r["state"] or None}) for r in rows],
+    )
+
+
+def expiring_stock(db: Session) -> ExpiringStockReport:
+    rows = _rows(db, "SELECT * FROM dashboard_expiring_stock ORDER BY within_days")
+    return ExpiringStockReport(
+        refreshed_at=_refreshed_at(rows),
+        items=[ExpiringStock(**r) for r in rows],
+    )
+
+
+def overview(db: Session, limit: int) -> DashboardOverview:
+    return DashboardOverview(
+        products_at_risk=products_at_risk(db, limit),
+        stockouts_by_state=stockouts_by_state(db),
+        expiring_stock=expiring_stock(db),
+    )
@@ -0,0 +1,179 @@
+"""
+Constant-memory export of the drug catalog as NDJSON or CSV.
+
+Products, ingredients and supplier links are read through three
+server-side cursors (``yield_per``), each ordered by product id, and
+merge-joined in Python, so only one batch per cursor is ever held in
+memory no matter how large the catalog is.  All three run inside one
+REPEATABLE READ transaction and therefore see the same snapshot.
+
+Exports always use the sync (psycopg2) engine; Starlette iterates the
+generator in its threadpool.
+"""
+
+import csv
+import io
+import json
+from typing import Iterator, Literal
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from db.db import SessionLocal
+from models.models import DrugProduct, DrugIngredient, SupplierProduct, Supplier
+
+ExportFormat = Literal["ndjson", "csv"]
+
+YIELD_PER = 2000           # rows fetched per round trip, per cursor
+CHUNK_BYTES = 64 * 1024    # response bytes buffered before each write
+
+PRODUCT_FIELDS = (
+    "id",
+    "application_id",
+    "brand_name",
+    "generic_name",
+    "dosage_form",
+    "route",
+    "marketing_status",
+    "product_ndc",
+    "manufacturer_name",
+    "rxcui",
+    "created_at",
+    "updated_at",
+)
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _stream(db: Session, stmt):
+    return db.execute(stmt.execution_options(yield_per=YIELD_PER))
+
+
+def _children(rows) -> Iterator[tuple[int, list]]:
+    """Group a product_id-ordered stream into (product_id, [rows])."""
+    current, group = None, []
+    for row in rows:
+        if row.product_id != current:
+            if group:
+                yield current, group
+            current, group = row.product_id, []
+        group.append(row)
+    if group:
+        yield current, group
+
+
+def iter_catalog(db: Session) -> Iterator[dict]:
+    """Yield one dict per product with its ingredients and suppliers."""
+    products = _stream(
+        db,
+        select(*(getattr(DrugProduct, f) for f in PRODUCT_FIELDS))
+        .order_by(DrugProduct.id),
+    )
+    ingredients = _children(_stream(
+        db,
+        select(
+            DrugIngredient.product_id,
+            DrugIngredient.name,
+            DrugIngredient.strength,
+            DrugIngredient.unii,
+        )
+        .where(DrugIngredient.product_id.isnot(None))
+        .order_by(DrugIngredient.product_id, DrugIngredient.id),
+    ))
+    suppliers = _children(_stream(
+        db,
+        select(
+            SupplierProduct.product_id,
+            SupplierProduct.supplier_id,
+            Supplier.name,
+            SupplierProduct.price_per_unit,
+        )
+        .join(Supplier, Supplier.id == SupplierProduct.supplier_id)
+        .where(SupplierProduct.product_id.isnot(None))
+        .order_by(SupplierProduct.product_id, SupplierProduct.supplier_id),
+    ))
+
+    next_ing = next(ingredients, None)
+    next_sup = next(suppliers, None)
+    for product in products:
+        record = dict(product._mapping)
+        pid = record["id"]
+
+        while next_ing and next_ing[0] < pid:
+            next_ing = next(ingredients, None)
+        record["ingredients"] = []
+        if next_ing and next_ing[0] == pid:
+            record["ingredients"] = [
+                {"name": r.name, "strength": r.strength, "unii": r.unii}
+                for r in next_ing[1]
+            ]
+            next_ing = next(ingredients, None)
+
+        while next_sup and next_sup[0] < pid:
+            next_sup = next(suppliers, None)
+        record["suppliers"] = []
+        if next_sup and next_sup[0] == pid:
+            record["suppliers"] = [
+                {"id": r.supplier_id, "name": r.name, "price_per_unit": r.price_per_unit}
+                for r in next_sup[1]
+            ]
+            next_sup = next(suppliers, None)
+
+        yield record
+
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _ndjson_lines(records: Iterator[dict]) -> Iterator[str]:
+    for record in records:
+        yield json.dumps(record, default=_json_default, separators=(",", ":")) + "\n"
+
+
+def _csv_lines(records: Iterator[dict]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([*PRODUCT_FIELDS, "ingredients", "suppliers"])
+    for record in records:
+        writer.writerow([
+            *(record[f] for f in PRODUCT_FIELDS),
+            "; ".join(
+                " ".join(filter(None, (i["name"], i["strength"])))
+                for i in record["ingredients"]
+            ),
+            "; ".join(
+                s["name"] if s["price_per_unit"] is None
+                else f'{s["name"]}={s["price_per_unit"]}'
+                for s in record["suppliers"]
+            ),
+        ])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+
+def export_catalog(fmt: ExportFormat) -> Iterator[bytes]:
+    """Response body generator; owns its session for the whole stream."""
+    db = SessionLocal()
+    try:
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        lines = _csv_lines if fmt == "csv" else _ndjson_lines
+
+        chunk: list[str] = []
+        size = 0
+        for line in lines(iter_catalog(db)):
+            chunk.append(line)
+            size += len(line)
+            if size >= CHUNK_BYTES:
+                yield "".join(chunk).encode("utf-8")
+                chunk, size = [], 0
+        if chunk:
+            yield "".join(chunk).encode("utf-8")
+    finally:
+        db.close()
@@ -0,0 +1,267 @@
+"""
+First-expired-first-out batch allocation behind /api/inventory/dispense.
+
+``BatchHeaps`` keeps, per hospital, a min-heap per product of the
+hospital's usable batches keyed by (expiry, id) — batches without an
+expiry date last.  A hospital's heaps are loaded on first use and
+reloaded after ``FEFO_CACHE_TTL_SECONDS``, so picking the batches to
+draw from costs no query; stock levels always come from the locked rows.
+
+``dispense`` allocates each (hospital, product) line in two passes:
+
+  1. lock the heap's leading candidates with ``FOR UPDATE SKIP LOCKED``
+     and draw from them in FEFO order.  A batch another dispense holds
+     is skipped rather than waited for, so concurrent requests for a
+     popular product spread over its batches instead of queueing on the
+     earliest one;
+  2. only if that leaves a shortfall, lock the product's remaining
+     usable batches (waiting this time, straight from ``inventories`` so
+     batches the heap has not seen yet count too).
+
+Candidates pass 1 did not get back are checked without locking; those
+emptied or expired elsewhere (e.g. by usage ingestion) are dropped from
+the heap so later requests stop falling through to pass 2.
+
+All stock changes go out in one UPDATE, and the dispensed quantities are
+logged as usage (and rolled up) in the same transaction.  Bulk usage
+ingestion keeps its own single-statement FEFO draw (services/ingest.py);
+it needs no per-batch answer.
+"""
+
+import heapq
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import case, or_, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from config.config import settings
+from models.models import Inventory
+from services.usage_store import insert_usage
+
+logger = logging.getLogger(__name__)
+
+# batches locked per product in the skip-locked pass
+_CANDIDATES = 8
+_DEADLOCK = "40P01"
+
+
+def _usable(now: datetime):
+    return (
+        Inventory.current_stock > 0,
+        or_(Inventory.expiry_date.is_(None), Inventory.expiry_date > now),
+    )
+
+
+def _expiry_key(expiry: datetime | None) -> float:
+    return math.inf if expiry is None else expiry.timestamp()
+
+
+class BatchHeaps:
+    def __init__(self, ttl_seconds: float) -> None:
+        self.ttl = ttl_seconds
+        self._lock = threading.Lock()
+        # hospital_id -> (loaded at, {product_id: [(expiry key, batch id), ...]})
+        self._hospitals: dict[int, tuple[float, dict[int, list[tuple[float, int]]]]] = {}
+
+    def _load(self, db: Session, hospital_id: int) -> dict[int, list[tuple[float, int]]]:
+        rows = db.execute(
+            select(Inventory.product_id, Inventory.expiry_date, Inventory.id)
+            .where(Inventory.hospital_id == hospital_id, *_usable(datetime.now(timezone.utc)))
+        ).all()
+        heaps: dict[int, list[tuple[float, int]]] = {}
+        for product_id, expiry, batch_id in rows:
+            heaps.setdefault(product_id, []).append((_expiry_key(expiry), batch_id))
+        for heap in heaps.values():
+            heapq.heapify(heap)
+        return heaps
+
+    def _heaps(self, db: Session, hospital_id: int) -> dict[int, list[tuple[float, int]]]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._hospitals.get(hospital_id)
+        if cached is not None and now - cached[0] < self.ttl:
+            return cached[1]
+        heaps = self._load(db, hospital_id)
+        with self._lock:
+            self._hospitals[hospital_id] = (now, heaps)
+        return heaps
+
+    def candidates(self, db: Session, hospital_id: int, product_id: int, n: int) -> list[int]:
+        """Ids of up to *n* batches to draw from first, earliest expiry first."""
+        heaps = self._heaps(db, hospital_id)
+        cutoff = time.time()
+        with self._lock:
+            heap = heaps.get(product_id)
+            if not heap:
+                return []
+            while heap and heap[0][0] <= cutoff:   # expired since loading
+                heapq.heappop(heap)
+            return [batch_id for _, batch_id in heapq.nsmallest(n, heap)]
+
+    def contains(self, hospital_id: int, product_id: int, batch_id: int) -> bool:
+        with self._lock:
+            cached = self._hospitals.get(hospital_id)
+            heap = cached[1].get(product_id, ()) if cached else ()
+            return any(entry[1] == batch_id for entry in heap)
+
+    def discard(self, hospital_id: int, product_id: int, batch_ids: set[int]) -> None:
+        """Forget batches that were emptied."""
+        with self._lock:
+            cached = self._hospitals.get(hospital_id)
+            heap = cached[1].get(product_id) if cached else None
+            if heap:
+                heap[:] = [entry for entry in heap if entry[1] not in batch_ids]
+                heapq.heapify(heap)
+
+    def invalidate(self, hospital_id: int | None = None) -> None:
+        with self._lock:
+            if hospital_id is None:
+                self._hospitals.clear()
+            else:
+                self._hospitals.pop(hospital_id, None)
+
+
+batch_heaps = BatchHeaps(settings.FEFO_CACHE_TTL_SECONDS)
+
+
+# ── allocation ─────────────────────────────────────────────────────────────
+def _lock_batches(db: Session, hospital_id: int, product_id: int, now: datetime,
+                  ids: list[int] | None = None, exclude: set[int] = frozenset(),
+                  skip_locked: bool = False) -> list:
+    q = select(
+        Inventory.id, Inventory.batch_number, Inventory.expiry_date, Inventory.current_stock
+    ).where(
+        Inventory.hospital_id == hospital_id,
+        Inventory.product_id == product_id,
+        *_usable(now),
+    )
+    if ids is not None:
+        q = q.where(Inventory.id.in_(ids))
+    if exclude:
+        q = q.where(Inventory.id.not_in(exclude))
+    q = q.order_by(Inventory.expiry_date.asc().nulls_last(), Inventory.id)
+    return db.execute(q.with_for_update(skip_locked=skip_locked)).all()
+
+
+def _draw(rows: list, wanted: int, takes: dict[int, int], picked: list[dict]) -> int:
+    for batch_id, batch_number, expiry, stock in rows:
+        if wanted <= 0:
+            break
+        take = min(stock, wanted)
+        takes[batch_id] = take
+        picked.append({
+            "batch_id": batch_id,
+            "batch_number": batch_number,
+            "expiry_date": expiry,
+            "quantity": take,
+            "emptied": take == stock,
+        })
+        wanted -= take
+    return wanted
+
+
+def _prune_dead(db: Session, hospital_id: int, product_id: int, now: datetime,
+                ids: list[int], rows: list) -> None:
+    """
+    Drop heap candidates the skip-locked pass did not return because they
+    were emptied (or expired) elsewhere — not just locked by someone else.
+    """
+    missing = set(ids) - {r[0] for r in rows}
+    if not missing:
+        return
+    alive = set(db.scalars(
+        select(Inventory.id).where(Inventory.id.in_(missing), *_usable(now))
+    ))
+    if missing - alive:
+        batch_heaps.discard(hospital_id, product_id, missing - alive)
+
+
+def _allocate(db: Session, wanted: dict[tuple[int, int], int], now: datetime):
+    takes: dict[int, int] = {}
+    results = []
+    # a fixed key order keeps concurrent multi-line dispenses from deadlocking
+    for (hospital_id, product_id), quantity in sorted(wanted.items()):
+        picked: list[dict] = []
+        left = quantity
+        if left > 0:
+            ids = batch_heaps.candidates(db, hospital_id, product_id, _CANDIDATES)
+            if ids:
+                rows = _lock_batches(db, hospital_id, product_id, now, ids=ids, skip_locked=True)
+                left = _draw(rows, left, takes, picked)
+                _prune_dead(db, hospital_id, product_id, now, ids, rows)
+            if left > 0:
+                rows = _lock_batches(
+                    db, hospital_id, product_id, now, exclude={p["batch_id"] for p in picked}
+                )
+                left = _draw(rows, left, takes, picked)
+                if any(not batch_heaps.contains(hospital_id, product_id, r[0]) for r in rows):
+                    # restocked since the heap was loaded
+                    batch_heaps.invalidate(hospital_id)
+        results.append({
+            "hospital_id": hospital_id,
+            "product_id": product_id,
+            "requested": quantity,
+            "dispensed": quantity - left,
+            "shortfall": left,
+            "batches": picked,
+        })
+
+    if takes:
+        db.execute(
+            update(Inventory)
+            .where(Inventory.id.in_(takes))
+            .values(
+                current_stock=Inventory.current_stock - case(takes, value=Inventory.id),
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+    insert_usage(db, [(r["hospital_id"], r["product_id"], now, r["dispensed"])
+                      for r in results if r["dispensed"] > 0])
+    return results
+
+
+def deadlocked(e: OperationalError) -> bool:
+    code = getattr(e.orig, "pgcode", None) or getattr(e.orig, "sqlstate", None)
+    return code == _DEADLOCK
+
+
+def dispense(db: Session, lines: list[tuple[int, int, int]]) -> dict:
+    """
+    Draw each (hospital_id, product_id, quantity) from stock, earliest
+    expiry first.  Lines are allocated as far as stock allows; the rest
+    is reported as ``shortfall``.
+
+    Two dispenses whose skip-locked passes grabbed interleaved batches of
+    one product can deadlock in the blocking pass; Postgres aborts one of
+    them, which is rolled back and re-raised.  The caller retries it from
+    scratch (see routers/inventory.py), so the backoff never sleeps on
+    the event loop that ``DB_ASYNC`` runs this on.
+    """
+    wanted: dict[tuple[int, int], int] = {}
+    for hospital_id, product_id, quantity in lines:
+        wanted[(hospital_id, product_id)] = wanted.get((hospital_id, product_id), 0) + quantity
+
+    try:
+        results = _allocate(db, wanted, datetime.now(timezone.utc))
+        db.commit()
+    except OperationalError as e:
+        db.rollback()
+        if deadlocked(e):
+            logger.info("dispense deadlocked")
+        raise
+
+    for r in results:
+        emptied = {p["batch_id"] for p in r["batches"] if p["emptied"]}
+        if emptied:
+            batch_heaps.discard(r["hospital_id"], r["product_id"], emptied)
+    return {
+        "dispensed": sum(r["dispensed"] for r in results),
+        "shortfall": sum(r["shortfall"] for r in results),
+        "lines": results,
+    }
@@ -0,0 +1,455 @@
+"""
+Stock-out forecasting for ``Inventory.predicted_days_to_zero`` and
+``predicted_risk_score``.
+
+Consumption per (hospital, product) series is an exponentially weighted
+moving average of daily usage (days without a log count as zero), bias
+corrected from the series' first day:
+
+    rate_T = Σ_t α(1-α)^(T-t) · x_t  /  (1 - (1-α)^(T-s+1))
+
+with the same weights giving an EW variance.  Both numerators are linear
+in the daily totals, so the whole history reduces to one ``bincount`` per
+statistic — no per-series Python loop — and later batches of logs can be
+folded in incrementally.
+
+From stock on hand (non-expired batches) and the rate:
+
+    predicted_days_to_zero = stock / rate               (NULL when rate is 0)
+    predicted_risk_score   = P(demand over lead time > stock)
+                             with demand ~ N(rate·L, σ²·L)
+
+``run_forecast`` recomputes everything from the ``usage_daily`` rollup
+(services/usage_store.py) and writes all inventory rows back with a
+single ``UPDATE ... FROM unnest(...)``.  It also (re)seeds ``forecast_states`` with the per-series sums, so
+``update_forecasts`` can later fold in just the usage queued since in
+``forecast_pending``: the stored sums are decayed by (1-α)^Δdays, the new
+rows' weighted totals added, and only the inventory rows of the series
+they touched are rescored — O(new rows), not O(history).
+
+``insert_usage`` queues every batch of logs in ``forecast_pending`` in
+the statement that writes them, and each run empties the queue in the
+statement that reads the usage it folds.  Both happen under one
+snapshot, so usage committed by a slow transaction is folded by the
+first run that can see it — a log id watermark would skip it for good
+once a later id was folded.  Logs bulk loaded around ``insert_usage``
+are not queued; follow such a load with a full run.
+"""
+
+import io
+import logging
+import math
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import (
+    Date,
+    Integer,
+    cast,
+    delete,
+    func,
+    literal_column,
+    or_,
+    select,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+from config.config import settings
+from models.models import ForecastPending, ForecastState, Inventory, UsageDaily
+
+logger = logging.getLogger(__name__)
+
+# pg advisory lock serializing full and incremental runs
+_LOCK_KEY = 0x0F04EC57
+_erfc = np.vectorize(math.erfc, otypes=[float])
+
+
+def day_number(d: date | datetime) -> int:
+    """Days since 1970-01-01."""
+    if isinstance(d, datetime):
+        d = d.date()
+    return (d - date(1970, 1, 1)).days
+
+
+def today_number() -> int:
+    return day_number(datetime.now(timezone.utc))
+
+
+def series_keys(hospital_ids: np.ndarray, product_ids: np.ndarray) -> np.ndarray:
+    """One int64 key per (hospital_id, product_id)."""
+    return (hospital_ids.astype(np.int64) << 32) | product_ids.astype(np.int64)
+
+
+def split_keys(keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    return keys >> 32, keys & 0xFFFFFFFF
+
+
+# ── reading ────────────────────────────────────────────────────────────────
+def _read_ints(db: Session, stmt, ncols: int) -> np.ndarray:
+    """
+    All rows of an all-integer *stmt* as an (n, ncols) int64 array.  The
+    rows come through ``COPY (...) TO STDOUT`` and are parsed in one numpy
+    call instead of being built as Python tuples.
+    """
+    conn = db.connection()
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    with conn.connection.driver_connection.cursor() as cur:
+        sql = cur.mogrify(str(compiled), compiled.params).decode()
+        buf = io.StringIO()
+        cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv)", buf)
+    raw = buf.getvalue()
+    if not raw:
+        return np.zeros((0, ncols), dtype=np.int64)
+    values = raw.replace("\n", ",").rstrip(",").split(",")
+    return np.array(values, dtype=np.int64).reshape(-1, ncols)
+
+
+def _for_keys(stmt, keys: np.ndarray, hospital_col, product_col):
+    """
+    *stmt* restricted to the series in *keys*: one join against unnested
+    arrays, which Postgres plans far better than a long row-value IN list.
+    """
+    hosp, prod = split_keys(keys)
+    wanted = func.unnest(
+        cast(hosp.tolist(), ARRAY(Integer)), cast(prod.tolist(), ARRAY(Integer))
+    ).table_valued("hospital_id", "product_id").render_derived(name="wanted")
+    return stmt.join(
+        wanted, (hospital_col == wanted.c.hospital_id) & (product_col == wanted.c.product_id)
+    )
+
+
+def day_expr(column):
+    """SQL for the day number of a timestamp or date column."""
+    return cast(column, Date) - literal_column("DATE '1970-01-01'")
+
+
+def daily_usage(db: Session, since_day: int):
+    """
+    (keys, day numbers, quantities, highest log ids) of per-day usage
+    totals from *since_day* on, read from the usage_daily rollup.  The
+    same statement empties forecast_pending: everything it read is folded.
+    """
+    day = day_expr(UsageDaily.day)
+    since = date(1970, 1, 1) + timedelta(days=since_day)
+    stmt = select(
+        UsageDaily.hospital_id,
+        UsageDaily.product_id,
+        day,
+        UsageDaily.quantity,
+        UsageDaily.last_log_id,
+    ).where(UsageDaily.day >= since).add_cte(delete(ForecastPending).cte("drained"))
+    rows = _read_ints(db, stmt, 5)
+    return series_keys(rows[:, 0], rows[:, 1]), rows[:, 2], rows[:, 3].astype(float), rows[:, 4]
+
+
+_DRAIN = text(
+    "WITH drained AS ("
+    "  DELETE FROM forecast_pending RETURNING hospital_id, product_id, day, quantity, events"
+    "), d AS ("
+    "  SELECT hospital_id, product_id, day, sum(quantity) AS quantity, sum(events) AS events "
+    "  FROM drained GROUP BY 1, 2, 3"
+    ") "
+    "SELECT d.hospital_id, d.product_id, d.day - DATE '1970-01-01', d.quantity, "
+    "  greatest(coalesce(r.quantity, 0) - d.quantity, 0), coalesce(r.last_log_id, 0), d.events "
+    "FROM d LEFT JOIN usage_daily AS r "
+    "  ON r.hospital_id = d.hospital_id AND r.product_id = d.product_id AND r.day = d.day"
+)
+
+
+def pending_usage(db: Session):
+    """
+    Empty forecast_pending.  Per (series, day) it held usage for: (keys,
+    day numbers, quantities, usage already folded on that day, highest
+    log ids, log counts).  The rollup is read under the snapshot that
+    drains the queue, so rollup minus queue is exactly what was folded.
+    """
+    rows = _read_ints(db, _DRAIN, 7)
+    return (
+        series_keys(rows[:, 0], rows[:, 1]), rows[:, 2], rows[:, 3].astype(float),
+        rows[:, 4].astype(float), rows[:, 5], rows[:, 6],
+    )
+
+
+def stock_positions(db: Session, keys: np.ndarray | None = None):
+    """
+    (keys, usable stock, lead time days) per inventoried (hospital,
+    product), sorted by key; only the series in *keys* when given.
+    """
+    now = datetime.now(timezone.utc)
+    stmt = (
+        select(
+            Inventory.hospital_id,
+            Inventory.product_id,
+            func.coalesce(
+                func.sum(Inventory.current_stock).filter(
+                    or_(Inventory.expiry_date.is_(None), Inventory.expiry_date > now)
+                ),
+                0,
+            ),
+            func.coalesce(
+                func.max(Inventory.lead_time_days), settings.FORECAST_DEFAULT_LEAD_TIME_DAYS
+            ),
+        )
+        .where(Inventory.hospital_id.is_not(None), Inventory.product_id.is_not(None))
+        .group_by(Inventory.hospital_id, Inventory.product_id)
+    )
+    if keys is not None:
+        stmt = _for_keys(stmt, keys, Inventory.hospital_id, Inventory.product_id)
+    rows = _read_ints(db, stmt, 4)
+    inv_keys = series_keys(rows[:, 0], rows[:, 1])
+    order = np.argsort(inv_keys, kind="stable")
+    rows = rows[order]
+    return inv_keys[order], rows[:, 2].astype(float), rows[:, 3].astype(float)
+
+
+def load_states(db: Session, keys: np.ndarray):
+    """
+    Stored state of the series in *keys*, sorted by key: (keys, first day,
+    as-of day, Σ w·x, Σ w·x², last log id).
+    """
+    t = ForecastState.__table__.c
+    stmt = select(
+        t.hospital_id, t.product_id, t.first_day, t.as_of_day,
+        t.ew_usage, t.ew_usage_sq, t.last_log_id,
+    )
+    rows = sorted(db.execute(_for_keys(stmt, keys, t.hospital_id, t.product_id)).all())
+    ints = np.array([(r[0], r[1], r[2], r[3], r[6]) for r in rows], dtype=np.int64).reshape(-1, 5)
+    sums = np.array([(r[4], r[5]) for r in rows], dtype=float).reshape(-1, 2)
+    return (
+        series_keys(ints[:, 0], ints[:, 1]), ints[:, 2], ints[:, 3], sums[:, 0], sums[:, 1], ints[:, 4],
+    )
+
+
+# ── statistics ─────────────────────────────────────────────────────────────
+def ew_sums(keys: np.ndarray, days: np.ndarray, qty: np.ndarray, ref_day: int, prior=None):
+    """
+    Per series: (unique keys, first day, Σ w·x, Σ w·x²) with
+    w = α(1-α)^(ref_day - day).  *prior* is usage already summed for the
+    same (series, day) earlier; the x² term then adds (prior + x)² - prior²
+    so a day whose logs arrive in several batches stays exact.
+    """
+    alpha = settings.FORECAST_ALPHA
+    uniq, inv = np.unique(keys, return_inverse=True)
+    w = alpha * (1 - alpha) ** (ref_day - np.minimum(days, ref_day))
+    first = np.full(len(uniq), np.iinfo(np.int64).max)
+    np.minimum.at(first, inv, days)
+    s1 = np.bincount(inv, weights=w * qty, minlength=len(uniq))
+    sq = qty * qty if prior is None else qty * (qty + 2 * prior)
+    s2 = np.bincount(inv, weights=w * sq, minlength=len(uniq))
+    return uniq, first, s1, s2
+
+
+def rates(first_day: np.ndarray, s1: np.ndarray, s2: np.ndarray, ref_day: int):
+    """Bias-corrected EW mean and standard deviation of daily usage."""
+    alpha = settings.FORECAST_ALPHA
+    span = np.maximum(ref_day - first_day + 1, 1)
+    norm = 1 - (1 - alpha) ** span
+    mean = s1 / norm
+    var = np.maximum(s2 / norm - mean * mean, 0.0)
+    return mean, np.sqrt(var)
+
+
+def score(stock: np.ndarray, rate: np.ndarray, sigma: np.ndarray, lead: np.ndarray):
+    """(days to zero — NaN when nothing is consumed, stock-out risk in [0, 1])."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days = np.where(rate > 0, stock / rate, np.where(stock <= 0, 0.0, np.nan))
+        demand = rate * lead
+        spread = sigma * np.sqrt(lead)
+        z = (stock - demand) / (spread * math.sqrt(2))
+    risk = np.where(
+        spread > 0,
+        0.5 * _erfc(np.where(spread > 0, z, 0.0)),
+        (demand >= stock).astype(float),
+    )
+    risk = np.where((rate <= 0) & (stock > 0), 0.0, risk)
+    return days, np.clip(risk, 0.0, 1.0)
+
+
+# ── writing ────────────────────────────────────────────────────────────────
+def write_forecasts(db: Session, keys: np.ndarray, days: np.ndarray, risk: np.ndarray) -> int:
+    """
+    Set both predictions on every batch of each series in one UPDATE;
+    batches already holding them are skipped.  Returns rows changed.
+    """
+    if not len(keys):
+        return 0
+    hosp, prod = split_keys(keys)
+    rows = {
+        "hospital_ids": hosp.tolist(),
+        "product_ids": prod.tolist(),
+        "days": [None if np.isnan(d) else round(float(d), 3) for d in days],
+        "risks": np.round(risk, 4).tolist(),
+    }
+    return db.execute(
+        text(
+            "UPDATE inventories AS i "
+            "SET predicted_days_to_zero = f.days, predicted_risk_score = f.risk "
+            "FROM unnest(CAST(:hospital_ids AS integer[]), CAST(:product_ids AS integer[]), "
+            "CAST(:days AS double precision[]), CAST(:risks AS double precision[])) "
+            "AS f(hospital_id, product_id, days, risk) "
+            "WHERE i.hospital_id = f.hospital_id AND i.product_id = f.product_id "
+            "  AND (i.predicted_days_to_zero, i.predicted_risk_score) "
+            "      IS DISTINCT FROM (f.days, f.risk)"
+        ),
+        rows,
+    ).rowcount
+
+
+def save_states(
+    db: Session,
+    keys: np.ndarray,
+    first: np.ndarray,
+    as_of: int,
+    s1: np.ndarray,
+    s2: np.ndarray,
+    last_ids: np.ndarray,
+    replace: bool = False,
+) -> None:
+    """Upsert the state of each series; *replace* drops every other series."""
+    hosp, prod = split_keys(keys)
+    rows = {
+        "hospital_ids": hosp.tolist(),
+        "product_ids": prod.tolist(),
+        "first_days": first.tolist(),
+        "s1": s1.tolist(),
+        "s2": s2.tolist(),
+        "last_ids": last_ids.tolist(),
+    }
+    if replace:
+        db.execute(delete(ForecastState))
+    if not len(keys):
+        return
+    db.execute(
+        text(
+            "INSERT INTO forecast_states AS s (hospital_id, product_id, first_day, "
+            "as_of_day, ew_usage, ew_usage_sq, last_log_id, updated_at) "
+            "SELECT f.hospital_id, f.product_id, f.first_day, :as_of, f.s1, f.s2, "
+            "f.last_id, now() "
+            "FROM unnest(CAST(:hospital_ids AS integer[]), CAST(:product_ids AS integer[]), "
+            "CAST(:first_days AS integer[]), CAST(:s1 AS double precision[]), "
+            "CAST(:s2 AS double precision[]), CAST(:last_ids AS integer[])) "
+            "AS f(hospital_id, product_id, first_day, s1, s2, last_id) "
+            "ON CONFLICT (hospital_id, product_id) DO UPDATE SET "
+            "first_day = excluded.first_day, as_of_day = excluded.as_of_day, "
+            "ew_usage = excluded.ew_usage, ew_usage_sq = excluded.ew_usage_sq, "
+            "last_log_id = excluded.last_log_id, updated_at = excluded.updated_at"
+        ),
+        {**rows, "as_of": int(as_of)},
+    )
+
+
+def align(target: np.ndarray, keys: np.ndarray, *values: np.ndarray, fill=0.0):
+    """Values of sorted *keys* re-ordered onto *target* keys (missing → *fill*)."""
+    pos = np.searchsorted(keys, target)
+    pos = np.minimum(pos, max(len(keys) - 1, 0))
+    hit = (keys[pos] == target) if len(keys) else np.zeros(len(target), dtype=bool)
+    return [np.where(hit, v[pos] if len(v) else fill, fill) for v in values]
+
+
+# ── runs ───────────────────────────────────────────────────────────────────
+def _lock(db: Session, wait: bool = True) -> bool:
+    """Take the forecast lock for this transaction."""
+    fn = "pg_advisory_xact_lock" if wait else "pg_try_advisory_xact_lock"
+    got = db.execute(text(f"SELECT {fn}(:key)"), {"key": _LOCK_KEY}).scalar()
+    return wait or bool(got)
+
+
+def _rescore(db: Session, uniq: np.ndarray, rate: np.ndarray, sigma: np.ndarray, only=None):
+    """Score and write the inventory series (restricted to *only* when given)."""
+    inv_keys, stock, lead = stock_positions(db, only)
+    rate_i, sigma_i = align(inv_keys, uniq, rate, sigma)
+    pred_days, risk = score(stock, rate_i, sigma_i, lead)
+    updated = write_forecasts(db, inv_keys, pred_days, risk)
+    return len(inv_keys), updated, int((risk >= 0.5).sum())
+
+
+def run_forecast(db: Session) -> dict:
+    """
+    Recompute every series from the daily rollup, write the predictions and
+    reseed the incremental state.
+    """
+    started = time.perf_counter()
+    _lock(db)
+    ref = today_number()
+    keys, days, qty, log_ids = daily_usage(db, ref - settings.FORECAST_HISTORY_DAYS + 1)
+    uniq, first, s1, s2 = ew_sums(keys, days, qty, ref)
+    rate, sigma = rates(first, s1, s2, ref)
+
+    last_ids = np.zeros(len(uniq), dtype=np.int64)
+    np.maximum.at(last_ids, np.searchsorted(uniq, keys), log_ids)
+    save_states(db, uniq, first, ref, s1, s2, last_ids, replace=True)
+
+    inventory_series, updated, at_risk = _rescore(db, uniq, rate, sigma)
+    db.commit()
+
+    summary = {
+        "usage_days": int(len(keys)),
+        "series": int(len(uniq)),
+        "inventory_series": int(inventory_series),
+        "rows_updated": int(updated),
+        "at_risk": at_risk,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    logger.info("forecast run: %s", summary)
+    return summary
+
+
+def update_forecasts(db: Session) -> dict:
+    """
+    Fold usage queued since the last run into the stored state and
+    rescore only the series it touches.  Seeds the state with a full run
+    when there is none and usage is queued (with nothing queued a seed
+    would find no usage to fold either); skipped while another run holds
+    the lock.
+    """
+    started = time.perf_counter()
+    summary = {"new_logs": 0, "series": 0, "rows_updated": 0, "at_risk": 0, "skipped": False}
+    if not _lock(db, wait=False):
+        db.rollback()
+        return {**summary, "skipped": True, "seconds": 0.0}
+
+    if db.scalar(select(ForecastState.hospital_id).limit(1)) is None:
+        if db.scalar(select(ForecastPending.id).limit(1)) is None:
+            db.commit()
+            return {**summary, "seconds": round(time.perf_counter() - started, 2)}
+        return run_forecast(db)
+
+    # per-(series, day) totals, plus what earlier runs folded on those days
+    keys, days, qty, prior, pair_last, events = pending_usage(db)
+    if not len(keys):
+        db.commit()
+        return {**summary, "seconds": round(time.perf_counter() - started, 2)}
+
+    state_keys, old_first, old_as_of, old_s1, old_s2, old_last = load_states(db, np.unique(keys))
+    ref = max(today_number(), int(old_as_of.max()) if len(old_as_of) else 0)
+    uniq, first, s1, s2 = ew_sums(keys, days, qty, ref, prior)
+    last_ids = np.zeros(len(uniq), dtype=np.int64)
+    np.maximum.at(last_ids, np.searchsorted(uniq, keys), pair_last)
+
+    # decay the stored sums from their as-of day to ref and add them in
+    never = np.iinfo(np.int64).max
+    (prev_first,) = align(uniq, state_keys, old_first, fill=never)
+    prev_as_of, prev_s1, prev_s2, prev_last = align(uniq, state_keys, old_as_of, old_s1, old_s2, old_last)
+    decay = (1 - settings.FORECAST_ALPHA) ** (ref - prev_as_of)
+    s1 = s1 + prev_s1 * decay
+    s2 = s2 + prev_s2 * decay
+    first = np.minimum(first, prev_first).astype(np.int64)
+    last_ids = np.maximum(last_ids, prev_last).astype(np.int64)
+    save_states(db, uniq, first, ref, s1, s2, last_ids)
+
+    rate, sigma = rates(first, s1, s2, ref)
+    _, updated, at_risk = _rescore(db, uniq, rate, sigma, only=uniq)
+    db.commit()
+
+    summary.update(
+        new_logs=int(events.sum()),
+        series=int(len(uniq)),
+        rows_updated=int(updated),
+        at_risk=at_risk,
+        seconds=round(time.perf_counter() - started, 2),
+    )
+    logger.info("incremental forecast: %s", summary)
+    return summary
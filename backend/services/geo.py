@@ -0,0 +1,191 @@
+"""
+Geometry helpers for hospital lookups: haversine distances, geohash
+encoding / prefix covers, and a small KD-tree over unit vectors.
+
+Points are embedded on the unit sphere as 3-D vectors, so straight-line
+(chord) distance is monotonic in great-circle distance and a plain
+Euclidean KD-tree answers nearest-neighbour queries correctly across the
+antimeridian and near the poles.
+"""
+
+import heapq
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+_BASE32 = np.array(list("0123456789bcdefghjkmnpqrstuvwxyz"))
+GEOHASH_PRECISION = 9   # ~5 m cells; what the hospitals.geohash column stores
+
+
+# ── distances ─────────────────────────────────────────────────────────────
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; broadcasts over numpy arrays."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def unit_vectors(lat, lon) -> np.ndarray:
+    """(n, 3) points on the unit sphere for degree arrays *lat*, *lon*."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def chord_for_km(km: float) -> float:
+    """Unit-sphere chord length matching a great-circle distance of *km*."""
+    angle = min(km / EARTH_RADIUS_KM, math.pi)
+    return 2 * math.sin(angle / 2)
+
+
+# ── geohash ───────────────────────────────────────────────────────────────
+def _bits(precision: int) -> tuple[int, int]:
+    total = 5 * precision
+    return (total + 1) // 2, total // 2   # (lon bits, lat bits)
+
+
+def geohash_encode_many(lat, lon, precision: int = GEOHASH_PRECISION) -> np.ndarray:
+    """Vectorized geohash of degree arrays *lat*, *lon* (precision <= 12)."""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    if not lat.size:
+        return np.array([], dtype=f"<U{precision}")
+    lon_bits, lat_bits = _bits(precision)
+    qlon = np.clip(((lon + 180) / 360 * (1 << lon_bits)).astype(np.int64), 0, (1 << lon_bits) - 1)
+    qlat = np.clip(((lat + 90) / 180 * (1 << lat_bits)).astype(np.int64), 0, (1 << lat_bits) - 1)
+
+    code = np.zeros(lat.shape, dtype=np.int64)
+    for i in range(5 * precision):
+        # even bits come from longitude, odd bits from latitude, MSB first
+        if i % 2 == 0:
+            bit = (qlon >> (lon_bits - 1 - i // 2)) & 1
+        else:
+            bit = (qlat >> (lat_bits - 1 - i // 2)) & 1
+        code = (code << 1) | bit
+
+    shifts = 5 * np.arange(precision - 1, -1, -1)
+    chars = _BASE32[(code[:, None] >> shifts) & 31]
+    return np.ascontiguousarray(chars).view(f"<U{precision}").ravel()
+
+
+def geohash_encode(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    return str(geohash_encode_many([lat], [lon], precision)[0])
+
+
+def geohash_cover(lat: float, lon: float, radius_km: float, max_precision: int = 7) -> list[str] | None:
+    """
+    Geohash prefixes whose cells together contain every point within
+    *radius_km* of (lat, lon): the finest precision whose cells are at
+    least *radius_km* across, center cell plus its 8 neighbours.  None when
+    even the coarsest cells are too small (huge radius or polar query).
+    """
+    # narrowest parallel the circle touches decides how wide cells really are
+    reach = radius_km / KM_PER_DEGREE
+    edge_lat = min(90.0, abs(lat) + reach)
+    cos_edge = math.cos(math.radians(edge_lat))
+
+    for precision in range(max_precision, 0, -1):
+        lon_bits, lat_bits = _bits(precision)
+        h_deg = 180 / (1 << lat_bits)
+        w_deg = 360 / (1 << lon_bits)
+        if h_deg * KM_PER_DEGREE < radius_km or w_deg * KM_PER_DEGREE * cos_edge < radius_km:
+            continue
+        lats, lons = [], []
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                lats.append(min(90.0, max(-90.0, lat + dy * h_deg)))
+                lons.append((lon + dx * w_deg + 180) % 360 - 180)
+        return sorted(set(geohash_encode_many(lats, lons, precision).tolist()))
+    return None
+
+
+# ── KD-tree ───────────────────────────────────────────────────────────────
+class KDTree:
+    """
+    Static KD-tree over (n, d) points with bounding-box pruning; leaves are
+    scanned with numpy.  Build is O(n log n), k-NN queries visit a handful
+    of leaves.
+    """
+
+    def __init__(self, points: np.ndarray, leaf_size: int = 32) -> None:
+        self.points = np.asarray(points, dtype=float)
+        self.order = np.arange(len(self.points))
+        self.leaf_size = leaf_size
+        # per node: slice of self.order, children (-1 for leaves), bbox
+        self.start: list[int] = []
+        self.end: list[int] = []
+        self.left: list[int] = []
+        self.right: list[int] = []
+        self.lo: list[np.ndarray] = []
+        self.hi: list[np.ndarray] = []
+        if len(self.points):
+            self._build(0, len(self.points))
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _build(self, start: int, end: int) -> int:
+        node = len(self.start)
+        idx = self.order[start:end]
+        pts = self.points[idx]
+        lo, hi = pts.min(axis=0), pts.max(axis=0)
+        self.start.append(start)
+        self.end.append(end)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.lo.append(lo)
+        self.hi.append(hi)
+        if end - start > self.leaf_size:
+            dim = int(np.argmax(hi - lo))
+            mid = (start + end) // 2
+            part = np.argpartition(pts[:, dim], mid - start)
+            self.order[start:end] = idx[part]
+            self.left[node] = self._build(start, mid)
+            self.right[node] = self._build(mid, end)
+        return node
+
+    def _box_distance(self, node: int, x: np.ndarray) -> float:
+        gap = np.maximum(np.maximum(self.lo[node] - x, 0.0), x - self.hi[node])
+        return float(np.sqrt(gap @ gap))
+
+    def query(self, x, k: int, max_distance: float = math.inf) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The *k* nearest points to *x* within *max_distance*; returns
+        (distances, indices into the original points), nearest first.
+        """
+        x = np.asarray(x, dtype=float)
+        if not len(self.points) or k <= 0:
+            return np.zeros(0), np.zeros(0, dtype=np.int64)
+
+        best: list[tuple[float, int]] = []   # max-heap via negated distance
+        frontier = [(self._box_distance(0, x), 0)]
+        while frontier:
+            bound, node = heapq.heappop(frontier)
+            if bound > max_distance or (len(best) == k and bound >= -best[0][0]):
+                break
+            if self.left[node] >= 0:
+                for child in (self.left[node], self.right[node]):
+                    heapq.heappush(frontier, (self._box_distance(child, x), child))
+                continue
+            idx = self.order[self.start[node]:self.end[node]]
+            diff = self.points[idx] - x
+            dist = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+            for d, i in zip(dist.tolist(), idx.tolist()):
+                if d > max_distance:
+                    continue
+                if len(best) < k:
+                    heapq.heappush(best, (-d, i))
+                elif d < -best[0][0]:
+                    heapq.heapreplace(best, (-d, i))
+
+        best.sort(reverse=True)
+        return (
+            np.array([-d for d, _ in best]),
+            np.array([i for _, i in best], dtype=np.int64),
+        )
@@ -0,0 +1,297 @@
+"""
+Buffered ingestion of usage (dispensing) events behind POST /api/usage-logs.
+
+Requests do not write to Postgres themselves.  ``UsageIngestor.submit``
+queues a request's events and hands back a future; one flusher thread
+per worker drains the queue whenever ``USAGE_INGEST_BATCH_SIZE`` events
+are waiting or the oldest has waited ``USAGE_INGEST_MAX_DELAY_MS``, and
+writes everything queued in a single transaction (group commit):
+
+* one multi-row ``INSERT INTO usage_logs ... SELECT FROM unnest(...)``,
+  which also bumps the daily/weekly rollups (services/usage_store.py)
+* one ``UPDATE inventories`` drawing the used quantities from each
+  (hospital, product)'s non-expired batches, earliest expiry first.
+  The batches are locked (in key order) by a preceding ``SELECT ... FOR
+  UPDATE`` and the per-batch draw is computed afterwards from the locked
+  stock, so concurrent flushes and dispenses never lose a decrement or
+  drive a batch below zero.
+
+Only after the commit are the futures resolved, so a 2xx means the
+events are durable; any failure is reported to every waiting request,
+which should retry — delivery is at-least-once.  A batch rejected by a
+constraint (e.g. an unknown hospital) is retried one request at a time
+so only the offending request fails.  Once ``USAGE_INGEST_MAX_PENDING``
+events are queued new requests get 503 + Retry-After (backpressure).
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.orm import Session
+
+from config.config import settings
+from db.db import SessionLocal
+from services.usage_store import Event, insert_usage
+
+logger = logging.getLogger(__name__)
+
+_FLUSH_ATTEMPTS = 3   # transient errors (deadlock, dropped connection)
+
+
+# ── writing ────────────────────────────────────────────────────────────────
+def _usage_totals(events: list[Event]) -> dict[tuple[int, int], int]:
+    totals: dict[tuple[int, int], int] = {}
+    for hospital_id, product_id, _, qty in events:
+        key = (hospital_id, product_id)
+        totals[key] = totals.get(key, 0) + qty
+    return totals
+
+
+_USED = (
+    "used AS ("
+    "  SELECT * FROM unnest(CAST(:hospital_ids AS integer[]), "
+    "    CAST(:product_ids AS integer[]), CAST(:quantities AS integer[])) "
+    "    AS u(hospital_id, product_id, qty)"
+    ")"
+)
+
+
+def draw_stock(db: Session, totals: dict[tuple[int, int], int]) -> int:
+    """
+    Take each (hospital, product) quantity from its non-expired batches,
+    earliest expiry first; returns the number of batches drawn from.
+
+    The batches are locked first, in key order, and the draw is computed
+    by a second statement, so each batch's share comes from stock as it
+    stands once no one else can change it — a concurrent draw that
+    committed in between is fully accounted for.
+    """
+    totals = {k: q for k, q in totals.items() if q > 0}
+    if not totals:
+        return 0
+    hospital_ids, product_ids = zip(*totals)
+    params = {
+        "hospital_ids": list(hospital_ids),
+        "product_ids": list(product_ids),
+        "quantities": list(totals.values()),
+    }
+    locked = db.execute(
+        text(
+            "WITH " + _USED + " "
+            "SELECT i.id FROM inventories AS i JOIN used AS u "
+            "  ON i.hospital_id = u.hospital_id AND i.product_id = u.product_id "
+            "WHERE i.current_stock > 0 "
+            "  AND (i.expiry_date IS NULL OR i.expiry_date > now()) "
+            "ORDER BY i.hospital_id, i.product_id, i.expiry_date NULLS LAST, i.id "
+            "FOR UPDATE OF i"
+        ),
+        params,
+    ).scalars().all()
+    if not locked:
+        return 0
+    result = db.execute(
+        text(
+            "WITH " + _USED + ", wanted AS ("
+            "  SELECT i.id, u.qty - (sum(i.current_stock) OVER w - i.current_stock) AS qty "
+            "  FROM inventories AS i JOIN used AS u "
+            "    ON i.hospital_id = u.hospital_id AND i.product_id = u.product_id "
+            "  WHERE i.id = ANY(CAST(:locked AS integer[])) AND i.current_stock > 0 "
+            "  WINDOW w AS (PARTITION BY i.hospital_id, i.product_id "
+            "    ORDER BY i.expiry_date NULLS LAST, i.id)"
+            ") "
+            "UPDATE inventories AS i "
+            "SET current_stock = i.current_stock - LEAST(i.current_stock, w.qty), "
+            "    updated_at = now() "
+            "FROM wanted AS w "
+            "WHERE i.id = w.id AND w.qty > 0"
+        ),
+        {**params, "locked": list(locked)},
+    )
+    return result.rowcount
+
+
+def write_usage(db: Session, events: list[Event]) -> int:
+    """
+    Insert *events* into usage_logs (and the usage rollups) and draw them
+    from stock; returns the number of batches drawn from.
+    """
+    if not events:
+        return 0
+    insert_usage(db, events)
+    return draw_stock(db, _usage_totals(events))
+
+
+# ── buffering ──────────────────────────────────────────────────────────────
+class UsageIngestor:
+    def __init__(
+        self,
+        batch_size: int,
+        max_delay_seconds: float,
+        max_pending: int,
+        session_factory=SessionLocal,
+    ) -> None:
+        self.batch_size = batch_size
+        self.max_delay = max_delay_seconds
+        self.max_pending = max_pending
+        self._session_factory = session_factory
+        self._cond = threading.Condition()
+        # (events, future, enqueued at) per submitted request
+        self._queue: deque[tuple[list[Event], Future, float]] = deque()
+        self._pending = 0
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+        self._counters = {"accepted": 0, "rejected": 0, "flushes": 0, "failed_flushes": 0}
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {**self._counters, "pending": self._pending}
+
+    # ── producer side ──────────────────────────────────────────────────────
+    def submit(self, events: list[Event]) -> Future:
+        """
+        Queue *events*; the future resolves to their count once they are
+        committed.  Raises 503 when the buffer is full.
+        """
+        future: Future = Future()
+        if not events:
+            future.set_result(0)
+            return future
+        with self._cond:
+            if self._stopping or self._thread is None:
+                raise HTTPException(status_code=503, detail="Usage ingestion is not running")
+            if self._pending + len(events) > self.max_pending:
+                self._counters["rejected"] += len(events)
+                raise HTTPException(
+                    status_code=503,
+                    detail="Usage ingestion is saturated, retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self._queue.append((events, future, time.monotonic()))
+            self._pending += len(events)
+            # wake the flusher to start the delay clock, or flush right away
+            if len(self._queue) == 1 or self._pending >= self.batch_size:
+                self._cond.notify()
+        return future
+
+    # ── flusher thread ─────────────────────────────────────────────────────
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="usage-ingest", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Flush whatever is queued, then stop the thread."""
+        with self._cond:
+            thread, self._stopping = self._thread, True
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            self._thread = None
+
+    def _take(self) -> list[tuple[list[Event], Future, float]] | None:
+        """Block until a batch is due; None once stopped and drained."""
+        with self._cond:
+            while True:
+                if self._queue:
+                    due = self._queue[0][2] + self.max_delay
+                    if self._pending >= self.batch_size or self._stopping or time.monotonic() >= due:
+                        break
+                    self._cond.wait(max(due - time.monotonic(), 0.0))
+                elif self._stopping:
+                    return None
+                else:
+                    self._cond.wait()
+
+            group, size = [], 0
+            while self._queue and (not group or size + len(self._queue[0][0]) <= self.batch_size):
+                item = self._queue.popleft()
+                group.append(item)
+                size += len(item[0])
+            self._pending -= size
+            return group
+
+    def _run(self) -> None:
+        while (group := self._take()) is not None:
+            try:
+                self._flush(group)
+            except Exception:
+                logger.exception("usage flush crashed")
+                for _, future, _ in group:
+                    if not future.done():
+                        future.set_exception(
+                            HTTPException(status_code=503, detail="Usage events were not stored, retry")
+                        )
+
+    def _commit(self, events: list[Event]) -> None:
+        for attempt in range(_FLUSH_ATTEMPTS):
+            db = self._session_factory()
+            try:
+                batches = write_usage(db, events)
+                db.commit()
+                logger.debug("flushed %d usage events, drew from %d batches", len(events), batches)
+                return
+            except IntegrityError:
+                db.rollback()
+                raise
+            except DBAPIError:
+                db.rollback()
+                if attempt == _FLUSH_ATTEMPTS - 1:
+                    raise
+                logger.warning("usage flush failed, retrying", exc_info=True)
+                time.sleep(0.05 * (attempt + 1))
+            finally:
+                db.close()
+
+    def _flush(self, group: list[tuple[list[Event], Future, float]]) -> None:
+        events = [e for item in group for e in item[0]]
+        try:
+            self._commit(events)
+            results = [(item, None) for item in group]
+        except IntegrityError:
+            if len(group) == 1:
+                results = [(group[0], HTTPException(
+                    status_code=422, detail="Unknown hospital_id or product_id in usage events"
+                ))]
+            else:
+                # isolate the request that broke the batch
+                for item in group:
+                    self._flush([item])
+                return
+        except Exception:
+            logger.exception("usage flush of %d events failed", len(events))
+            with self._cond:
+                self._counters["failed_flushes"] += 1
+            results = [
+                (item, HTTPException(status_code=503, detail="Usage events were not stored, retry"))
+                for item in group
+            ]
+
+        with self._cond:
+            self._counters["flushes"] += 1
+            self._counters["accepted"] += sum(len(item[0]) for item, err in results if err is None)
+        for (item_events, future, _), err in results:
+            if err is not None:
+                future.set_exception(err)
+            else:
+                future.set_result(len(item_events))
+
+
+usage_ingestor = UsageIngestor(
+    batch_size=settings.USAGE_INGEST_BATCH_SIZE,
+    max_delay_seconds=settings.USAGE_INGEST_MAX_DELAY_MS / 1000,
+    max_pending=settings.USAGE_INGEST_MAX_PENDING,
+)
@@ -0,0 +1,99 @@
+"""
+Inventory reads behind /api/inventory.
+
+Listings come from ``inventory_summaries`` (one row per hospital and
+medicine, kept current by triggers — see services/stock_summary.py), so
+a hospital's page, or just its low items via the partial ``is_low``
+index, is one index range scan whatever the number of batches.  Pages
+are keyed by product id (``seek_page``), so a deep page costs the same as
+the first.  Batch
+rows are only read for a single medicine's detail.
+"""
+
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.models import DrugProduct, Hospital, Inventory, InventorySummary
+from services.pagination import encode_cursor, seek_page
+from schemas.response import (
+    InventoryBatch,
+    InventoryDetail,
+    InventorySummaryItem,
+    PaginatedInventory,
+)
+
+
+def _summaries(db: Session, *filters):
+    return (
+        db.query(InventorySummary, DrugProduct.brand_name, DrugProduct.generic_name)
+        .outerjoin(DrugProduct, DrugProduct.id == InventorySummary.product_id)
+        .filter(*filters)
+    )
+
+
+def _item(row) -> InventorySummaryItem:
+    summary, brand_name, generic_name = row
+    item = InventorySummaryItem.model_validate(summary)
+    item.brand_name, item.generic_name = brand_name, generic_name
+    return item
+
+
+def hospital_inventory(
+    db: Session, hospital_id: int, low_only: bool, cursor: str | None, per_page: int
+) -> PaginatedInventory:
+    if db.get(Hospital, hospital_id) is None:
+        raise HTTPException(status_code=404, detail="Hospital not found")
+
+    filters = [InventorySummary.hospital_id == hospital_id]
+    if low_only:
+        filters.append(InventorySummary.is_low)
+    total = db.scalar(select(func.count()).select_from(InventorySummary).where(*filters))
+    # product ids are unique within a hospital, so they are their own tie-break
+    rows = seek_page(
+        _summaries(db, *filters),
+        InventorySummary.product_id,
+        InventorySummary.product_id,
+        cursor,
+        per_page + 1,
+    )
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    last = rows[-1][0].product_id if rows else None
+    return PaginatedInventory(
+        hospital_id=hospital_id,
+        total=total,
+        per_page=per_page,
+        has_more=has_more,
+        next_cursor=encode_cursor(last, last) if has_more else None,
+        items=[_item(r) for r in rows],
+    )
+
+
+def product_inventory(db: Session, hospital_id: int, product_id: int) -> InventoryDetail:
+    row = _summaries(
+        db,
+        InventorySummary.hospital_id == hospital_id,
+        InventorySummary.product_id == product_id,
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="No stock of this medicine at this hospital")
+
+    now = datetime.now(timezone.utc)
+    batches = db.scalars(
+        select(Inventory)
+        .where(Inventory.hospital_id == hospital_id, Inventory.product_id == product_id)
+        .order_by(Inventory.expiry_date.asc().nulls_last(), Inventory.id)
+    ).all()
+    return InventoryDetail(
+        hospital_id=hospital_id,
+        summary=_item(row),
+        batches=[
+            InventoryBatch.model_validate(b).model_copy(
+                update={"expired": b.expiry_date is not None and b.expiry_date <= now}
+            )
+            for b in batches
+        ],
+    )
@@ -0,0 +1,145 @@
+"""
+Nearest-hospital lookups behind /api/hospitals/nearby.
+
+``HospitalIndex`` keeps every active, geolocated hospital in an in-memory
+KD-tree (see ``services.geo``) and answers k-nearest / radius queries
+without touching Postgres.  Hospitals change rarely, so ``refresh`` just
+compares a cheap (count, max id, max updated_at) signature and rebuilds
+the whole tree when it moved.
+
+``nearby_from_db`` is the fallback used while the index is not loaded:
+it narrows candidates with the geohash prefix index (or a lat/lon
+bounding box for very large radii) and ranks them by haversine distance.
+"""
+
+import logging
+import threading
+
+import numpy as np
+from sqlalchemy import event, func, or_
+from sqlalchemy.orm import Session
+
+from models.models import Hospital
+from services.geo import (
+    KM_PER_DEGREE,
+    KDTree,
+    chord_for_km,
+    geohash_cover,
+    geohash_encode,
+    haversine_km,
+    unit_vectors,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# keeps hospitals.geohash (the prefix index nearby_from_db narrows with)
+# in step with ORM writes; bulk loaders compute it themselves
+@event.listens_for(Hospital, "before_insert")
+@event.listens_for(Hospital, "before_update")
+def _set_geohash(mapper, connection, target: Hospital) -> None:
+    if target.latitude is None or target.longitude is None:
+        target.geohash = None
+    else:
+        target.geohash = geohash_encode(target.latitude, target.longitude)
+
+_COLUMNS = (
+    Hospital.id,
+    Hospital.name,
+    Hospital.city,
+    Hospital.state,
+    Hospital.latitude,
+    Hospital.longitude,
+)
+
+
+def _located(q):
+    return q.filter(
+        Hospital.is_active.is_not(False),
+        Hospital.latitude.is_not(None),
+        Hospital.longitude.is_not(None),
+    )
+
+
+def _results(rows: list, lat: np.ndarray, lon: np.ndarray, dist: np.ndarray) -> list[dict]:
+    return [
+        {
+            "id": row[0],
+            "name": row[1],
+            "city": row[2],
+            "state": row[3],
+            "latitude": float(la),
+            "longitude": float(lo),
+            "distance_km": round(float(d), 3),
+        }
+        for row, la, lo, d in zip(rows, lat, lon, dist)
+    ]
+
+
+class HospitalIndex:
+    def __init__(self) -> None:
+        self._write_lock = threading.Lock()
+        # (KDTree, rows, lat array, lon array) swapped as one tuple
+        self._snapshot: tuple = (KDTree(np.zeros((0, 3))), [], np.zeros(0), np.zeros(0))
+        self._signature: tuple | None = None
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._snapshot[1])
+
+    # ── queries ────────────────────────────────────────────────────────────
+    def nearby(self, lat: float, lon: float, radius_km: float, k: int) -> list[dict]:
+        """Up to *k* hospitals within *radius_km* of (lat, lon), nearest first."""
+        tree, rows, lats, lons = self._snapshot
+        _, idx = tree.query(unit_vectors([lat], [lon])[0], k, chord_for_km(radius_km))
+        dist = haversine_km(lat, lon, lats[idx], lons[idx])
+        return _results([rows[i] for i in idx], lats[idx], lons[idx], dist)
+
+    # ── maintenance ────────────────────────────────────────────────────────
+    def _current_signature(self, db: Session) -> tuple:
+        return _located(
+            db.query(func.count(Hospital.id), func.max(Hospital.id), func.max(Hospital.updated_at))
+        ).one()
+
+    def build(self, db: Session) -> None:
+        """(Re)load every located hospital and rebuild the tree."""
+        with self._write_lock:
+            signature = tuple(self._current_signature(db))
+            rows = _located(db.query(*_COLUMNS)).order_by(Hospital.id).all()
+            lats = np.array([r.latitude for r in rows], dtype=float)
+            lons = np.array([r.longitude for r in rows], dtype=float)
+            tree = KDTree(unit_vectors(lats, lons).reshape(-1, 3))
+            self._snapshot = (tree, [tuple(r) for r in rows], lats, lons)
+            self._signature = signature
+            logger.info("hospital index built: %d hospitals", len(rows))
+            self.ready = True
+
+    def refresh(self, db: Session) -> int:
+        """Rebuild if hospitals were added, moved or removed; returns the size."""
+        if not self.ready or tuple(self._current_signature(db)) != self._signature:
+            self.build(db)
+        return len(self)
+
+
+def nearby_from_db(db: Session, lat: float, lon: float, radius_km: float, k: int) -> list[dict]:
+    q = _located(db.query(*_COLUMNS))
+    cover = geohash_cover(lat, lon, radius_km)
+    if cover is not None:
+        q = q.filter(or_(*(Hospital.geohash.startswith(cell) for cell in cover)))
+    else:
+        reach = radius_km / KM_PER_DEGREE
+        if abs(lat) + reach < 90:
+            q = q.filter(Hospital.latitude.between(lat - reach, lat + reach))
+    rows = q.all()
+    if not rows:
+        return []
+
+    lats = np.array([r.latitude for r in rows], dtype=float)
+    lons = np.array([r.longitude for r in rows], dtype=float)
+    dist = haversine_km(lat, lon, lats, lons)
+    order = np.argsort(dist, kind="stable")
+    order = order[dist[order] <= radius_km][:k]
+    return _results([rows[i] for i in order], lats[order], lons[order], dist[order])
+
+
+hospital_index = HospitalIndex()
@@ -0,0 +1,68 @@
+"""
+Keyset (cursor) pagination helpers shared by the list endpoints.
+
+A cursor is an opaque, URL-safe token that encodes the sort key and id of
+the last row on the previous page.  The next page is fetched with a seek
+predicate (``WHERE (sort_key, id) > (:last_key, :last_id)``) instead of an
+OFFSET, so every page costs one index range scan regardless of depth.
+"""
+
+import base64
+import json
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """Pack the last row's (sort_value, id) into an opaque token."""
+    raw = json.dumps([sort_value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[Any, int]:
+    """Inverse of :func:`encode_cursor`; raises 400 on a malformed token."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(row_id, int) or not (
+            sort_value is None
+            or isinstance(sort_value, str)
+            or (isinstance(sort_value, int) and not isinstance(sort_value, bool))
+        ):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return sort_value, row_id
+
+
+def seek_page(query, sort_col, id_col, cursor: str | None, limit: int) -> list:
+    """
+    Return up to *limit* rows of *query* ordered by ``(sort_col, id_col)``
+    that come after *cursor*.
+
+    Non-NULL sort keys are paged with a row-value comparison, which Postgres
+    turns into an index range condition on a ``(sort_col, id)`` B-tree.
+    Rows whose sort key is NULL sort last and are paged by id alone once the
+    non-NULL block is exhausted.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+    else:
+        sort_value, row_id = "", None  # start of the non-NULL block
+
+    rows: list = []
+    if sort_value is not None:
+        head = query.filter(sort_col.isnot(None))
+        if row_id is not None:
+            head = head.filter(tuple_(sort_col, id_col) > tuple_(sort_value, row_id))
+        rows = head.order_by(sort_col, id_col).limit(limit).all()
+        row_id = None
+
+    if len(rows) < limit:
+        tail = query.filter(sort_col.is_(None))
+        if row_id is not None:
+            tail = tail.filter(id_col > row_id)
+        rows += tail.order_by(id_col).limit(limit - len(rows)).all()
+    return rows
@@ -0,0 +1,343 @@
+"""
+Stock redistribution planner behind /api/redistribution.
+
+For one product, every hospital holding it is classified from its
+non-expired inventory batches:
+
+  • deficit  — usable stock below the safety stock level; needs the gap
+  • surplus  — stock above the safety level, unless the forecast says it
+               runs out before a resupply could arrive
+               (``predicted_days_to_zero < lead_time_days``)
+
+Moving surplus to deficits at minimum total unit-km is a transportation
+problem.  ``solve_transport`` builds the surplus × deficit haversine matrix
+in one vectorized pass, seeds a feasible plan greedily along the cheapest
+edges, then runs the transportation simplex (MODI with partial pricing)
+on that basis until it is optimal or the time budget runs out — so the
+answer is always a feasible plan, and exact whenever time allows.
+
+Only ``hospital_positions`` touches the database; ``plan_transfers`` is
+pure CPU and is run off the event loop by the router.
+"""
+
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from models.models import DrugProduct, Hospital, Inventory
+from services.geo import haversine_km
+
+# above this many surplus × deficit pairs the greedy seed only looks at
+# each hospital's nearest candidates instead of sorting every edge
+_DENSE_EDGES = 1_000_000
+_CANDIDATES = 32
+_CHUNK = 4096
+# reduced costs are priced this many matrix cells at a time
+_PRICING_BLOCK = 262_144
+
+
+# ── solver ────────────────────────────────────────────────────────────────
+def _greedy(supply: np.ndarray, demand: np.ndarray, cost: np.ndarray, edges: np.ndarray,
+            flows: dict) -> None:
+    """Allocate along *edges* (flat indices into *cost*, cheapest first)."""
+    n_dem = cost.shape[1]
+    for start in range(0, len(edges), _CHUNK):
+        if not supply.any() or not demand.any():
+            return
+        chunk = edges[start:start + _CHUNK]
+        rows, cols = np.divmod(chunk, n_dem)
+        live = (supply[rows] > 0) & (demand[cols] > 0)
+        for i, j in zip(rows[live].tolist(), cols[live].tolist()):
+            q = min(supply[i], demand[j])
+            if q > 0:
+                flows[(i, j)] = q
+                supply[i] -= q
+                demand[j] -= q
+
+
+def _seed(supply: np.ndarray, demand: np.ndarray, cost: np.ndarray) -> dict:
+    """
+    Starting plan along the cheapest edges (each hospital's nearest
+    candidates first on large problems); ships ``min(total supply, total
+    demand)``.  Every allocation exhausts a row or a column, so the cells
+    form a forest.
+    """
+    flows: dict[tuple[int, int], int] = {}
+    n_sup, n_dem = cost.shape
+    if cost.size > _DENSE_EDGES:
+        m_row = min(_CANDIDATES, n_dem)
+        m_col = min(_CANDIDATES, n_sup)
+        near_cols = np.argpartition(cost, m_row - 1, axis=1)[:, :m_row]
+        near_rows = np.argpartition(cost, m_col - 1, axis=0)[:m_col, :]
+        edges = np.unique(np.concatenate((
+            (np.arange(n_sup)[:, None] * n_dem + near_cols).ravel(),
+            (near_rows * n_dem + np.arange(n_dem)[None, :]).ravel(),
+        )))
+        edges = edges[np.argsort(cost.flat[edges], kind="stable")]
+    else:
+        edges = np.argsort(cost, axis=None, kind="stable")
+    _greedy(supply, demand, cost, edges, flows)
+
+    # whatever the candidates could not place: greedy over the remaining
+    # rows × columns only (usually a small block)
+    rows = np.nonzero(supply > 0)[0]
+    cols = np.nonzero(demand > 0)[0]
+    if len(rows) and len(cols):
+        sub = cost[rows[:, None], cols[None, :]]
+        order = np.argsort(sub, axis=None, kind="stable")
+        edges = rows[order // len(cols)] * n_dem + cols[order % len(cols)]
+        _greedy(supply, demand, cost, edges, flows)
+    return flows
+
+
+def _spanning_basis(flows: dict, n_sup: int, n_dem: int) -> None:
+    """Add zero-flow cells until the basis is a spanning tree (degenerate seeds)."""
+    parent = list(range(n_sup + n_dem))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j in flows:
+        parent[find(i)] = find(n_sup + j)
+    # every row already ships somewhere, so hooking each stray column
+    # component onto row 0 connects everything
+    for j in range(n_dem):
+        if find(n_sup + j) != find(0):
+            flows[(0, j)] = 0
+            parent[find(n_sup + j)] = find(0)
+
+
+def _simplex(flows: dict, cost: np.ndarray, deadline: float) -> bool:
+    """
+    Transportation simplex (MODI) from a spanning-tree basis *flows*,
+    pivoting in place until optimal (True) or *deadline* (False).
+    """
+    n_sup, n_dem = cost.shape
+    n = n_sup + n_dem
+    _spanning_basis(flows, n_sup, n_dem)
+    adj: list[set[int]] = [set() for _ in range(n)]
+    for i, j in flows:
+        adj[i].add(n_sup + j)
+        adj[n_sup + j].add(i)
+
+    # basis tree rooted at row 0, with potentials u_i + v_j = c_ij
+    pot = np.zeros(n)
+    up = [-1] * n
+    depth = [0] * n
+
+    def hang(start: int, parent: int) -> None:
+        """(Re)attach the subtree at *start* below *parent*."""
+        up[start] = parent
+        if parent >= 0:
+            depth[start] = depth[parent] + 1
+            i, j = (start, parent - n_sup) if start < n_sup else (parent, start - n_sup)
+            pot[start] = cost[i, j] - pot[parent]
+        stack = [start]
+        while stack:
+            a = stack.pop()
+            for b in adj[a]:
+                if b != up[a]:
+                    up[b] = a
+                    depth[b] = depth[a] + 1
+                    i, j = (a, b - n_sup) if a < n_sup else (b, a - n_sup)
+                    pot[b] = cost[i, j] - pot[a]
+                    stack.append(b)
+
+    hang(0, -1)
+    eps = 1e-9 * max(1.0, float(np.abs(cost).max()))
+    block = max(1, _PRICING_BLOCK // n_dem)
+    next_row = 0
+
+    while True:
+        if time.perf_counter() >= deadline:
+            return False
+
+        # partial pricing: first row block holding a negative reduced cost
+        entering = None
+        u, v = pot[:n_sup], pot[n_sup:]
+        for _ in range(0, n_sup, block):
+            r0 = next_row
+            r1 = min(n_sup, r0 + block)
+            next_row = 0 if r1 == n_sup else r1
+            reduced = cost[r0:r1] - u[r0:r1, None] - v[None, :]
+            k = int(np.argmin(reduced))
+            if reduced.flat[k] < -eps:
+                entering = (r0 + k // n_dem, k % n_dem)
+                break
+        if entering is None:
+            return True
+
+        # cycle = entering cell + tree path from its column back to its row
+        p, q = entering
+        a, b = p, n_sup + q
+        left, right = [a], [b]
+        while a != b:
+            if depth[a] >= depth[b]:
+                a = up[a]
+                left.append(a)
+            else:
+                b = up[b]
+                right.append(b)
+        path = right + left[-2::-1]   # column q ... row p
+        cells = [
+            (y, x - n_sup) if y < n_sup else (x, y - n_sup)
+            for x, y in zip(path, path[1:])
+        ]
+        losing = cells[0::2]
+        theta, leaving = min((flows[c], c) for c in losing)
+        for c in losing:
+            flows[c] -= theta
+        for c in cells[1::2]:
+            flows[c] += theta
+
+        # swap the cells in the tree; only the cut-off subtree moves
+        x, y = leaving[0], n_sup + leaving[1]
+        child = x if up[x] == y else y
+        node = p
+        while depth[node] > depth[child]:
+            node = up[node]
+        s, t = (p, n_sup + q) if node == child else (n_sup + q, p)
+
+        del flows[leaving]
+        adj[x].discard(y)
+        adj[y].discard(x)
+        flows[entering] = theta
+        adj[p].add(n_sup + q)
+        adj[n_sup + q].add(p)
+        hang(s, t)
+
+
+def solve_transport(supply: np.ndarray, demand: np.ndarray, cost: np.ndarray,
+                    time_budget: float) -> tuple[dict, bool]:
+    """
+    Min-cost shipments from *supply* rows to *demand* columns, shipping
+    ``min(total supply, total demand)``.  Returns ({(row, col): quantity},
+    optimal).  ``inf`` cost forbids an edge; demand that can only be met
+    over forbidden edges is left unmet.
+    """
+    deadline = time.perf_counter() + time_budget
+    n_sup, n_dem = cost.shape
+    supply = supply.astype(np.int64)
+    demand = demand.astype(np.int64)
+
+    # forbidden edges get a cost no real route can reach
+    allowed = np.isfinite(cost)
+    top = float(cost[allowed].max()) if allowed.any() else 0.0
+    work = np.where(allowed, cost, (top + 1) * (n_sup + n_dem + 1))
+
+    flows = _seed(supply.copy(), demand.copy(), work)
+    # balance with a free dummy row/column that soaks up the excess
+    excess = int(supply.sum() - demand.sum())
+    if excess > 0:
+        work = np.hstack((work, np.zeros((n_sup, 1))))
+        left = supply - _shipped(flows, n_sup, 0)
+        flows.update({(i, n_dem): int(x) for i, x in enumerate(left) if x})
+    elif excess < 0:
+        work = np.vstack((work, np.zeros((1, n_dem))))
+        left = demand - _shipped(flows, n_dem, 1)
+        flows.update({(n_sup, j): int(x) for j, x in enumerate(left) if x})
+
+    optimal = _simplex(flows, work, deadline)
+    plan = {
+        (i, j): int(x)
+        for (i, j), x in flows.items()
+        if x > 0 and i < n_sup and j < n_dem and allowed[i, j]
+    }
+    return plan, optimal
+
+
+def _shipped(flows: dict, size: int, axis: int) -> np.ndarray:
+    out = np.zeros(size, dtype=np.int64)
+    for cell, x in flows.items():
+        out[cell[axis]] += x
+    return out
+
+
+# ── planning ──────────────────────────────────────────────────────────────
+def hospital_positions(db: Session, product_id: int):
+    """Per-hospital (id, lat, lon, stock, safety, days_to_zero, lead_time)."""
+    if db.get(DrugProduct, product_id) is None:
+        raise HTTPException(status_code=404, detail="Medicine not found")
+    now = datetime.now(timezone.utc)
+    return (
+        db.query(
+            Hospital.id,
+            Hospital.latitude,
+            Hospital.longitude,
+            func.coalesce(func.sum(Inventory.current_stock), 0),
+            func.coalesce(func.max(Inventory.safety_stock_level), 0),
+            func.min(Inventory.predicted_days_to_zero),
+            func.max(Inventory.lead_time_days),
+        )
+        .join(Inventory, Inventory.hospital_id == Hospital.id)
+        .filter(
+            Inventory.product_id == product_id,
+            or_(Inventory.expiry_date.is_(None), Inventory.expiry_date > now),
+            Hospital.is_active.is_not(False),
+            Hospital.latitude.is_not(None),
+            Hospital.longitude.is_not(None),
+        )
+        .group_by(Hospital.id)
+        .all()
+    )
+
+
+def plan_transfers(product_id: int, rows: list, time_budget_ms: int,
+                   max_distance_km: float | None = None) -> dict:
+    """Transfer plan for *product_id* from its ``hospital_positions`` rows."""
+    started = time.perf_counter()
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    lat = np.array([r[1] for r in rows], dtype=float)
+    lon = np.array([r[2] for r in rows], dtype=float)
+    stock = np.array([r[3] for r in rows], dtype=np.int64)
+    safety = np.array([r[4] for r in rows], dtype=np.int64)
+    days = np.array([np.nan if r[5] is None else r[5] for r in rows], dtype=float)
+    lead = np.array([np.nan if r[6] is None else r[6] for r in rows], dtype=float)
+
+    # hospitals about to run dry before a resupply lands keep what they have
+    at_risk = days < lead
+    surplus = np.where(at_risk, 0, np.maximum(stock - safety, 0))
+    deficit = np.maximum(safety - stock, 0)
+    src = np.nonzero(surplus > 0)[0]
+    dst = np.nonzero(deficit > 0)[0]
+
+    transfers, optimal = [], True
+    if len(src) and len(dst):
+        cost = haversine_km(lat[src, None], lon[src, None], lat[None, dst], lon[None, dst])
+        if max_distance_km is not None:
+            cost[cost > max_distance_km] = np.inf
+        budget = max(0.0, time_budget_ms / 1000 - (time.perf_counter() - started))
+        flows, optimal = solve_transport(surplus[src], deficit[dst], cost, budget)
+        transfers = sorted(
+            (
+                {
+                    "from_hospital_id": int(ids[src[i]]),
+                    "to_hospital_id": int(ids[dst[j]]),
+                    "quantity": int(q),
+                    "distance_km": round(float(cost[i, j]), 3),
+                }
+                for (i, j), q in flows.items()
+            ),
+            key=lambda t: (t["to_hospital_id"], t["distance_km"]),
+        )
+
+    shipped = sum(t["quantity"] for t in transfers)
+    return {
+        "product_id": product_id,
+        "surplus_hospitals": int(len(src)),
+        "deficit_hospitals": int(len(dst)),
+        "total_surplus": int(surplus.sum()),
+        "total_deficit": int(deficit.sum()),
+        "units_shipped": shipped,
+        "unit_km": round(sum(t["quantity"] * t["distance_km"] for t in transfers), 3),
+        "optimal": optimal,
+        "solve_ms": round((time.perf_counter() - started) * 1000, 1),
+        "transfers": transfers,
+    }
@@ -0,0 +1,124 @@
+"""
+Automatic reordering behind /api/reorder and jobs/reorder.py.
+
+One pass over the whole network, in a single statement:
+
+  1. every (hospital, medicine) flagged ``is_low`` in inventory_summaries
+     — usable stock under the safety level, out of stock, or forecast to
+     run dry before a resupply could arrive (``days_to_zero <
+     lead_time_days``) — at an active hospital, unless it already has an
+     open (Pending / Shipped) purchase order line for that medicine;
+  2. is sized to bring it back to its safety stock plus the forecast
+     demand over the lead time::
+
+        quantity = ceil(safety_stock + daily_rate * lead_time - stock)
+
+     with ``daily_rate = stock / days_to_zero`` from the forecasts and a
+     ``DEFAULT_LEAD_TIME_DAYS`` lead time when none is recorded;
+  3. is sourced from the cheapest active supplier of the medicine
+     (``DISTINCT ON (product_id)`` over supplier_products by price);
+  4. is grouped per (hospital, supplier) into one purchase order, and all
+     orders and their items are inserted with two INSERT ... SELECTs
+     chained through ``RETURNING``.
+
+Runs take an advisory lock, so two concurrent runs cannot both order
+the same shortfall; the second one sees the first one's orders as open.
+"""
+
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from schemas.response import ReorderResult
+
+logger = logging.getLogger(__name__)
+
+# pg advisory lock serializing reorder runs across workers
+_LOCK_KEY = 0x0E04DE12
+
+DEFAULT_LEAD_TIME_DAYS = 7
+OPEN_STATUSES = ("Pending", "Shipped")
+
+_PLAN = (
+    "WITH need AS ("
+    "  SELECT s.hospital_id, s.product_id, "
+    "    coalesce(s.lead_time_days, :default_lead) AS lead_time, "
+    "    ceil(s.safety_stock "
+    "         + CASE WHEN s.days_to_zero > 0 THEN s.total_stock / s.days_to_zero ELSE 0 END "
+    "           * coalesce(s.lead_time_days, :default_lead) "
+    "         - greatest(s.total_stock, 0)) AS quantity "
+    "  FROM inventory_summaries AS s "
+    "  JOIN hospitals AS h ON h.id = s.hospital_id AND h.is_active IS NOT FALSE "
+    "  WHERE s.is_low "
+    "    AND NOT EXISTS ("
+    "      SELECT 1 FROM purchase_orders AS po "
+    "      JOIN purchase_order_items AS poi ON poi.purchase_order_id = po.id "
+    "      WHERE po.hospital_id = s.hospital_id AND poi.product_id = s.product_id "
+    "        AND coalesce(po.status, 'Pending') = ANY(CAST(:open_statuses AS text[])))"
+    "), offer AS ("
+    "  SELECT DISTINCT ON (sp.product_id) sp.product_id, sp.supplier_id, sp.price_per_unit "
+    "  FROM supplier_products AS sp "
+    "  JOIN suppliers AS su ON su.id = sp.supplier_id AND su.is_active IS NOT FALSE "
+    "  WHERE sp.price_per_unit IS NOT NULL "
+    "    AND sp.product_id IN (SELECT product_id FROM need) "
+    "  ORDER BY sp.product_id, sp.price_per_unit, sp.supplier_id"
+    "), line AS ("
+    "  SELECT n.hospital_id, o.supplier_id, n.product_id, "
+    "    CAST(n.quantity AS integer) AS quantity, o.price_per_unit, n.lead_time "
+    "  FROM need AS n JOIN offer AS o ON o.product_id = n.product_id "
+    "  WHERE n.quantity > 0"
+    ")"
+)
+
+_STATS = (
+    "SELECT (SELECT count(*) FROM need) AS low, "
+    "  (SELECT count(*) FROM need AS n WHERE n.quantity > 0 "
+    "     AND NOT EXISTS (SELECT 1 FROM offer AS o WHERE o.product_id = n.product_id)) AS unsourced, "
+)
+
+
+def plan_reorders(db: Session, dry_run: bool = False) -> ReorderResult:
+    """Create purchase orders for every low position (or just count them)."""
+    params = {
+        "default_lead": DEFAULT_LEAD_TIME_DAYS,
+        "open_statuses": list(OPEN_STATUSES),
+    }
+    if dry_run:
+        stmt = text(
+            _PLAN + " " + _STATS +
+            "  count(DISTINCT (l.hospital_id, l.supplier_id)) AS orders, count(l.*) AS lines, "
+            "  coalesce(sum(l.quantity), 0) AS units, "
+            "  coalesce(sum(l.quantity * l.price_per_unit), 0) AS value "
+            "FROM line AS l"
+        )
+    else:
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+        stmt = text(
+            _PLAN + ", orders AS ("
+            "  INSERT INTO purchase_orders (hospital_id, supplier_id, status, expected_delivery_date) "
+            "  SELECT hospital_id, supplier_id, 'Pending', now() + max(lead_time) * interval '1 day' "
+            "  FROM line GROUP BY hospital_id, supplier_id ORDER BY hospital_id, supplier_id "
+            "  RETURNING id, hospital_id, supplier_id"
+            "), items AS ("
+            "  INSERT INTO purchase_order_items (purchase_order_id, product_id, quantity, price_per_unit) "
+            "  SELECT o.id, l.product_id, l.quantity, l.price_per_unit "
+            "  FROM line AS l JOIN orders AS o "
+            "    ON o.hospital_id = l.hospital_id AND o.supplier_id = l.supplier_id "
+            "  ORDER BY o.id, l.product_id "
+            "  RETURNING purchase_order_id, quantity, price_per_unit"
+            ") " + _STATS +
+            "  count(DISTINCT i.purchase_order_id) AS orders, count(i.*) AS lines, "
+            "  coalesce(sum(i.quantity), 0) AS units, "
+            "  coalesce(sum(i.quantity * i.price_per_unit), 0) AS value "
+            "FROM items AS i"
+        )
+    stats = db.execute(stmt, params).mappings().one()
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+        logger.info(
+            "reorder: %d purchase orders, %d lines, %d units", stats["orders"], stats["lines"], stats["units"]
+        )
+    return ReorderResult(dry_run=dry_run, **stats)
@@ -0,0 +1,64 @@
+"""
+Medicine search backed by Postgres full-text and trigram indexes.
+
+``drug_products.search_vector`` is a stored generated ``tsvector`` over
+brand (weight A), generic (B) and manufacturer (C) names, so it is kept in
+sync by Postgres itself on every insert/update.  Whole words and prefixes
+("amox" → "amoxicillin") are answered from its GIN index; infix fragments
+("cillin") fall through to ``ILIKE``, which the ``gin_trgm_ops`` indexes
+on the three name columns turn into an index scan as well.
+"""
+
+import re
+
+from sqlalchemy import func, or_
+
+from models.models import DrugProduct
+
+# text search configuration used for both the column and the queries —
+# 'simple' avoids English stemming mangling drug names
+TS_CONFIG = "simple"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def prefix_tsquery(q: str) -> str | None:
+    """Turn free text into ``tok1:* & tok2:*`` (every token as a prefix)."""
+    tokens = _TOKEN_RE.findall(q.lower())
+    if not tokens:
+        return None
+    return " & ".join(f"{tok}:*" for tok in tokens)
+
+
+def search_filter(q: str):
+    """WHERE clause matching *q* by word prefix or by substring."""
+    pattern = f"%{q}%"
+    clauses = [
+        DrugProduct.brand_name.ilike(pattern),
+        DrugProduct.generic_name.ilike(pattern),
+        DrugProduct.manufacturer_name.ilike(pattern),
+    ]
+    tsq = prefix_tsquery(q)
+    if tsq:
+        clauses.insert(
+            0, DrugProduct.search_vector.op("@@")(func.to_tsquery(TS_CONFIG, tsq))
+        )
+    return or_(*clauses)
+
+
+def search_rank(q: str):
+    """
+    Relevance score for ORDER BY: full-text cover density plus the best
+    trigram similarity of *q* to the brand or generic name.
+    """
+    similarity = func.greatest(
+        func.coalesce(func.similarity(DrugProduct.brand_name, q), 0),
+        func.coalesce(func.similarity(DrugProduct.generic_name, q), 0),
+    )
+    tsq = prefix_tsquery(q)
+    if not tsq:
+        return similarity
+    text_rank = func.ts_rank_cd(
+        DrugProduct.search_vector, func.to_tsquery(TS_CONFIG, tsq)
+    )
+    return text_rank + similarity
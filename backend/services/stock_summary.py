@@ -0,0 +1,196 @@
+"""
+Per-(hospital, product) stock summaries, maintained inside Postgres.
+
+``inventories`` holds one row per batch, so "what is low at hospital X"
+would otherwise aggregate every batch the hospital holds.  The
+``inventory_summaries`` table keeps those aggregates ready: usable
+(non-expired) stock, stock in expired batches, nearest expiry, the
+lowest predicted days-to-zero and the safety / lead-time figures the
+redistribution planner uses, plus a generated ``is_low`` flag with a
+partial index on it.
+
+Statement-level triggers on ``inventories`` keep it current.  Each
+trigger collects the distinct (hospital, product) keys a statement
+touched from its transition tables and calls
+``inventory_summaries_refresh``, which
+
+  1. locks those summary rows in key order (inserting missing ones),
+     so concurrent writers of the same product serialize here rather
+     than overwrite each other with stale aggregates, then
+  2. recomputes the keys from their batches in a fresh statement and
+     drops summaries whose product has no batches left.  The recompute
+     is an upsert: a summary locked in step 1 may have been deleted by a
+     writer that emptied the product just before us, and the row must
+     come back if our statement left batches behind.
+
+A bulk write (ingestion drawing stock, a forecast rescore) therefore
+costs one grouped recompute per statement, not one per row.  Expiry is
+the one input that changes without a write: ``refresh_expired`` (run
+periodically) recomputes the summaries whose nearest expiry has passed.
+
+Migrations install frozen copies of the functions; ``install`` also runs
+after ``Base.metadata.create_all`` once this module is imported.
+"""
+
+import logging
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from db.db import Base
+
+logger = logging.getLogger(__name__)
+
+_REFRESH_FUNCTION = """
+CREATE OR REPLACE FUNCTION inventory_summaries_refresh(hids integer[], pids integer[])
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO inventory_summaries (hospital_id, product_id)
+    SELECT DISTINCT k.h, k.p FROM unnest(hids, pids) AS k(h, p)
+    WHERE k.h IS NOT NULL AND k.p IS NOT NULL
+    ORDER BY 1, 2
+    ON CONFLICT DO NOTHING;
+
+    PERFORM 1 FROM inventory_summaries AS s
+    JOIN unnest(hids, pids) AS k(h, p) ON s.hospital_id = k.h AND s.product_id = k.p
+    ORDER BY s.hospital_id, s.product_id
+    FOR UPDATE OF s;
+
+    WITH k AS (
+        SELECT DISTINCT h, p FROM unnest(hids, pids) AS u(h, p)
+    ), a AS (
+        SELECT k.h, k.p, count(i.id) AS n,
+               coalesce(sum(i.current_stock) FILTER (WHERE v.ok), 0) AS total_stock,
+               coalesce(sum(i.current_stock) FILTER (WHERE NOT v.ok), 0) AS expired_stock,
+               count(*) FILTER (WHERE v.ok AND i.current_stock > 0) AS batches,
+               min(i.expiry_date) FILTER (WHERE v.ok AND i.current_stock > 0) AS nearest_expiry,
+               min(i.predicted_days_to_zero) FILTER (WHERE v.ok) AS days_to_zero,
+               max(i.predicted_risk_score) FILTER (WHERE v.ok) AS risk_score,
+               coalesce(max(i.safety_stock_level) FILTER (WHERE v.ok), 0) AS safety_stock,
+               max(i.lead_time_days) FILTER (WHERE v.ok) AS lead_time_days
+        FROM k
+        LEFT JOIN inventories AS i ON i.hospital_id = k.h AND i.product_id = k.p
+        CROSS JOIN LATERAL (
+            SELECT i.expiry_date IS NULL OR i.expiry_date > now() AS ok
+        ) AS v
+        GROUP BY k.h, k.p
+    ), gone AS (
+        DELETE FROM inventory_summaries AS s USING a
+        WHERE s.hospital_id = a.h AND s.product_id = a.p AND a.n = 0
+    )
+    INSERT INTO inventory_summaries AS s (hospital_id, product_id, total_stock, expired_stock,
+        batches, nearest_expiry, days_to_zero, risk_score, safety_stock, lead_time_days)
+    SELECT a.h, a.p, a.total_stock, a.expired_stock, a.batches, a.nearest_expiry,
+           a.days_to_zero, a.risk_score, a.safety_stock, a.lead_time_days
+    FROM a WHERE a.n > 0
+    ORDER BY a.h, a.p
+    ON CONFLICT (hospital_id, product_id) DO UPDATE
+    SET total_stock = excluded.total_stock,
+        expired_stock = excluded.expired_stock,
+        batches = excluded.batches,
+        nearest_expiry = excluded.nearest_expiry,
+        days_to_zero = excluded.days_to_zero,
+        risk_score = excluded.risk_score,
+        safety_stock = excluded.safety_stock,
+        lead_time_days = excluded.lead_time_days,
+        updated_at = now();
+END
+$$
+"""
+
+_SYNC_FUNCTION = """
+CREATE OR REPLACE FUNCTION inventory_summaries_sync()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    hids integer[];
+    pids integer[];
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM inventory_summaries;
+        RETURN NULL;
+    ELSIF TG_OP = 'INSERT' THEN
+        SELECT array_agg(hospital_id), array_agg(product_id) INTO hids, pids
+        FROM (SELECT DISTINCT hospital_id, product_id FROM new_rows) AS k;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(hospital_id), array_agg(product_id) INTO hids, pids
+        FROM (SELECT DISTINCT hospital_id, product_id FROM old_rows) AS k;
+    ELSE
+        SELECT array_agg(hospital_id), array_agg(product_id) INTO hids, pids
+        FROM (SELECT hospital_id, product_id FROM old_rows
+              UNION SELECT hospital_id, product_id FROM new_rows) AS k;
+    END IF;
+    IF hids IS NOT NULL THEN
+        PERFORM inventory_summaries_refresh(hids, pids);
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+_TRIGGERS = (
+    "CREATE OR REPLACE TRIGGER inventories_summary_insert AFTER INSERT ON inventories "
+    "REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION inventory_summaries_sync()",
+    "CREATE OR REPLACE TRIGGER inventories_summary_update AFTER UPDATE ON inventories "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION inventory_summaries_sync()",
+    "CREATE OR REPLACE TRIGGER inventories_summary_delete AFTER DELETE ON inventories "
+    "REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION inventory_summaries_sync()",
+    "CREATE OR REPLACE TRIGGER inventories_summary_truncate AFTER TRUNCATE ON inventories "
+    "FOR EACH STATEMENT EXECUTE FUNCTION inventory_summaries_sync()",
+)
+
+
+# ── schema ─────────────────────────────────────────────────────────────────
+def install(bind) -> None:
+    """Create the refresh functions and the triggers on ``inventories``."""
+    bind.execute(text(_REFRESH_FUNCTION))
+    bind.execute(text(_SYNC_FUNCTION))
+    for ddl in _TRIGGERS:
+        bind.execute(text(ddl))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _install_after_create(target, connection, **kw):
+    if connection.dialect.name == "postgresql":
+        install(connection)
+
+
+# ── maintenance ────────────────────────────────────────────────────────────
+def refresh_all(bind) -> None:
+    """Recompute the summary of every (hospital, product) with batches."""
+    bind.execute(text(
+        "SELECT inventory_summaries_refresh(array_agg(hospital_id), array_agg(product_id)) "
+        "FROM (SELECT DISTINCT hospital_id, product_id FROM inventories "
+        "      WHERE hospital_id IS NOT NULL AND product_id IS NOT NULL) AS k "
+        "HAVING count(*) > 0"
+    ))
+
+
+def rebuild_summaries(db: Session) -> int:
+    """Recompute every summary from ``inventories``; returns the row count."""
+    db.execute(text("DELETE FROM inventory_summaries"))
+    refresh_all(db)
+    db.execute(text("ANALYZE inventory_summaries"))
+    count = db.scalar(text("SELECT count(*) FROM inventory_summaries"))
+    db.commit()
+    logger.info("rebuilt %d inventory summaries", count)
+    return count
+
+
+def refresh_expired(db: Session) -> int:
+    """Recompute summaries holding a batch that has expired since; returns their count."""
+    keys = db.execute(text(
+        "SELECT array_agg(hospital_id), array_agg(product_id), count(*) "
+        "FROM inventory_summaries WHERE nearest_expiry <= now()"
+    )).one()
+    if keys[2]:
+        db.execute(
+            text("SELECT inventory_summaries_refresh(:hids, :pids)"),
+            {"hids": keys[0], "pids": keys[1]},
+        )
+    db.commit()
+    if keys[2]:
+        logger.info("refreshed %d inventory summaries past their nearest expiry", keys[2])
+    return keys[2]
@@ -0,0 +1,190 @@
+"""
+In-process typeahead index for medicine name autocomplete.
+
+Every distinct normalized brand, generic and manufacturer name in
+``drug_products`` is kept in one sorted list of ``(term, kind)`` tuples, so
+a prefix lookup is two binary searches plus a short scan — no Postgres
+round trip.  The list is rebuilt copy-on-write and swapped in atomically,
+so readers never take a lock.
+
+``build`` loads everything once at startup; ``refresh`` only pulls rows
+with a new id or an ``updated_at`` past the previous refresh and adjusts
+the per-term product counts.  ``updated_at`` is stamped when the writing
+transaction starts, not when it commits, so the watermark trails the last
+refresh by ``TYPEAHEAD_WATERMARK_LAG_SECONDS``; re-reading an unchanged row
+is a no-op.  Deletes (and rows committed late below the highest id seen)
+are caught by comparing the count and id sum of the known id range with
+the index, and trigger a full rebuild.
+"""
+
+import heapq
+import logging
+import threading
+import unicodedata
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from config.config import settings
+from models.models import DrugProduct
+
+logger = logging.getLogger(__name__)
+
+# (kind, DrugProduct column) pairs that feed the index
+_FIELDS = (
+    ("brand", DrugProduct.brand_name),
+    ("generic", DrugProduct.generic_name),
+    ("manufacturer", DrugProduct.manufacturer_name),
+)
+
+# prefixes matching more terms than this are ranked once and memoized
+_SCAN_LIMIT = 256
+
+
+def normalize(text: str) -> str:
+    """Lower-case, strip accents and collapse whitespace."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.lower().split())
+
+
+class TypeaheadIndex:
+    def __init__(self) -> None:
+        self._write_lock = threading.Lock()
+        # (sorted [(term, kind)], {(term, kind): (display, product_count)})
+        # swapped as one tuple so readers always see a consistent pair
+        self._snapshot: tuple[list, dict] = ([], {})
+        self._product_terms: dict[int, tuple[tuple[str, str, str], ...]] = {}
+        self._memo: dict[tuple[str, int], list[dict]] = {}
+        self._max_id = 0
+        self._id_sum = 0
+        self._watermark: datetime | None = None
+        self.ready = False
+
+    # ── queries ────────────────────────────────────────────────────────────
+    def suggest(self, prefix: str, limit: int = 10) -> list[dict]:
+        """Top *limit* terms starting with *prefix*, most widely used first."""
+        key = normalize(prefix)
+        if not key:
+            return []
+        memo = self._memo
+        if (key, limit) in memo:
+            return memo[(key, limit)]
+
+        entries, terms = self._snapshot
+        lo = bisect_left(entries, (key,))
+        hi = bisect_left(entries, (key + "\uffff",), lo)
+
+        def rank(entry):
+            # exact match first, then by number of products, then alphabetical
+            return (entry[0] != key, -terms[entry][1], entry)
+
+        best = heapq.nsmallest(limit, entries[lo:hi], key=rank)
+        result = [
+            {"text": terms[e][0], "kind": e[1], "count": terms[e][1]} for e in best
+        ]
+        if hi - lo > _SCAN_LIMIT:
+            memo[(key, limit)] = result
+        return result
+
+    # ── maintenance ────────────────────────────────────────────────────────
+    def build(self, db: Session) -> None:
+        """(Re)load the whole index from ``drug_products``."""
+        with self._write_lock:
+            self._product_terms = {}
+            self._max_id = 0
+            self._id_sum = 0
+            self._watermark = self._now(db)
+            self._apply(self._rows(db), terms={}, publish=True)
+            logger.info(
+                "typeahead index built: %d products, %d terms",
+                len(self._product_terms), len(self._snapshot[1]),
+            )
+            self.ready = True
+
+    def refresh(self, db: Session) -> int:
+        """Fold in products added or updated since the last build/refresh."""
+        if not self.ready:
+            self.build(db)
+            return len(self._product_terms)
+
+        count, id_sum = (
+            db.query(func.count(DrugProduct.id), func.coalesce(func.sum(DrugProduct.id), 0))
+            .filter(DrugProduct.id <= self._max_id)
+            .one()
+        )
+        if (count, id_sum) != (len(self._product_terms), self._id_sum):
+            # products were deleted, or inserted below max id after the last
+            # pass; an incremental diff cannot see either
+            self.build(db)
+            return len(self._product_terms)
+
+        with self._write_lock:
+            started = self._now(db)
+            rows = self._rows(db, since_id=self._max_id, since=self._watermark)
+            changed = self._apply(rows, terms=dict(self._snapshot[1]))
+            self._watermark = started
+            return changed
+
+    @staticmethod
+    def _now(db: Session) -> datetime:
+        """Database time, less the margin for writes that commit late."""
+        now = db.query(func.now()).scalar()
+        return now - timedelta(seconds=settings.TYPEAHEAD_WATERMARK_LAG_SECONDS)
+
+    def _rows(self, db: Session, since_id: int = 0, since: datetime | None = None):
+        q = db.query(DrugProduct.id, *(col for _, col in _FIELDS))
+        if since_id or since:
+            cond = [DrugProduct.id > since_id]
+            if since:
+                cond.append(DrugProduct.updated_at > since)
+            q = q.filter(or_(*cond))
+        return q.yield_per(5000)
+
+    def _apply(self, rows, terms: dict, publish: bool = False) -> int:
+        """
+        Merge *rows* into *terms* (a private copy) and publish the result.
+        Caller holds the write lock.
+        """
+        keys_changed = publish
+        changed = 0
+
+        for pid, *names in rows:
+            self._max_id = max(self._max_id, pid)
+            new = tuple(
+                (normalize(name), kind, name.strip())
+                for (kind, _), name in zip(_FIELDS, names)
+                if name and normalize(name)
+            )
+            old = self._product_terms.get(pid)
+            self._product_terms[pid] = new
+            if old is None:
+                self._id_sum += pid
+            if new == old:
+                continue
+            changed += 1
+            for norm, kind, _ in old or ():
+                display, n = terms[(norm, kind)]
+                if n <= 1:
+                    del terms[(norm, kind)]
+                    keys_changed = True
+                else:
+                    terms[(norm, kind)] = (display, n - 1)
+            for norm, kind, display in new:
+                entry = terms.get((norm, kind))
+                if entry is None:
+                    terms[(norm, kind)] = (display, 1)
+                    keys_changed = True
+                else:
+                    terms[(norm, kind)] = (entry[0], entry[1] + 1)
+
+        if changed or keys_changed:
+            entries = sorted(terms) if keys_changed else self._snapshot[0]
+            self._snapshot = (entries, terms)
+            self._memo = {}
+        return changed
+
+
+typeahead_index = TypeaheadIndex()
@@ -0,0 +1,185 @@
+"""
+Storage for usage logs: monthly partitions of ``usage_logs`` and the
+``usage_daily`` / ``usage_weekly`` rollups.
+
+``usage_logs`` is range-partitioned by month on ``date``.  Partitions for
+the current month and ``USAGE_PARTITION_MONTHS_AHEAD`` more are created
+by ``ensure_partitions`` (app startup, then daily); rows outside them go
+to ``usage_logs_default`` and are moved out when their month's
+partition is created.
+
+The rollups are maintained by ``insert_usage`` in the same statement
+that inserts the logs (data-modifying CTEs), so they always agree with
+``usage_logs`` for everything written through it.  The same statement
+queues the usage in ``forecast_pending`` for the next incremental
+forecast (services/forecasting.py).  Readers that only
+need per-day or per-week totals (forecasting, dashboards) use them
+instead of scanning logs.  ``rebuild_rollups`` recomputes both from
+scratch, e.g. after a bulk load that bypassed ``insert_usage``.
+"""
+
+import logging
+from datetime import date, datetime, timezone
+
+from sqlalchemy import Date, cast, delete, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from config.config import settings
+from models.models import UsageDaily, UsageLog, UsageWeekly
+
+logger = logging.getLogger(__name__)
+
+# pg advisory lock serializing partition creation across workers
+_LOCK_KEY = 0x05A6E109
+
+# (hospital_id, product_id, date, quantity_used)
+Event = tuple[int, int, datetime, int]
+
+
+# ── partitions ─────────────────────────────────────────────────────────────
+def add_months(d: date, months: int) -> date:
+    """First day of the month *months* after *d*'s month."""
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"usage_logs_{month:%Y_%m}"
+
+
+def create_partition(bind, month: date) -> None:
+    """
+    Create the partition for *month*, moving rows already parked in the
+    default partition into it.  *bind* is a Session or Connection.
+    """
+    name = partition_name(month)
+    lo, hi = f"{month:%Y-%m-%d} 00:00:00+00", f"{add_months(month, 1):%Y-%m-%d} 00:00:00+00"
+    bounds = f"FOR VALUES FROM ('{lo}') TO ('{hi}')"
+    parked = bind.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM usage_logs_default "
+            "WHERE date >= CAST(:lo AS timestamptz) AND date < CAST(:hi AS timestamptz))"
+        ),
+        {"lo": lo, "hi": hi},
+    ).scalar()
+    if not parked:
+        bind.execute(text(f"CREATE TABLE {name} PARTITION OF usage_logs {bounds}"))
+        return
+    # a new partition may not overlap rows still in the default one
+    bind.execute(text(f"CREATE TABLE {name} (LIKE usage_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    bind.execute(
+        text(
+            f"WITH moved AS (DELETE FROM usage_logs_default "
+            f"WHERE date >= CAST(:lo AS timestamptz) AND date < CAST(:hi AS timestamptz) "
+            f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+        ),
+        {"lo": lo, "hi": hi},
+    )
+    bind.execute(text(f"ALTER TABLE usage_logs ATTACH PARTITION {name} {bounds}"))
+
+
+def ensure_partitions(db: Session, months_ahead: int | None = None) -> list[str]:
+    """Create missing partitions from this month on; returns the new names."""
+    partitioned = db.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('usage_logs')")
+    ).first()
+    if not partitioned:
+        return []
+
+    if months_ahead is None:
+        months_ahead = settings.USAGE_PARTITION_MONTHS_AHEAD
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    created = []
+    for i in range(months_ahead + 1):
+        month = add_months(this_month, i)
+        name = partition_name(month)
+        if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is None:
+            create_partition(db, month)
+            created.append(name)
+    db.commit()
+    if created:
+        logger.info("created usage_logs partitions: %s", ", ".join(created))
+    return created
+
+
+# ── writing ────────────────────────────────────────────────────────────────
+_INSERT = text(
+    "WITH ins AS ("
+    "  INSERT INTO usage_logs (hospital_id, product_id, date, quantity_used) "
+    "  SELECT * FROM unnest(CAST(:hospital_ids AS integer[]), CAST(:product_ids AS integer[]), "
+    "    CAST(:dates AS timestamptz[]), CAST(:quantities AS integer[])) "
+    "  RETURNING id, hospital_id, product_id, date, quantity_used"
+    "), daily AS ("
+    "  INSERT INTO usage_daily AS r (hospital_id, product_id, day, quantity, events, last_log_id) "
+    "  SELECT hospital_id, product_id, CAST(date AS date), sum(quantity_used), count(*), max(id) "
+    "  FROM ins WHERE hospital_id IS NOT NULL AND product_id IS NOT NULL "
+    "  GROUP BY 1, 2, 3 ORDER BY 1, 2, 3 "
+    "  ON CONFLICT (hospital_id, product_id, day) DO UPDATE SET "
+    "    quantity = r.quantity + excluded.quantity, events = r.events + excluded.events, "
+    "    last_log_id = GREATEST(r.last_log_id, excluded.last_log_id)"
+    "), pending AS ("
+    "  INSERT INTO forecast_pending (hospital_id, product_id, day, quantity, events) "
+    "  SELECT hospital_id, product_id, CAST(date AS date), sum(quantity_used), count(*) "
+    "  FROM ins WHERE hospital_id IS NOT NULL AND product_id IS NOT NULL "
+    "  GROUP BY 1, 2, 3"
+    ") "
+    "INSERT INTO usage_weekly AS r (hospital_id, product_id, week_start, quantity, events) "
+    "SELECT hospital_id, product_id, CAST(date_trunc('week', date) AS date), "
+    "  sum(quantity_used), count(*) "
+    "FROM ins WHERE hospital_id IS NOT NULL AND product_id IS NOT NULL "
+    "GROUP BY 1, 2, 3 ORDER BY 1, 2, 3 "
+    "ON CONFLICT (hospital_id, product_id, week_start) DO UPDATE SET "
+    "  quantity = r.quantity + excluded.quantity, events = r.events + excluded.events"
+)
+
+
+def insert_usage(db: Session, events: list[Event]) -> None:
+    """Insert *events* into usage_logs and add them to both rollups."""
+    if not events:
+        return
+    hospital_ids, product_ids, dates, quantities = (list(col) for col in zip(*events))
+    db.execute(_INSERT, {
+        "hospital_ids": hospital_ids,
+        "product_ids": product_ids,
+        "dates": dates,
+        "quantities": quantities,
+    })
+
+
+# ── rebuilding ─────────────────────────────────────────────────────────────
+def rebuild_rollups(db: Session) -> dict:
+    """Recompute usage_daily and usage_weekly from usage_logs."""
+    logs = UsageLog.__table__.c
+    located = (logs.hospital_id.is_not(None), logs.product_id.is_not(None))
+    counts = {}
+    for model, period, columns, extra in (
+        (
+            UsageDaily, cast(logs.date, Date),
+            ["hospital_id", "product_id", "day", "quantity", "events", "last_log_id"],
+            [func.max(logs.id)],
+        ),
+        (
+            UsageWeekly, cast(func.date_trunc("week", logs.date), Date),
+            ["hospital_id", "product_id", "week_start", "quantity", "events"],
+            [],
+        ),
+    ):
+        table = model.__table__
+        db.execute(delete(table))
+        source = (
+            select(
+                logs.hospital_id, logs.product_id, period,
+                func.sum(logs.quantity_used), func.count(), *extra,
+            )
+            .where(*located)
+            .group_by(logs.hospital_id, logs.product_id, period)
+        )
+        db.execute(insert(table).from_select(columns, source))
+        counts[table.name] = db.scalar(select(func.count()).select_from(table))
+    db.execute(text("ANALYZE usage_daily"))
+    db.execute(text("ANALYZE usage_weekly"))
+    db.commit()
+    logger.info("rebuilt usage rollups: %s", counts)
+    return counts
+
@@ -6,6 +6,16 @@ export async function fetchJson<T>(path: string): Promise<T> {
   return res.json() as Promise<T>;
 }
 
+export async function postJson<T>(path: string, body: unknown): Promise<T> {
+  const res = await fetch(`${BASE}${path}`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body),
+  });
+  if (!res.ok) throw new Error(`API ${res.status}: ${res.statusText}`);
+  return res.json() as Promise<T>;
+}
+
 // ── Types matching backend schemas ────────────────────────────────────────
 export interface MedicineListItem {
   id: number;
@@ -39,18 +49,196 @@ export interface SupplierListItem {
   is_active: boolean;
 }
 
+export interface SupplierOffer extends SupplierListItem {
+  price_per_unit: number | null;
+}
+
+export interface MedicineOffer extends MedicineListItem {
+  price_per_unit: number | null;
+}
+
 export interface MedicineWithSuppliers extends MedicineDetail {
-  suppliers: SupplierListItem[];
+  suppliers: SupplierOffer[];
 }
 
 export interface SupplierWithMedicines extends SupplierListItem {
-  medicines: MedicineListItem[];
+  medicines: MedicineOffer[];
 }
 
-export interface Paginated<T> {
+export interface MedicineSuggestion {
+  text: string;
+  kind: "brand" | "generic" | "manufacturer";
+  count: number;
+}
+
+export interface MedicineBatch {
+  by_id: Record<string, MedicineDetail>;
+  by_ndc: Record<string, MedicineDetail>;
+  missing_ids: number[];
+  missing_ndcs: string[];
+}
+
+export interface SupplierBatch {
+  by_id: Record<string, SupplierListItem>;
+  missing_ids: number[];
+}
+
+export interface NearbyHospital {
+  id: number;
+  name: string;
+  city: string | null;
+  state: string | null;
+  latitude: number | null;
+  longitude: number | null;
+  distance_km: number;
+}
+
+export interface Transfer {
+  from_hospital_id: number;
+  to_hospital_id: number;
+  quantity: number;
+  distance_km: number;
+}
+
+export interface RedistributionPlan {
+  product_id: number;
+  surplus_hospitals: number;
+  deficit_hospitals: number;
+  total_surplus: number;
+  total_deficit: number;
+  units_shipped: number;
+  unit_km: number;
+  optimal: boolean;
+  solve_ms: number;
+  transfers: Transfer[];
+}
+
+export interface InventorySummaryItem {
+  product_id: number;
+  brand_name: string | null;
+  generic_name: string | null;
+  total_stock: number;
+  expired_stock: number;
+  batches: number;
+  nearest_expiry: string | null;
+  days_to_zero: number | null;
+  risk_score: number | null;
+  safety_stock: number;
+  lead_time_days: number | null;
+  is_low: boolean;
+  updated_at: string | null;
+}
+
+export interface HospitalInventory {
+  hospital_id: number;
   total: number;
+  per_page: number;
+  has_more: boolean;
+  next_cursor: string | null;
+  items: InventorySummaryItem[];
+}
+
+export interface InventoryBatch {
+  id: number;
+  batch_number: string | null;
+  expiry_date: string | null;
+  current_stock: number;
+  safety_stock_level: number | null;
+  predicted_days_to_zero: number | null;
+  predicted_risk_score: number | null;
+  last_restocked_at: string | null;
+  lead_time_days: number | null;
+  expired: boolean;
+}
+
+export interface InventoryDetail {
+  hospital_id: number;
+  summary: InventorySummaryItem;
+  batches: InventoryBatch[];
+}
+
+export interface DispenseLine {
+  hospital_id: number;
+  product_id: number;
+  quantity: number;
+}
+
+export interface DispensedBatch {
+  batch_id: number;
+  batch_number: string | null;
+  expiry_date: string | null;
+  quantity: number;
+}
+
+export interface DispenseLineResult extends DispenseLine {
+  requested: number;
+  dispensed: number;
+  shortfall: number;
+  batches: DispensedBatch[];
+}
+
+export interface DispenseResult {
+  dispensed: number;
+  shortfall: number;
+  lines: Omit<DispenseLineResult, "quantity">[];
+}
+
+export interface ProductAtRisk {
+  product_id: number;
+  brand_name: string | null;
+  generic_name: string | null;
+  hospitals: number;
+  hospitals_low: number;
+  hospitals_out: number;
+  total_stock: number;
+  min_days_to_zero: number | null;
+  max_risk_score: number | null;
+}
+
+export interface StateStockouts {
+  state: string | null;
+  hospitals: number;
+  hospitals_with_stockouts: number;
+  stockouts: number;
+  low: number;
+}
+
+export interface ExpiringStock {
+  within_days: number;
+  batches: number;
+  hospitals: number;
+  units: number;
+  value: number;
+  unpriced_batches: number;
+}
+
+export interface DashboardReport<T> {
+  refreshed_at: string | null;
+  items: T[];
+}
+
+export interface DashboardOverview {
+  products_at_risk: DashboardReport<ProductAtRisk> & { total: number };
+  stockouts_by_state: DashboardReport<StateStockouts>;
+  expiring_stock: DashboardReport<ExpiringStock>;
+}
+
+export interface ReorderResult {
+  dry_run: boolean;
+  low: number;
+  unsourced: number;
+  orders: number;
+  lines: number;
+  units: number;
+  value: number;
+}
+
+export interface Paginated<T> {
+  total: number | null;
   page: number;
   per_page: number;
+  has_more: boolean;
+  next_cursor: string | null;
   items: T[];
 }
 
@@ -65,12 +253,20 @@ export const searchMedicines = (q: string, page = 1, perPage = 20) =>
     `/medicines/search?q=${encodeURIComponent(q)}&page=${page}&per_page=${perPage}`
   );
 
+export const suggestMedicines = (q: string, limit = 10) =>
+  fetchJson<MedicineSuggestion[]>(
+    `/medicines/suggest?q=${encodeURIComponent(q)}&limit=${limit}`
+  );
+
 export const getMedicineDetail = (id: number) =>
   fetchJson<MedicineDetail>(`/medicines/${id}`);
 
 export const getMedicineSuppliers = (id: number) =>
   fetchJson<MedicineWithSuppliers>(`/medicines/${id}/suppliers`);
 
+export const getMedicinesBatch = (ids: number[] = [], ndcs: string[] = []) =>
+  postJson<MedicineBatch>(`/medicines/batch`, { ids, ndcs });
+
 export const getSuppliers = (page = 1, perPage = 20) =>
   fetchJson<Paginated<SupplierListItem>>(
     `/suppliers?page=${page}&per_page=${perPage}`
@@ -78,3 +274,50 @@ export const getSuppliers = (page = 1, perPage = 20) =>
 
 export const getSupplierWithMedicines = (id: number) =>
   fetchJson<SupplierWithMedicines>(`/suppliers/${id}`);
+
+export const getSuppliersBatch = (ids: number[]) =>
+  postJson<SupplierBatch>(`/suppliers/batch`, { ids });
+
+export const getNearbyHospitals = (lat: number, lon: number, radiusKm = 50, k = 10) =>
+  fetchJson<NearbyHospital[]>(
+    `/hospitals/nearby?lat=${lat}&lon=${lon}&radius=${radiusKm}&k=${k}`
+  );
+
+export const getRedistributionPlan = (productId: number, timeBudgetMs = 500) =>
+  fetchJson<RedistributionPlan>(
+    `/redistribution/${productId}?time_budget_ms=${timeBudgetMs}`
+  );
+
+export const getHospitalInventory = (
+  hospitalId: number,
+  lowOnly = false,
+  cursor: string | null = null,
+  perPage = 50
+) =>
+  fetchJson<HospitalInventory>(
+    `/inventory/hospitals/${hospitalId}?low_only=${lowOnly}&per_page=${perPage}` +
+      (cursor ? `&cursor=${encodeURIComponent(cursor)}` : "")
+  );
+
+export const getProductInventory = (hospitalId: number, productId: number) =>
+  fetchJson<InventoryDetail>(`/inventory/hospitals/${hospitalId}/products/${productId}`);
+
+export const dispenseStock = (lines: DispenseLine[]) =>
+  postJson<DispenseResult>(`/inventory/dispense`, { lines });
+
+export const getDashboard = (limit = 10) =>
+  fetchJson<DashboardOverview>(`/dashboard?limit=${limit}`);
+
+export const getProductsAtRisk = (limit = 50) =>
+  fetchJson<DashboardReport<ProductAtRisk> & { total: number }>(
+    `/dashboard/products-at-risk?limit=${limit}`
+  );
+
+export const getStockoutsByState = () =>
+  fetchJson<DashboardReport<StateStockouts>>(`/dashboard/stockouts-by-state`);
+
+export const getExpiringStock = () =>
+  fetchJson<DashboardReport<ExpiringStock>>(`/dashboard/expiring-stock`);
+
+export const runReorder = (dryRun = false) =>
+  postJson<ReorderResult>(`/reorder?dry_run=${dryRun}`, {});